@@ -9,21 +9,35 @@ import os
 import pickle
 import numpy as np
 from datetime import datetime
-from typing import List, Dict, Tuple, Optional
+from typing import List, Dict, Tuple, Optional, Iterator
 import re
+import ast
 import math
-from collections import defaultdict
-import requests
+import operator
+import time
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from collections import defaultdict, OrderedDict, deque
+from functools import lru_cache
+from http_client import get_client
 from urllib.parse import quote
 from html import unescape
 
 # Import our enhanced search engine
 try:
-    from search_engines_api import FreeSearchEngine
+    from search_engines_api import FreeSearchEngine, classify_query, QUERY_CLASS_TTLS
     ENHANCED_SEARCH_AVAILABLE = True
 except ImportError:
     ENHANCED_SEARCH_AVAILABLE = False
 
+# Import the trained intent classifier (falls back to regex rules)
+try:
+    from intent_classifier import IntentClassifier
+    INTENT_CLASSIFIER_AVAILABLE = True
+except ImportError:
+    INTENT_CLASSIFIER_AVAILABLE = False
+
 
 class SentenceEmbedder:
     """
@@ -35,6 +49,8 @@ class SentenceEmbedder:
         self.word_vectors = {}
         self.idf_scores = {}
         self.vocabulary = set()
+        self.dimension = 0
+        self._lock = threading.Lock()  # update_from_text runs on the learning thread
         self.load_or_initialize()
     
     def load_or_initialize(self):
@@ -47,6 +63,16 @@ class SentenceEmbedder:
                 self.vocabulary = data.get('vocabulary', set())
         else:
             self._initialize_basic_embeddings()
+        if self.word_vectors:
+            self.dimension = len(next(iter(self.word_vectors.values())))
+        self._rebuild_vector_sum()
+    
+    def _rebuild_vector_sum(self):
+        """Sum of all word vectors, so the mean for a new word is O(1)"""
+        if self.word_vectors:
+            self._vector_sum = np.sum(list(self.word_vectors.values()), axis=0)
+        else:
+            self._vector_sum = None
     
     def _initialize_basic_embeddings(self):
         """Create basic word embeddings from common patterns"""
@@ -84,7 +110,7 @@ class SentenceEmbedder:
         """Encode text into a vector"""
         tokens = self.tokenize(text)
         if not tokens:
-            return np.zeros(len(self.word_vectors.get('hello', [1])))
+            return np.zeros(self.dimension)
         
         # Average word vectors with IDF weighting
         vectors = []
@@ -94,10 +120,36 @@ class SentenceEmbedder:
                 vectors.append(np.array(self.word_vectors[token]) * idf)
         
         if not vectors:
-            return np.zeros(len(self.word_vectors.get('hello', [1])))
+            return np.zeros(self.dimension)
         
         return np.mean(vectors, axis=0)
     
+    def encode_batch(self, texts: List[str]) -> np.ndarray:
+        """Encode many texts at once (same result as encode, one row per text)"""
+        rows, weights, offsets, counts = [], [], [], []
+        for text in texts:
+            offsets.append(len(rows))
+            count = 0
+            for token in self.tokenize(text):
+                vector = self.word_vectors.get(token)
+                if vector is not None:
+                    rows.append(vector)
+                    weights.append(self.idf_scores.get(token, 1.0))
+                    count += 1
+            counts.append(count)
+        
+        result = np.zeros((len(texts), self.dimension))
+        if not rows:
+            return result
+        
+        weighted = np.asarray(rows, dtype=float) * np.asarray(weights)[:, None]
+        counts = np.asarray(counts)
+        present = counts > 0
+        # reduceat needs strictly valid starts, so only sum texts that have known words
+        sums = np.add.reduceat(weighted, np.asarray(offsets)[present], axis=0)
+        result[present] = sums / counts[present][:, None]
+        return result
+    
     def similarity(self, vec1: np.ndarray, vec2: np.ndarray) -> float:
         """Cosine similarity between two vectors"""
         if len(vec1) == 0 or len(vec2) == 0:
@@ -115,26 +167,30 @@ class SentenceEmbedder:
     def update_from_text(self, text: str):
         """Learn new words and update IDF scores"""
         tokens = self.tokenize(text)
-        for token in tokens:
-            if token not in self.vocabulary:
-                # Add new word with averaged embedding from known words
-                self.vocabulary.add(token)
-                # Simple: average of all existing vectors
-                if self.word_vectors:
-                    avg_vector = np.mean(list(self.word_vectors.values()), axis=0)
-                    self.word_vectors[token] = avg_vector.tolist()
-            
-            # Update IDF
-            self.idf_scores[token] = self.idf_scores.get(token, 1.0) * 0.99 + 0.01
+        with self._lock:
+            for token in tokens:
+                if token not in self.vocabulary:
+                    # Add new word with averaged embedding from known words
+                    self.vocabulary.add(token)
+                    # Simple: average of all existing vectors (kept as a running sum)
+                    if self.word_vectors and token not in self.word_vectors:
+                        avg_vector = self._vector_sum / len(self.word_vectors)
+                        self.word_vectors[token] = avg_vector.tolist()
+                        self._vector_sum = self._vector_sum + avg_vector
+                
+                # Update IDF
+                self.idf_scores[token] = self.idf_scores.get(token, 1.0) * 0.99 + 0.01
     
     def save(self):
-        """Save embeddings to disk"""
+        """Save embeddings to disk (a snapshot, so learning can continue meanwhile)"""
+        with self._lock:
+            snapshot = {
+                'word_vectors': dict(self.word_vectors),
+                'idf_scores': dict(self.idf_scores),
+                'vocabulary': set(self.vocabulary)
+            }
         with open('embeddings.pkl', 'wb') as f:
-            pickle.dump({
-                'word_vectors': self.word_vectors,
-                'idf_scores': self.idf_scores,
-                'vocabulary': self.vocabulary
-            }, f)
+            pickle.dump(snapshot, f)
 
 
 class KnowledgeBase:
@@ -143,9 +199,18 @@ class KnowledgeBase:
     Learns from every interaction
     """
     
-    def __init__(self, embedder: SentenceEmbedder):
+    def __init__(self, embedder: SentenceEmbedder, max_web_entries: int = 500,
+                 web_ttl: float = 24 * 3600):
         self.embedder = embedder
         self.knowledge = []  # List of (text, embedding, metadata)
+        self.revision = 0  # Bumped on every change, used to invalidate caches
+        self._lock = threading.RLock()  # Background learning appends concurrently
+        # Ingested web answers: one per normalized question, oldest evicted
+        # past max_web_entries, and indexed by question word for lookups
+        self.max_web_entries = max_web_entries
+        self.web_ttl = web_ttl  # Freshness of web entries stored without an expires_at
+        self._web = OrderedDict()  # query_key -> knowledge item, oldest first
+        self._web_by_term = defaultdict(set)  # question token -> query_keys
         self.load_or_initialize()
     
     def load_or_initialize(self):
@@ -157,7 +222,11 @@ class KnowledgeBase:
                     text = item['text']
                     embedding = np.array(item['embedding'])
                     metadata = item.get('metadata', {})
+                    if metadata.get('type') == 'web' and not self.is_fresh(metadata):
+                        continue
                     self.knowledge.append((text, embedding, metadata))
+                    self._index_web(self.knowledge[-1])
+            self._evict_web()
         else:
             self._initialize_base_knowledge()
     
@@ -196,21 +265,47 @@ class KnowledgeBase:
     
     def add(self, text: str, metadata: Dict = None):
         """Add knowledge to the base"""
-        embedding = self.embedder.encode(text)
-        if metadata is None:
-            metadata = {}
-        metadata['timestamp'] = datetime.now().isoformat()
-        self.knowledge.append((text, embedding, metadata))
+        self.add_many([text], [metadata])
+    
+    def add_many(self, texts: List[str], metadatas: List[Optional[Dict]] = None):
+        """Add several texts at once with a single batch encode"""
+        if not texts:
+            return
+        if metadatas is None:
+            metadatas = [None] * len(texts)
         
-        # Learn from new text
-        self.embedder.update_from_text(text)
+        embeddings = self.embedder.encode_batch(texts)
+        timestamp = datetime.now().isoformat()
+        with self._lock:
+            for text, embedding, metadata in zip(texts, embeddings, metadatas):
+                metadata = dict(metadata or {})
+                metadata['timestamp'] = timestamp
+                self.knowledge.append((text, embedding, metadata))
+                self._index_web(self.knowledge[-1])
+            self._evict_web()
+            self.revision += len(texts)
+            
+            # Learn from new text
+            for text in texts:
+                self.embedder.update_from_text(text)
     
-    def search(self, query: str, top_k: int = 3) -> List[Tuple[str, float, Dict]]:
-        """Find most relevant knowledge"""
-        query_embedding = self.embedder.encode(query)
+    def search(self, query: str, top_k: int = 3,
+               query_embedding: Optional[np.ndarray] = None) -> List[Tuple[str, float, Dict]]:
+        """
+        Find most relevant knowledge (optionally for a precomputed, context-blended vector)
+        Web answers past their expiry are skipped, they are no longer facts
+        """
+        if query_embedding is None:
+            query_embedding = self.embedder.encode(query)
         
+        with self._lock:
+            knowledge = list(self.knowledge)
+        
+        now = time.time()
         results = []
-        for text, embedding, metadata in self.knowledge:
+        for text, embedding, metadata in knowledge:
+            if metadata.get('type') == 'web' and not self.is_fresh(metadata, now):
+                continue
             similarity = self.embedder.similarity(query_embedding, embedding)
             results.append((text, similarity, metadata))
         
@@ -218,10 +313,76 @@ class KnowledgeBase:
         results.sort(key=lambda x: x[1], reverse=True)
         return results[:top_k]
     
+    @staticmethod
+    def web_key(query: str) -> str:
+        """Normalized question a web answer is stored under"""
+        return ' '.join(query.lower().split())
+    
+    def is_fresh(self, metadata: Dict, now: Optional[float] = None) -> bool:
+        """Whether a web entry is still within its expiry"""
+        now = time.time() if now is None else now
+        expires_at = metadata.get('expires_at')
+        if expires_at is None:
+            try:
+                expires_at = datetime.fromisoformat(metadata['fetched_at']).timestamp() + self.web_ttl
+            except (KeyError, TypeError, ValueError):
+                return False
+        return now < expires_at
+    
+    def _index_web(self, item: Tuple[str, np.ndarray, Dict]):
+        """Index a web answer, replacing the earlier answer to the same question (lock held)"""
+        metadata = item[2]
+        if metadata.get('type') != 'web':
+            return
+        key = metadata.get('query_key') or self.web_key(metadata.get('query', ''))
+        if key in self._web:
+            self._drop_web(key)
+        self._web[key] = item
+        for token in self.embedder.tokenize(key):
+            self._web_by_term[token].add(key)
+    
+    def _drop_web(self, key: str):
+        """Remove a web answer from the index and the knowledge list (lock held)"""
+        item = self._web.pop(key)
+        for token in self.embedder.tokenize(key):
+            keys = self._web_by_term.get(token)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._web_by_term[token]
+        self.knowledge = [entry for entry in self.knowledge if entry is not item]
+    
+    def _evict_web(self):
+        """Drop expired web answers, then the oldest ones beyond max_web_entries (lock held)"""
+        now = time.time()
+        stale = [key for key, item in self._web.items() if not self.is_fresh(item[2], now)]
+        while len(self._web) - len(stale) > self.max_web_entries:
+            stale.append(next(key for key in self._web if key not in stale))
+        for key in stale:
+            self._drop_web(key)
+        if stale:
+            self.revision += 1
+    
+    def web_entries(self, terms) -> List[Tuple[str, Dict]]:
+        """
+        (text, metadata) of fresh web answers to questions sharing a word with
+        terms, newest first; an index lookup, not a scan of the knowledge base
+        """
+        now = time.time()
+        with self._lock:
+            keys = set()
+            for term in terms:
+                keys |= self._web_by_term.get(term, set())
+            items = [self._web[key] for key in keys]
+        items.sort(key=lambda item: item[2].get('timestamp', ''), reverse=True)
+        return [(text, metadata) for text, _, metadata in items if self.is_fresh(metadata, now)]
+    
     def save(self):
         """Save knowledge base to disk"""
         data = []
-        for text, embedding, metadata in self.knowledge:
+        with self._lock:
+            knowledge = list(self.knowledge)
+        for text, embedding, metadata in knowledge:
             data.append({
                 'text': text,
                 'embedding': embedding.tolist(),
@@ -232,6 +393,340 @@ class KnowledgeBase:
             json.dump(data, f, indent=2)
 
 
+class LearningQueue:
+    """
+    Background learning off the response path
+    A worker thread batches pending texts and appends them to the
+    knowledge base with one batch encode, so replies never wait on learning
+    """
+    
+    def __init__(self, knowledge_base: KnowledgeBase, max_batch: int = 32, batch_wait: float = 0.05):
+        self.kb = knowledge_base
+        self.max_batch = max_batch
+        self.batch_wait = batch_wait  # Seconds to wait for more texts before writing a batch
+        self._queue = queue.Queue()
+        self.learned = 0
+        self.batches = 0
+        self._worker = threading.Thread(target=self._run, name="alias-learning", daemon=True)
+        self._worker.start()
+    
+    def submit(self, text: str, metadata: Dict = None):
+        """Queue a text to be learned"""
+        self._queue.put((text, metadata))
+    
+    def _run(self):
+        """Worker loop: collect a batch, then write it in bulk"""
+        while True:
+            item = self._queue.get()
+            if item is None:
+                self._queue.task_done()
+                return
+            
+            batch = [item]
+            stop = False
+            while len(batch) < self.max_batch:
+                try:
+                    item = self._queue.get(timeout=self.batch_wait)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            
+            try:
+                self.kb.add_many([text for text, _ in batch], [metadata for _, metadata in batch])
+                self.learned += len(batch)
+                self.batches += 1
+            except Exception as e:
+                print(f"⚠️  Background learning failed: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            
+            if stop:
+                self._queue.task_done()
+                return
+    
+    def drain(self):
+        """Block until every queued text has been learned"""
+        if self._worker.is_alive():
+            self._queue.join()
+    
+    def shutdown(self):
+        """Learn what is pending, then stop the worker"""
+        if self._worker.is_alive():
+            self._queue.put(None)
+            self._worker.join()
+    
+    def stats(self) -> Dict:
+        """Pending and learned counts"""
+        return {
+            'pending': self._queue.qsize(),
+            'learned': self.learned,
+            'batches': self.batches
+        }
+
+
+class ArithmeticEvaluator:
+    """
+    Safe calculator for arithmetic questions
+    Parses a whitelisted subset of Python expressions with ast,
+    never eval(), so "what is (2.5 + 3) * 4^2" is answered instantly
+    """
+    
+    BINARY_OPERATORS = {
+        ast.Add: operator.add,
+        ast.Sub: operator.sub,
+        ast.Mult: operator.mul,
+        ast.Div: operator.truediv,
+        ast.FloorDiv: operator.floordiv,
+        ast.Pow: operator.pow,
+    }
+    UNARY_OPERATORS = {
+        ast.UAdd: operator.pos,
+        ast.USub: operator.neg,
+    }
+    DISPLAY_SYMBOLS = [('**', '^'), ('*', '×'), ('/', '÷')]
+    
+    MAX_EXPRESSION_LENGTH = 200
+    MAX_EXPONENT = 1000
+    MAX_RESULT_BITS = 100000
+    
+    # Leading question phrases and trailing punctuation around the expression
+    LEAD_IN = re.compile(r"^(?:what\s+is|what's|whats|how\s+much\s+is|calculate|compute|evaluate|solve)\s+")
+    TRAIL = re.compile(r"[\s?!.=]+$")
+    WORD_OPERATORS = [
+        (re.compile(r'\bmultiplied\s+by\b'), '*'),
+        (re.compile(r'\bdivided\s+by\b'), '/'),
+        (re.compile(r'\bto\s+the\s+power\s+of\b'), '**'),
+        (re.compile(r'\bplus\b'), '+'),
+        (re.compile(r'\bminus\b'), '-'),
+        (re.compile(r'\btimes\b'), '*'),
+        (re.compile(r'\bdivided\b'), '/'),
+    ]
+    PERCENT_OF = re.compile(r'(\d+(?:\.\d+)?)\s*(?:%|percent)\s*of\b')
+    PERCENT = re.compile(r'(\d+(?:\.\d+)?)\s*(?:%|percent\b)')
+    TIMES_X = re.compile(r'(?<=[\d)])\s*x\s*(?=[\d(])')
+    ALLOWED_CHARS = re.compile(r'^[\d\s.+\-*/()]+$')
+    # Dates, phone numbers and IDs: digit groups joined by bare hyphens
+    HYPHENATED_DIGITS = re.compile(r'\b\d{4}-\d{1,2}-\d{1,2}\b|\b\d+(?:-\d+){2,}\b')
+    # A message that is nothing but numbers joined by operator symbols, like "2+2"
+    BARE_EXPRESSION = re.compile(r'^[\d\s.()]*\d[\d\s.()]*(?:[-+*/^×÷−]+[\d\s.()]*\d[\d\s.()]*)+$')
+    # ...but not a range or local phone number such as "10-20" or "555-1234"
+    BARE_RANGE = re.compile(r'^\d+-\d+$')
+    
+    def is_calculation_request(self, text: str) -> bool:
+        """
+        A lead-in, an operator word, a question, an '=' or a message that is
+        only an expression marks it as a calculation
+        """
+        return bool(self.LEAD_IN.match(text) or '?' in text or '=' in text or
+                    (self.BARE_EXPRESSION.match(text) and not self.BARE_RANGE.match(text)) or
+                    any(pattern.search(text) for pattern, _ in self.WORD_OPERATORS) or
+                    self.PERCENT_OF.search(text))
+    
+    def extract(self, message: str) -> Optional[str]:
+        """Turn a message into a Python arithmetic expression, or None"""
+        text = message.lower().strip()
+        if len(text) > self.MAX_EXPRESSION_LENGTH or not any(c.isdigit() for c in text):
+            return None
+        if not self.is_calculation_request(text) or self.HYPHENATED_DIGITS.search(text):
+            return None
+        
+        text = self.TRAIL.sub('', self.LEAD_IN.sub('', text))
+        text = text.replace('×', '*').replace('÷', '/').replace('−', '-').replace('^', '**')
+        for pattern, symbol in self.WORD_OPERATORS:
+            text = pattern.sub(f' {symbol} ', text)
+        text = self.PERCENT_OF.sub(r'(\1 / 100) * ', text)
+        text = self.PERCENT.sub(r'(\1 / 100)', text)
+        text = self.TIMES_X.sub(' * ', text)
+        
+        if not self.ALLOWED_CHARS.match(text):
+            return None
+        return ' '.join(text.split())
+    
+    @staticmethod
+    @lru_cache(maxsize=1024)
+    def parse(expression: str) -> Optional[ast.AST]:
+        """Parse an expression once, None unless it contains a real operation"""
+        try:
+            tree = ast.parse(expression, mode='eval')
+        except (SyntaxError, ValueError, RecursionError):
+            return None
+        if not any(isinstance(node, ast.BinOp) for node in ast.walk(tree)):
+            return None  # A bare number like "what is 1" is not a calculation
+        return tree
+    
+    def _evaluate(self, node: ast.AST):
+        """Walk the whitelisted node types"""
+        if isinstance(node, ast.Expression):
+            return self._evaluate(node.body)
+        if isinstance(node, ast.Constant) and type(node.value) in (int, float):
+            return node.value
+        if isinstance(node, ast.UnaryOp) and type(node.op) in self.UNARY_OPERATORS:
+            return self.UNARY_OPERATORS[type(node.op)](self._evaluate(node.operand))
+        if isinstance(node, ast.BinOp) and type(node.op) in self.BINARY_OPERATORS:
+            left = self._evaluate(node.left)
+            right = self._evaluate(node.right)
+            if isinstance(node.op, ast.Pow) and (abs(right) > self.MAX_EXPONENT or
+                    (isinstance(left, int) and abs(left).bit_length() * abs(right) > self.MAX_RESULT_BITS)):
+                raise ValueError("Exponent too large")
+            return self.BINARY_OPERATORS[type(node.op)](left, right)
+        raise ValueError(f"Unsupported expression: {type(node).__name__}")
+    
+    @staticmethod
+    def format_number(value) -> str:
+        """Show whole results without a trailing .0"""
+        if isinstance(value, complex):
+            raise ValueError("Complex result")
+        if isinstance(value, float):
+            if math.isinf(value) or math.isnan(value):
+                raise ValueError("Result out of range")
+            if value.is_integer() and abs(value) < 1e15:
+                return str(int(value))
+            return f"{value:.12g}"
+        return str(value)
+    
+    def answer(self, message: str) -> Optional[str]:
+        """Return "<expression> = <result>" for arithmetic messages, else None"""
+        expression = self.extract(message)
+        if expression is None:
+            return None
+        tree = self.parse(expression)
+        if tree is None:
+            return None
+        
+        display = ast.unparse(tree)
+        for symbol, pretty in self.DISPLAY_SYMBOLS:
+            display = display.replace(symbol, pretty)
+        
+        try:
+            result = self._evaluate(tree)
+            return f"{display} = {self.format_number(result)}"
+        except ZeroDivisionError:
+            return "Cannot divide by zero!"
+        except (ValueError, OverflowError, RecursionError):
+            return None
+
+
+class ConversationMemory:
+    """
+    Bounded memory of recent turns with precomputed vectors
+    Blends recent turns into the query vector so follow-ups like
+    "and who wrote it?" retrieve against the conversation so far
+    """
+    
+    FOLLOW_UP_START = re.compile(r"^(and|but|so|also|what about|how about|then)\b")
+    PRONOUNS = r"(?:it|its|he|she|they|them|him|her|his|their|those|these)"
+    # A pronoun only refers back when it fills a slot: after a question word,
+    # auxiliary, preposition or verb ("when did he", "who wrote it"), or as
+    # the subject of a verb ("it works", "she was")
+    PRONOUN_REFERENCE = re.compile(
+        r"\b(?:what|who|whom|when|where|why|how|which|is|was|are|were|do|does|did|can|could|will|would|"
+        r"has|have|had|about|of|for|with|by|from|wrote|made|built|invented|discovered|founded|tell|explain)"
+        r"(?:\s+\w+)?\s+" + PRONOUNS + r"\b"
+        r"|\b(?:it|he|she|they)\s+(?:is|was|are|were|do|does|did|has|have|had|can|could|will|would|"
+        r"work|works|mean|means|live|lived|die|died)\b"
+    )
+    # Requests to continue the current topic, whole message only ("tell me more", "why?")
+    CONTINUATION = re.compile(
+        r"^(?:(?:please\s+|can you\s+|could you\s+)?(?:tell me more|say more|go on|continue|keep going|"
+        r"elaborate|explain (?:that|further|more)|expand on that|give me an example|more details|more info|more)"
+        r"|why|why not|how so|what else|anything else|for example|for instance|such as|like what|examples?)"
+        r"(?:\s+(?:about|on)\s+(?:it|that|this|them|him|her))?(?:\s+please)?[\s?.!]*$"
+    )
+    # Greetings and acknowledgements never continue the previous topic
+    SMALL_TALK = re.compile(
+        r"^(?:hi|hello|hey|greetings|thanks|thank you|thx|ok|okay|cool|great|nice|awesome|wow|lol|"
+        r"yes|yeah|yep|no|nope|sure|really|bye|goodbye|good (?:morning|afternoon|evening|night)|"
+        r"is that (?:so|right|true)|i see)\b"
+    )
+    
+    def __init__(self, embedder: SentenceEmbedder, max_turns: int = 20, decay: float = 0.6,
+                 follow_up_weight: float = 1.0, spill_path: Optional[str] = None):
+        self.embedder = embedder
+        self.turns = deque(maxlen=max_turns)  # Most recent last
+        self.decay = decay  # Weight multiplier per turn of age
+        self.follow_up_weight = follow_up_weight  # Context strength for follow-ups
+        self.spill_path = spill_path  # Optional archive file that older turns are appended to
+        self.total_turns = 0
+        self._lock = threading.Lock()
+    
+    def __len__(self) -> int:
+        return self.total_turns
+    
+    def is_follow_up(self, message: str) -> bool:
+        """Short messages that lean on earlier turns"""
+        text = message.lower().strip()
+        tokens = self.embedder.tokenize(text)
+        if not tokens or len(tokens) > 8 or self.SMALL_TALK.match(text):
+            return False
+        return bool(self.FOLLOW_UP_START.match(text) or self.PRONOUN_REFERENCE.search(text) or
+                    self.CONTINUATION.match(text))
+    
+    @staticmethod
+    def _unit(vector: np.ndarray) -> np.ndarray:
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+    
+    def context_vector(self, message: str, query_vector: np.ndarray) -> np.ndarray:
+        """
+        For a follow-up, the unit query vector blended with exponentially
+        decayed recent-turn vectors; standalone messages keep their own vector
+        so an empty or unknown-word query cannot retrieve the previous topic
+        """
+        if not self.is_follow_up(message):
+            return query_vector
+        with self._lock:
+            recent = [turn['vector'] for turn in reversed(self.turns)]
+        if not recent:
+            return query_vector
+        
+        blended = self._unit(query_vector).copy()
+        for age, vector in enumerate(recent):
+            if vector.shape == blended.shape:
+                blended += self.follow_up_weight * (self.decay ** age) * vector
+        return self._unit(blended)
+    
+    def resolve(self, message: str) -> str:
+        """Prefix a follow-up with the previous question so rules can see the topic"""
+        with self._lock:
+            previous = self.turns[-1]['message'] if self.turns else None
+        if previous and self.is_follow_up(message):
+            return f"{previous} {message}"
+        return message
+    
+    def add(self, message: str, mode: str, vector: np.ndarray):
+        """Remember a turn; when full the oldest drops out (appended to spill_path if set)"""
+        turn = {
+            'message': message,
+            'timestamp': datetime.now().isoformat(),
+            'mode': mode,
+            'vector': self._unit(np.asarray(vector, dtype=float))
+        }
+        with self._lock:
+            if len(self.turns) == self.turns.maxlen:
+                self._spill(self.turns[0])
+            self.turns.append(turn)
+            self.total_turns += 1
+    
+    def _spill(self, turn: Dict):
+        """Append a turn (without its vector) to the history file"""
+        if not self.spill_path:
+            return
+        try:
+            with open(self.spill_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps({k: v for k, v in turn.items() if k != 'vector'}) + '\n')
+        except OSError as e:
+            print(f"⚠️  Could not save conversation history: {e}")
+    
+    def recent(self, n: int = 5) -> List[Dict]:
+        """The last n turns, oldest first"""
+        with self._lock:
+            return list(self.turns)[-n:]
+
+
 class ResponseGenerator:
     """
     Generate intelligent responses using retrieval and templates
@@ -242,7 +737,10 @@ class ResponseGenerator:
         self.embedder = embedder
         self.kb = knowledge_base
         self.response_templates = self._load_templates()
-        self.conversation_memory = []
+        self.calculator = ArithmeticEvaluator()
+        self.intent_classifier = IntentClassifier.load_or_train() if INTENT_CLASSIFIER_AVAILABLE else None
+        self.learner = None  # Optional LearningQueue, learning is synchronous without one
+        self.conversation_memory = ConversationMemory(embedder)
     
     def _load_templates(self) -> Dict:
         """Load response templates for different contexts"""
@@ -281,6 +779,13 @@ class ResponseGenerator:
     
     def detect_intent(self, message: str) -> str:
         """Detect user intent from message"""
+        if self.intent_classifier is not None:
+            return self.intent_classifier.detect_intent(message)
+        return self.regex_intent(message)
+    
+    @staticmethod
+    def regex_intent(message: str) -> str:
+        """Rule-based intent detection, used when no classifier is available"""
         message_lower = message.lower()
         
         # Greeting patterns
@@ -312,103 +817,124 @@ class ResponseGenerator:
     
     def generate_response(self, message: str, mode: str = "Assistant") -> str:
         """Generate intelligent response"""
-        # Store in conversation memory
-        self.conversation_memory.append({
-            'message': message,
-            'timestamp': datetime.now().isoformat(),
-            'mode': mode
-        })
+        return ''.join(self.generate_response_stream(message, mode))
+    
+    def generate_response_stream(self, message: str, mode: str = "Assistant",
+                                 retrieval: Optional[Dict] = None) -> Iterator[str]:
+        """
+        Generate a response as chunks that are yielded as soon as they are ready
+        The template opener comes first, then retrieved knowledge, then mode context
+        If given, retrieval['confidence'] is set to how well the answer is grounded:
+        1.0 for rule-based answers, else the best knowledge base similarity.
+        retrieval['pending'] is true while chunks have been sent but the
+        knowledge base search that decides the confidence has not run yet
+        """
+        if retrieval is not None:
+            retrieval['confidence'] = 1.0
+        
+        # Blend recent turns into the retrieval vector, then remember this turn
+        message_vector = self.embedder.encode(message)
+        query_vector = self.conversation_memory.context_vector(message, message_vector)
+        resolved_message = self.conversation_memory.resolve(message)
+        self.conversation_memory.add(message, mode, message_vector)
         
         # Detect intent
         intent = self.detect_intent(message)
         topic = self.extract_topic(message)
         
         # Quick direct factual handling for short, specific historic or definition queries
-        # (check before general KB search to ensure direct answers)
-        ml = message.lower()
+        # (check before general KB search to ensure direct answers,
+        # follow-ups are matched together with the previous question)
+        ml = resolved_message.lower()
         
         # Handle ALIAS-related queries and self-identification
         if (re.search(r'\balias\b', ml) and re.search(r'\b(what|stand|mean|is|about|can)\b', ml)) or \
            (re.search(r'\bwho are you\b|\bwhat are you\b|\bidentify yourself\b|\btell me about yourself\b', ml)):
             # Return direct answer about ALIAS
-            return "I'm ALIAS - Advanced Learning Intelligence Assistant System. I'm a free, open-source AI assistant designed to help you with studying, work, creative projects, programming, and personal tasks. I work completely offline and require no API keys or internet connection!"
+            yield "I'm ALIAS - Advanced Learning Intelligence Assistant System. I'm a free, open-source AI assistant designed to help you with studying, work, creative projects, programming, and personal tasks. I work completely offline and require no API keys or internet connection!"
+            return
         
         # Direct factual answers for common questions
         if ('french revolution' in ml) or ('french' in ml and 'king' in ml) or ('king' in ml and 'revolution' in ml) or (('king' in ml or 'kings' in ml) and ('name' in ml)):
-            return "The king during the French Revolution was King Louis XVI (Louis-Auguste)."
+            yield "The king during the French Revolution was King Louis XVI (Louis-Auguste)."
+            return
         
         if 'capital' in ml and 'france' in ml:
-            return "The capital of France is Paris."
+            yield "The capital of France is Paris."
+            return
         
         if ('shakespeare' in ml or 'wrote' in ml or 'author' in ml) and ('romeo' in ml or 'juliet' in ml):
-            return "William Shakespeare wrote Romeo and Juliet around 1594-1596."
+            yield "William Shakespeare wrote Romeo and Juliet around 1594-1596."
+            return
         
         if ('first' in ml and 'president' in ml) or ('washington' in ml and 'president' in ml):
-            return "George Washington was the first president of the United States, serving from 1789 to 1797."
+            yield "George Washington was the first president of the United States, serving from 1789 to 1797."
+            return
         
         if ('photosynthesis' in ml or 'photosynthesize' in ml) and ('what' in ml or 'explain' in ml or 'define' in ml):
-            return "Photosynthesis is the process by which plants use sunlight, water, and carbon dioxide to create oxygen and energy in the form of sugar (glucose)."
+            yield "Photosynthesis is the process by which plants use sunlight, water, and carbon dioxide to create oxygen and energy in the form of sugar (glucose)."
+            return
         
         if 'gravity' in ml and ('what' in ml or 'how' in ml or 'explain' in ml or 'work' in ml):
-            return "Gravity is a fundamental force of nature that attracts objects with mass toward each other. The more massive an object, the stronger its gravitational pull."
+            yield "Gravity is a fundamental force of nature that attracts objects with mass toward each other. The more massive an object, the stronger its gravitational pull."
+            return
         
         if ('what' in ml and 'dna' in ml) or ('dna' in ml and ('explain' in ml or 'define' in ml)):
-            return "DNA (deoxyribonucleic acid) is the molecule that contains the genetic instructions for all living organisms. It's shaped like a double helix and carries hereditary information."
+            yield "DNA (deoxyribonucleic acid) is the molecule that contains the genetic instructions for all living organisms. It's shaped like a double helix and carries hereditary information."
+            return
         
         if ('rain' in ml or 'raining' in ml) and ('cause' in ml or 'why' in ml or 'how' in ml or 'what' in ml):
-            return "Rain is caused when water vapor in the atmosphere condenses into water droplets inside clouds. When these droplets become heavy enough, they fall to Earth as precipitation."
-        
-        # Simple math calculations
-        math_match = re.search(r'what\s+is\s+(\d+)\s*([+\-*/])\s*(\d+)', ml)
-        if math_match:
-            num1, op, num2 = int(math_match.group(1)), math_match.group(2), int(math_match.group(3))
-            if op == '+':
-                result = num1 + num2
-                return f"{num1} + {num2} = {result}"
-            elif op == '-':
-                result = num1 - num2
-                return f"{num1} - {num2} = {result}"
-            elif op == '*' or op == '×':
-                result = num1 * num2
-                return f"{num1} × {num2} = {result}"
-            elif op == '/':
-                if num2 != 0:
-                    result = num1 / num2
-                    return f"{num1} ÷ {num2} = {result}"
-                else:
-                    return "Cannot divide by zero!"
+            yield "Rain is caused when water vapor in the atmosphere condenses into water droplets inside clouds. When these droplets become heavy enough, they fall to Earth as precipitation."
+            return
+        
+        # Arithmetic (floats, parentheses, powers, percentages, word operators)
+        math_answer = self.calculator.answer(message)
+        if math_answer:
+            yield math_answer
+            return
 
         # Quick handling for household/task intents
         if re.search(r"\b(add|create|task|todo|remind|reminder)\b", ml) or re.search(r"\bclean\b|\btidy\b|\bdeclutter\b", ml):
-            return "I can help with that. Do you want me to add it to a to-do list or provide a step-by-step plan?"
-        
-        # Search knowledge base for relevant information
-        relevant_knowledge = self.kb.search(message, top_k=3)
+            yield "I can help with that. Do you want me to add it to a to-do list or provide a step-by-step plan?"
+            return
         
         # Build response
         if intent == 'greeting':
             template = np.random.choice(self.response_templates['greeting'])
-            response = template
+            yield template
         else:
-            # Use template based on intent
+            # Use template based on intent, sent before the KB search runs
             templates = self.response_templates.get(intent, self.response_templates['general'])
             template = np.random.choice(templates)
-            response = template.replace('{topic}', topic)
+            if retrieval is not None:
+                retrieval['pending'] = True
+            yield template.replace('{topic}', topic)
+            
+            # Search knowledge base for relevant information
+            relevant_knowledge = self.kb.search(message, top_k=3, query_embedding=query_vector)
+            if retrieval is not None:
+                retrieval['confidence'] = relevant_knowledge[0][1] if relevant_knowledge else 0.0
+                retrieval['pending'] = False
             
             # Add relevant knowledge if available
             if relevant_knowledge and relevant_knowledge[0][1] > 0.3:  # Similarity threshold
-                response += "\n\n" + relevant_knowledge[0][0]
+                yield "\n\n" + relevant_knowledge[0][0]
         
         # Add mode-specific context
         mode_context = self._get_mode_context(mode, topic)
         if mode_context:
-            response += "\n\n" + mode_context
+            yield "\n\n" + mode_context
         
-        # Learn from this interaction
-        self.kb.add(f"User asked about {topic}: {message[:100]}", 
+        # Learn from this interaction (in the background when a learner is attached)
+        self.learn(f"User asked about {topic}: {message[:100]}",
                    {'type': 'conversation', 'mode': mode})
-        
-        return response
+    
+    def learn(self, text: str, metadata: Dict = None):
+        """Add text to the knowledge base, off the response path if possible"""
+        if self.learner is not None:
+            self.learner.submit(text, metadata)
+        else:
+            self.kb.add(text, metadata)
     
     def _get_mode_context(self, mode: str, topic: str) -> str:
         """Add mode-specific context to response"""
@@ -434,21 +960,61 @@ class WebSearchTool:
         self.headers = {
             'User-Agent': 'ALIAS/1.0 (Educational AI Assistant; https://github.com/daemonw628-ops/ALIAS)'
         }
+        self.http = get_client()
+        self.duckduckgo_url = os.environ.get('ALIAS_DUCKDUCKGO_URL', "https://api.duckduckgo.com/")
         
         # Use enhanced search engine if available, otherwise fall back to DuckDuckGo only
         if ENHANCED_SEARCH_AVAILABLE:
             self.search_engine = FreeSearchEngine()
+            self.cache = self.search_engine.cache  # Shared persistent result cache
             print("✅ Multi-source search engine initialized")
         else:
             self.search_engine = None
+            self.cache = None
             print("ℹ️  Using DuckDuckGo only (install search_engines_api.py for more sources)")
+        self._refreshing = set()
+        self._refreshing_lock = threading.Lock()
     
     def search_duckduckgo(self, query: str) -> Dict[str, str]:
         """Search DuckDuckGo Instant Answer API for information"""
+        if self.cache:
+            cached, fresh = self.cache.get(query, 'duckduckgo')
+            if cached is not None:
+                if not fresh:
+                    self._refresh_duckduckgo(query)
+                return cached
+        
+        return self._fetch_and_cache_duckduckgo(query)
+    
+    def _fetch_and_cache_duckduckgo(self, query: str) -> Dict[str, str]:
+        result = self._fetch_duckduckgo(query)
+        if self.cache and result.get('answer'):
+            self.cache.put(query, 'duckduckgo', result)
+        return result
+    
+    def _refresh_duckduckgo(self, query: str):
+        """Re-fetch a stale cached answer on a background thread (once per query)"""
+        key = ' '.join(query.lower().split())
+        with self._refreshing_lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+        
+        def refresh():
+            try:
+                self._fetch_and_cache_duckduckgo(query)
+            finally:
+                with self._refreshing_lock:
+                    self._refreshing.discard(key)
+        
+        threading.Thread(target=refresh, daemon=True).start()
+    
+    def _fetch_duckduckgo(self, query: str) -> Dict[str, str]:
+        """Query the DuckDuckGo Instant Answer API directly"""
         try:
             # DuckDuckGo Instant Answer API - free, no API key needed, great results
-            api_url = f"https://api.duckduckgo.com/?q={quote(query)}&format=json&no_html=1&skip_disambig=1"
-            response = requests.get(api_url, headers=self.headers, timeout=5)
+            api_url = f"{self.duckduckgo_url}?q={quote(query)}&format=json&no_html=1&skip_disambig=1"
+            response = self.http.get(api_url, 'duckduckgo', headers=self.headers)
             
             if response.status_code != 200:
                 return {'answer': ''}
@@ -497,22 +1063,34 @@ class WebSearchTool:
     
     def search_and_summarize(self, query: str) -> str:
         """Search and return a clean summary using best available source"""
+        return self.format_result(self.search_result(query))
+    
+    def search_result(self, query: str) -> Dict[str, str]:
+        """Structured answer (answer, source, engine) from the best available source"""
         # Use enhanced multi-source search if available
         if self.search_engine:
-            result = self.search_engine.search_and_format(query)
-            if result:
+            result = self.search_engine.search(query)
+            if result.get('answer'):
                 return result
         
         # Fall back to DuckDuckGo
-        result = self.search_duckduckgo(query)
+        return self.search_duckduckgo(query)
+    
+    @staticmethod
+    def format_result(result: Dict[str, str]) -> str:
+        """Render a structured answer for the chat window"""
+        if not result.get('answer'):
+            return ""
         
-        if result.get('answer'):
+        if result.get('engine'):
+            summary = f"[Web Search via {result['engine']}]\n\n{result['answer']}"
+        else:
             summary = f"[Web Search Result]\n\n{result['answer']}"
-            if result.get('source'):
-                summary += f"\n\nSource: {result['source']}"
-            return summary
-        
-        return ""
+        if result.get('source'):
+            summary += f"\n\nSource: {result['source']}"
+        if result.get('note'):
+            summary += f"\n\n💡 {result['note']}"
+        return summary
     
     def set_searchapi_key(self, api_key: str):
         """
@@ -533,6 +1111,314 @@ class WebSearchTool:
         return ["DuckDuckGo Instant Answer (always free)"]
 
 
+class ResponseCache:
+    """
+    Bounded LRU cache of final responses
+    Keyed on normalized message, mode and subject so repeated questions
+    skip the KB search, generation and KB insert entirely
+    """
+    
+    def __init__(self, max_entries: int = 256, web_ttl: float = 900.0, max_kb_drift: int = 100):
+        self.max_entries = max_entries
+        self.web_ttl = web_ttl  # Seconds a web-derived answer stays valid
+        self.max_kb_drift = max_kb_drift  # KB revisions tolerated before an entry is stale
+        self._entries = OrderedDict()  # key -> (response, expires_at, kb_revision)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    @staticmethod
+    def normalize(message: str) -> str:
+        """Lowercase, collapse whitespace and drop trailing punctuation"""
+        text = re.sub(r'\s+', ' ', message.lower()).strip()
+        return text.rstrip('?!. ')
+    
+    def make_key(self, message: str, mode: str, subject: str) -> Tuple[str, str, str]:
+        """Build the cache key for a request"""
+        return (self.normalize(message), mode, subject)
+    
+    def get(self, key: Tuple[str, str, str], kb_revision: int) -> Optional[str]:
+        """Return a cached response, or None if missing, expired or outdated"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            
+            response, expires_at, revision = entry
+            if (expires_at is not None and time.time() >= expires_at) or \
+               kb_revision - revision > self.max_kb_drift:
+                del self._entries[key]
+                self.misses += 1
+                return None
+            
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return response
+    
+    def put(self, key: Tuple[str, str, str], response: str, kb_revision: int, from_web: bool = False,
+            expires_at: Optional[float] = None):
+        """
+        Store a response, evicting the least recently used entries
+        Web answers expire after web_ttl, or at expires_at when promoted from
+        the semantic cache so they keep their original deadline
+        """
+        if from_web and expires_at is None:
+            expires_at = time.time() + self.web_ttl
+        elif not from_web:
+            expires_at = None
+        with self._lock:
+            self._entries[key] = (response, expires_at, kb_revision)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+    
+    def clear(self):
+        """Drop all cached responses"""
+        with self._lock:
+            self._entries.clear()
+    
+    def stats(self) -> Dict:
+        """Hit/miss counters and current size"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'entries': len(self._entries),
+                'evictions': self.evictions
+            }
+
+
+class SemanticResponseCache:
+    """
+    Second-level cache for near-duplicate questions
+    Stores unit query vectors from SentenceEmbedder.encode in one matrix so a
+    lookup is a single matrix-vector product, bounded by a memory budget
+    """
+    
+    # Filler words that don't change what is being asked
+    FILLER_WORDS = {
+        'what', 'whats', 's', 'is', 'are', 'was', 'the', 'a', 'an', 'of', 'me',
+        'define', 'definition', 'meaning', 'mean', 'means', 'does', 'do', 'by',
+        'explain', 'describe', 'tell', 'about', 'please', 'can', 'could',
+        'would', 'you', 'i', 'want', 'to', 'know'
+    }
+    # Negations and quantifiers flip or narrow a question while barely moving
+    # its vector or term overlap, so a hit must have exactly the same ones
+    POLARITY_WORDS = {
+        'not', 'no', 'never', 'none', 'nothing', 'nobody', 'nowhere', 'neither', 'nor',
+        'without', 'cannot', 'all', 'any', 'every', 'each', 'some', 'most', 'few',
+        'many', 'only', 'always'
+    }
+    
+    def __init__(self, embedder: SentenceEmbedder, threshold: float = 0.9,
+                 min_term_overlap: float = 0.6, max_bytes: int = 512 * 1024,
+                 web_ttl: float = 900.0, max_kb_drift: int = 100):
+        self.embedder = embedder
+        self.threshold = threshold  # Minimum cosine similarity for a hit
+        # The word-group embeddings map many topics onto the same few
+        # dimensions, so a hit must also share most of its key terms
+        self.min_term_overlap = min_term_overlap
+        self.max_bytes = max_bytes
+        self.web_ttl = web_ttl
+        self.max_kb_drift = max_kb_drift
+        
+        self._matrix = np.zeros((0, 0), dtype=np.float32)  # Unit query vectors, one per row
+        self._last_used = np.zeros(0, dtype=np.int64)
+        self._entries = []  # Per row: dict with scope, terms, response, expiry, revision, size
+        self._count = 0
+        self._clock = 0
+        self.used_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def key_terms(self, message: str) -> frozenset:
+        """Content words that identify what is being asked ("isn't" keeps a "not")"""
+        tokens = ('not' if t == 't' else t for t in self.embedder.tokenize(message))
+        return frozenset(t for t in tokens if t not in self.FILLER_WORDS)
+    
+    def _unit_vector(self, message: str) -> np.ndarray:
+        """Encode and L2-normalize a query (all zeros if no word is known)"""
+        vector = np.asarray(self.embedder.encode(message), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+    
+    def get(self, message: str, mode: str, subject: str, kb_revision: int) -> Optional[str]:
+        """Return the response of the closest cached question, if close enough"""
+        hit = self.lookup(message, mode, subject, kb_revision)
+        return hit[0] if hit is not None else None
+    
+    def lookup(self, message: str, mode: str, subject: str,
+               kb_revision: int) -> Optional[Tuple[str, Optional[float]]]:
+        """(response, expires_at) of the closest cached question; expires_at is None unless from the web"""
+        vector = self._unit_vector(message)
+        terms = self.key_terms(message)
+        
+        with self._lock:
+            if not terms or self._count == 0 or self._matrix.shape[1] != vector.shape[0]:
+                self.misses += 1
+                return None
+            
+            if vector.any():
+                scores = self._matrix[:self._count] @ vector
+                candidates = np.nonzero(scores >= self.threshold)[0]
+                candidates = candidates[np.argsort(-scores[candidates])]
+            else:
+                # No vector for unseen words, only an identical set of key terms can match
+                candidates = [row for row in range(self._count) if self._entries[row]['terms'] == terms]
+            
+            now = time.time()
+            stale = []
+            match = None
+            for row in candidates:
+                entry = self._entries[row]
+                if entry['scope'] != (mode, subject):
+                    continue
+                if (entry['expires_at'] is not None and now >= entry['expires_at']) or \
+                   kb_revision - entry['revision'] > self.max_kb_drift:
+                    stale.append(row)
+                    continue
+                if terms & self.POLARITY_WORDS != entry['terms'] & self.POLARITY_WORDS:
+                    continue
+                overlap = len(terms & entry['terms']) / len(terms | entry['terms'])
+                if overlap >= self.min_term_overlap:
+                    match = row
+                    break
+            
+            hit = None
+            if match is not None:
+                self._clock += 1
+                self._last_used[match] = self._clock
+                hit = (self._entries[match]['response'], self._entries[match]['expires_at'])
+            
+            # Remove from the end so pending row indices stay valid
+            for row in sorted(stale, reverse=True):
+                self._remove(row)
+            
+            if hit is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return hit
+    
+    def put(self, message: str, mode: str, subject: str, response: str,
+            kb_revision: int, from_web: bool = False):
+        """Cache a response under the query's vector"""
+        vector = self._unit_vector(message)
+        terms = self.key_terms(message)
+        if not terms:
+            return
+        
+        size = vector.nbytes + len(response.encode('utf-8')) + sum(len(t) for t in terms)
+        if size > self.max_bytes:
+            return
+        
+        with self._lock:
+            if self._matrix.shape[1] != vector.shape[0]:
+                # Embedding dimension changed, previous vectors are incomparable
+                self._reset(vector.shape[0])
+            if self._count == self._matrix.shape[0]:
+                self._grow()
+            
+            row = self._count
+            self._matrix[row] = vector
+            self._clock += 1
+            self._last_used[row] = self._clock
+            self._entries.append({
+                'scope': (mode, subject),
+                'terms': terms,
+                'response': response,
+                'expires_at': time.time() + self.web_ttl if from_web else None,
+                'revision': kb_revision,
+                'size': size
+            })
+            self._count += 1
+            self.used_bytes += size
+            
+            # Evict least recently used entries until within budget
+            while self.used_bytes > self.max_bytes:
+                self._remove(int(np.argmin(self._last_used[:self._count])))
+                self.evictions += 1
+    
+    def _reset(self, dimension: int):
+        """Drop everything and start a matrix of the given width"""
+        self._matrix = np.zeros((16, dimension), dtype=np.float32)
+        self._last_used = np.zeros(16, dtype=np.int64)
+        self._entries = []
+        self._count = 0
+        self.used_bytes = 0
+    
+    def _grow(self):
+        """Double matrix capacity"""
+        capacity = max(16, self._matrix.shape[0] * 2)
+        matrix = np.zeros((capacity, self._matrix.shape[1]), dtype=np.float32)
+        matrix[:self._count] = self._matrix[:self._count]
+        last_used = np.zeros(capacity, dtype=np.int64)
+        last_used[:self._count] = self._last_used[:self._count]
+        self._matrix, self._last_used = matrix, last_used
+    
+    def _remove(self, row: int):
+        """Delete a row by moving the last row into its place"""
+        last = self._count - 1
+        self.used_bytes -= self._entries[row]['size']
+        if row != last:
+            self._matrix[row] = self._matrix[last]
+            self._last_used[row] = self._last_used[last]
+            self._entries[row] = self._entries[last]
+        self._entries.pop()
+        self._count -= 1
+    
+    def clear(self):
+        """Drop all cached responses"""
+        with self._lock:
+            self._reset(self._matrix.shape[1])
+    
+    def stats(self) -> Dict:
+        """Hit/miss counters and memory use"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'entries': self._count,
+                'bytes': self.used_bytes,
+                'evictions': self.evictions
+            }
+
+
+class LatencyStats:
+    """Rolling window of latency samples with percentile summaries"""
+    
+    def __init__(self, window: int = 200):
+        self.samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+    
+    def record(self, seconds: float):
+        """Add one sample"""
+        with self._lock:
+            self.samples.append(seconds)
+    
+    def summary(self) -> Dict:
+        """Count, mean, p50 and p95 in milliseconds"""
+        with self._lock:
+            values = np.array(self.samples) * 1000.0
+        if len(values) == 0:
+            return {'count': 0}
+        return {
+            'count': len(values),
+            'mean_ms': float(values.mean()),
+            'p50_ms': float(np.percentile(values, 50)),
+            'p95_ms': float(np.percentile(values, 95))
+        }
+
+
 class FreeAIEngine:
     """
     Complete Free AI Engine
@@ -544,7 +1430,29 @@ class FreeAIEngine:
         self.embedder = SentenceEmbedder()
         self.knowledge_base = KnowledgeBase(self.embedder)
         self.generator = ResponseGenerator(self.embedder, self.knowledge_base)
+        self.learner = LearningQueue(self.knowledge_base)
+        self.generator.learner = self.learner
         self.search_tool = WebSearchTool()
+        if self.search_tool.search_engine and self.generator.intent_classifier is not None:
+            # Spend the last of the SearchApi.io quota only on queries that clearly need the web
+            self.search_tool.search_engine.set_query_scorer(self.generator.intent_classifier.web_probability)
+        if self.search_tool.search_engine:
+            self.search_tool.search_engine.set_passage_scorer(self.passage_similarity)
+        self.response_cache = ResponseCache()
+        self.semantic_cache = SemanticResponseCache(self.embedder)
+        self.web_search_threshold = 0.5  # Minimum classifier probability to search the web
+        # Borderline queries (web probability within speculative_band below the
+        # threshold) are answered locally, with a web search only if that answer is weak
+        self.speculative_search = True
+        self.speculative_band = 0.25
+        self.local_confidence_threshold = 0.6  # Retrieval confidence that skips the web
+        self.web_latency_budget = 1.5  # Seconds to wait for the web when local is unsure
+        self.speculation_outcomes = {'local': 0, 'web': 0, 'timeout': 0}
+        self._speculation_pool = None
+        self.web_match_overlap = 0.75  # Key-term overlap needed to reuse a stored web answer
+        self.web_knowledge_ttl = 24 * 3600  # Freshness of stored web answers without query classes
+        self.first_chunk_latency = LatencyStats()
+        self.response_latency = LatencyStats()
         print("Free AI Engine Ready!")
     
     def get_response(self, message: str, mode: str = "Assistant", subject: str = "General") -> str:
@@ -552,57 +1460,256 @@ class FreeAIEngine:
         Get AI response with web search augmentation
         This is the main method called by ALIAS
         """
+        return ''.join(self.stream_response(message, mode, subject))
+    
+    def stream_response(self, message: str, mode: str = "Assistant", subject: str = "General") -> Iterator[str]:
+        """
+        Stream the response as chunks, each yielded as soon as it is ready
+        Tracks time to first chunk and total response time
+        """
+        start = time.perf_counter()
+        first_chunk = True
         try:
-            ml = message.lower()
-            
-            # Check if query needs web search - for time-sensitive or real-time info
-            search_triggers = [
-                'weather', 'news', 'latest', 'current', 'today', 'now',
-                'price', 'cost', 'stock', 'bitcoin', 'cryptocurrency',
-                'score', 'election', 'breaking', 'happening',
-                'update', 'recent', 'this week', 'this month', 'this year'
-            ]
-            
-            # Common knowledge that should use our direct answers (no web search needed)
-            skip_web_search_terms = [
-                # Basic facts we have built-in
-                'capital of france', 'romeo and juliet', 'shakespeare',
-                'first president', 'george washington', 'photosynthesis',
-                'gravity', 'what is dna', 'causes rain', 'french revolution',
-                # Math patterns
-                'what is 1', 'what is 2', 'what is 3', 'what is 4', 'what is 5',
-                'what is 6', 'what is 7', 'what is 8', 'what is 9',
-                '+ ', '- ', '* ', '/ ', 'plus', 'minus', 'times', 'divided'
-            ]
-            
-            # Only trigger web search for time-sensitive queries
-            needs_search = any(trigger in ml for trigger in search_triggers)
-            
-            # Skip search if it's a query we have direct answers for
-            if any(term in ml for term in skip_web_search_terms):
-                needs_search = False
-            
-            # Skip search for ALIAS-related queries and self-identification (use local knowledge)
-            if (re.search(r'\balias\b', ml) and re.search(r'\b(what|stand|mean|is|about|can)\b', ml)) or \
-               (re.search(r'\bwho are you\b|\bwhat are you\b|\bidentify yourself\b|\btell me about yourself\b', ml)):
-                needs_search = False
-            
-            # Try web search ONLY for time-sensitive info
-            if needs_search:
-                search_result = self.search_tool.search_and_summarize(message)
-                if search_result:
-                    return search_result
-            
-            # Normal AI response (uses knowledge base first, then generates)
-            response = self.generator.generate_response(message, mode)
-            return response
+            for chunk in self._response_chunks(message, mode, subject):
+                if first_chunk:
+                    self.first_chunk_latency.record(time.perf_counter() - start)
+                    first_chunk = False
+                yield chunk
         except Exception as e:
-            return f"I encountered an issue processing that. Could you rephrase your question? (Error: {e})"
+            yield f"I encountered an issue processing that. Could you rephrase your question? (Error: {e})"
+        self.response_latency.record(time.perf_counter() - start)
+    
+    def _response_chunks(self, message: str, mode: str, subject: str) -> Iterator[str]:
+        """The response pipeline: math, caches, web search, then local generation"""
+        # Arithmetic is answered before any cache, KB or web work
+        math_answer = self.generator.calculator.answer(message)
+        if math_answer:
+            self._remember_turn(message, mode)
+            yield math_answer
+            return
+        
+        # Follow-ups depend on the conversation so far and are never cached
+        cache_key = self.response_cache.make_key(message, mode, subject)
+        cacheable = not self.generator.conversation_memory.is_follow_up(message)
+        
+        # Serve repeated questions straight from the response cache
+        cached = self.response_cache.get(cache_key, self.knowledge_base.revision) if cacheable else None
+        if cached is not None:
+            self._remember_turn(message, mode)
+            yield cached
+            return
+        
+        # Then try a differently phrased version of an earlier question
+        hit = self.semantic_cache.lookup(message, mode, subject, self.knowledge_base.revision) if cacheable else None
+        if hit is not None:
+            cached, expires_at = hit
+            # A web answer keeps its original expiry when promoted
+            self.response_cache.put(cache_key, cached, self.knowledge_base.revision,
+                                    from_web=expires_at is not None, expires_at=expires_at)
+            self._remember_turn(message, mode)
+            yield cached
+            return
+        
+        # Answer from a fresh web answer fetched earlier for a similar question
+        stored = self._fresh_web_answer(message) if cacheable else None
+        if stored is not None:
+            self.response_cache.put(cache_key, stored, self.knowledge_base.revision, from_web=True)
+            self._remember_turn(message, mode)
+            yield stored
+            return
+        
+        # Only search the web for time-sensitive info
+        web_probability = None
+        if self.generator.intent_classifier is not None:
+            web_probability = self.generator.intent_classifier.web_probability(message)
+            needs_search = web_probability >= self.web_search_threshold
+        else:
+            needs_search = self.regex_needs_search(message)
+        
+        # Borderline: answer locally, falling back to the web if the local answer is weak
+        if (not needs_search and self.speculative_search and web_probability is not None
+                and web_probability >= self.web_search_threshold - self.speculative_band):
+            yield from self._speculative_chunks(message, mode, subject, cache_key, cacheable)
+            return
+        
+        # Try web search ONLY for time-sensitive info
+        if needs_search:
+            result = self.search_tool.search_result(message)
+            search_result = self.search_tool.format_result(result)
+            if search_result:
+                if cacheable:
+                    self._ingest_web_result(message, result)
+                    self._cache_response(cache_key, message, mode, subject, search_result, from_web=True)
+                self._remember_turn(message, mode)
+                yield search_result
+                return
+        
+        # Normal AI response (uses knowledge base first, then generates)
+        chunks = []
+        for chunk in self.generator.generate_response_stream(message, mode):
+            chunks.append(chunk)
+            yield chunk
+        if cacheable:
+            self._cache_response(cache_key, message, mode, subject, ''.join(chunks))
+    
+    def _remember_turn(self, message: str, mode: str):
+        """Record a turn answered without the generator, so later follow-ups resolve against it"""
+        self.generator.conversation_memory.add(message, mode, self.embedder.encode(message))
+    
+    @staticmethod
+    def regex_needs_search(message: str) -> bool:
+        """Rule-based web search decision, used when no classifier is available"""
+        ml = message.lower()
+        
+        # Check if query needs web search - for time-sensitive or real-time info
+        search_triggers = [
+            'weather', 'news', 'latest', 'current', 'today', 'now',
+            'price', 'cost', 'stock', 'bitcoin', 'cryptocurrency',
+            'score', 'election', 'breaking', 'happening',
+            'update', 'recent', 'this week', 'this month', 'this year'
+        ]
+        
+        # Common knowledge that should use our direct answers (no web search needed)
+        skip_web_search_terms = [
+            # Basic facts we have built-in
+            'capital of france', 'romeo and juliet', 'shakespeare',
+            'first president', 'george washington', 'photosynthesis',
+            'gravity', 'what is dna', 'causes rain', 'french revolution'
+        ]
+        
+        # Only trigger web search for time-sensitive queries
+        needs_search = any(trigger in ml for trigger in search_triggers)
+        
+        # Skip search if it's a query we have direct answers for
+        if any(term in ml for term in skip_web_search_terms):
+            needs_search = False
+        
+        # Skip search for ALIAS-related queries and self-identification (use local knowledge)
+        if (re.search(r'\balias\b', ml) and re.search(r'\b(what|stand|mean|is|about|can)\b', ml)) or \
+           (re.search(r'\bwho are you\b|\bwhat are you\b|\bidentify yourself\b|\btell me about yourself\b', ml)):
+            needs_search = False
+        
+        return needs_search
+    
+    def _cache_response(self, cache_key: Tuple[str, str, str], message: str, mode: str,
+                        subject: str, response: str, from_web: bool = False):
+        """Store a freshly built response in both cache levels"""
+        revision = self.knowledge_base.revision
+        self.response_cache.put(cache_key, response, revision, from_web=from_web)
+        self.semantic_cache.put(message, mode, subject, response, revision, from_web=from_web)
+    
+    def _speculative_chunks(self, message: str, mode: str, subject: str,
+                            cache_key: Tuple[str, str, str], cacheable: bool) -> Iterator[str]:
+        """
+        Generate locally and fall back to the web only when the local answer is weak
+        Local chunks are held only until the knowledge base search has graded
+        them. A confidently grounded answer is then streamed as it is generated
+        and no web search is made, so no quota is spent on a discarded result.
+        Otherwise the web search starts, the rest of the local answer is built
+        meanwhile, and the web answer is used if it arrives within web_latency_budget
+        """
+        start = time.perf_counter()
+        retrieval = {}
+        chunks = self.generator.generate_response_stream(message, mode, retrieval)
+        local_chunks = []
+        for chunk in chunks:
+            local_chunks.append(chunk)
+            if not retrieval.get('pending'):
+                break
+        
+        if retrieval['confidence'] >= self.local_confidence_threshold:
+            self.speculation_outcomes['local'] += 1
+            yield from local_chunks
+            for chunk in chunks:
+                local_chunks.append(chunk)
+                yield chunk
+            if cacheable:
+                self._cache_response(cache_key, message, mode, subject, ''.join(local_chunks))
+            return
+        
+        if self._speculation_pool is None:
+            self._speculation_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix='alias-speculate')
+        web_future = self._speculation_pool.submit(self.search_tool.search_result, message)
+        local_chunks.extend(chunks)  # No I/O, finished while the web request is in flight
+        
+        result = None
+        remaining = self.web_latency_budget - (time.perf_counter() - start)
+        try:
+            result = web_future.result(timeout=max(0.0, remaining))
+        except FutureTimeoutError:
+            self.speculation_outcomes['timeout'] += 1
+            web_future.cancel()
+        except Exception as e:
+            print(f"⚠️  Speculative search failed: {e}")
+        
+        search_result = self.search_tool.format_result(result) if result else ""
+        if search_result:
+            self.speculation_outcomes['web'] += 1
+            if cacheable:
+                self._ingest_web_result(message, result)
+                self._cache_response(cache_key, message, mode, subject, search_result, from_web=True)
+            yield search_result
+            return
+        
+        self.speculation_outcomes['local'] += 1
+        yield from local_chunks
+        if cacheable:
+            self._cache_response(cache_key, message, mode, subject, ''.join(local_chunks))
+    
+    def passage_similarity(self, query: str, passages: List[str]) -> List[float]:
+        """Embedder similarity of each passage to the query (used to pick web snippets)"""
+        query_vector = self.embedder.encode(query)
+        return [self.embedder.similarity(query_vector, vector)
+                for vector in self.embedder.encode_batch(passages)]
+    
+    def _web_ttl(self, query: str) -> float:
+        """How long a web answer to this question stays fresh"""
+        if ENHANCED_SEARCH_AVAILABLE:
+            return QUERY_CLASS_TTLS[classify_query(query)]
+        return self.web_knowledge_ttl
+    
+    def _ingest_web_result(self, message: str, result: Dict[str, str]):
+        """
+        Keep a fetched answer in the knowledge base with its provenance and
+        expiry; it replaces an earlier answer to the same question
+        """
+        self.generator.learn(result['answer'], {
+            'type': 'web',
+            'query': message,
+            'query_key': self.knowledge_base.web_key(message),
+            'source': result.get('source', ''),
+            'engine': result.get('engine', 'DuckDuckGo Instant Answer'),
+            'fetched_at': datetime.now().isoformat(),
+            'expires_at': time.time() + self._web_ttl(message)
+        })
+    
+    def _fresh_web_answer(self, message: str) -> Optional[str]:
+        """
+        Formatted answer from a stored web entry for a similar, still-fresh question
+        Similarity is key-term overlap with the original question; the word
+        embedder cannot tell topics apart reliably enough on its own
+        """
+        terms = self.semantic_cache.key_terms(message)
+        if not terms:
+            return None
+        
+        # Only fresh entries sharing a key term come back from the index
+        for text, metadata in self.knowledge_base.web_entries(terms):
+            stored_terms = self.semantic_cache.key_terms(metadata.get('query', ''))
+            if len(terms & stored_terms) / len(terms | stored_terms) < self.web_match_overlap:
+                continue
+            
+            return self.search_tool.format_result({
+                'answer': text,
+                'source': metadata.get('source', ''),
+                'engine': metadata.get('engine', '')
+            })
+        return None
     
     def learn_from_feedback(self, message: str, response: str, was_helpful: bool):
         """Learn from user feedback"""
         if was_helpful:
-            self.knowledge_base.add(
+            self.generator.learn(
                 f"Q: {message}\nA: {response}",
                 {'type': 'helpful_conversation', 'rating': 'positive'}
             )
@@ -613,16 +1720,29 @@ class FreeAIEngine:
     
     def save_state(self):
         """Save all learned knowledge"""
+        self.learner.drain()
         self.embedder.save()
         self.knowledge_base.save()
         print("AI knowledge saved!")
     
+    def shutdown(self):
+        """Finish pending background learning and stop the worker"""
+        self.learner.shutdown()
+        if self._speculation_pool is not None:
+            self._speculation_pool.shutdown(wait=False, cancel_futures=True)
+    
     def get_stats(self) -> Dict:
         """Get engine statistics"""
         return {
             'vocabulary_size': len(self.embedder.vocabulary),
             'knowledge_items': len(self.knowledge_base.knowledge),
-            'conversations': len(self.generator.conversation_memory)
+            'conversations': len(self.generator.conversation_memory),
+            'response_cache': self.response_cache.stats(),
+            'semantic_cache': self.semantic_cache.stats(),
+            'learning_queue': self.learner.stats(),
+            'first_chunk_latency': self.first_chunk_latency.summary(),
+            'response_latency': self.response_latency.summary(),
+            'speculation': dict(self.speculation_outcomes)
         }
 
 
@@ -17,11 +17,16 @@ import webbrowser
 import subprocess
 import asyncio
 import logging
+import queue
+import importlib.util
 from typing import Optional, List, Dict, Any
-import requests
+from http_client import get_client
+from search_engines_api import EngineHealth
+from ollama_client import OllamaClient, OLLAMA_URL
 from urllib.parse import quote
 import re
 import random
+from collections import deque
 
 # Voice components (optional - will work without if not available)
 try:
@@ -36,12 +41,9 @@ except ImportError:
 # AI backends (try to import what's available)
 AI_BACKENDS = {}
 
-# Try Hugging Face Transformers for local AI
-try:
-    from transformers import pipeline, AutoTokenizer, AutoModelForCausalLM
-    AI_BACKENDS['transformers'] = True
-except ImportError:
-    AI_BACKENDS['transformers'] = False
+# Hugging Face Transformers for local AI; only looked up here, torch and
+# transformers are imported by init_local_model in the background
+AI_BACKENDS['transformers'] = importlib.util.find_spec('transformers') is not None
 
 # Try requests for free online APIs
 AI_BACKENDS['online'] = True
@@ -57,53 +59,290 @@ except ImportError:
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Backend endpoints, overridable to point at local stand-in servers (stand_in_servers.py)
+HF_API_URL = os.environ.get('ALIAS_HF_API_URL', "https://api-inference.huggingface.co/models/")
+GROQ_API_URL = os.environ.get('ALIAS_GROQ_URL', "https://api.groq.com/openai/v1")
+GROQ_MODEL = os.environ.get('GROQ_MODEL', "llama-3.1-8b-instant")
+
+# CPU-optimized local HF inference (hf_local.py); ALIAS_HF_OPTIMIZED=0 uses the plain pipeline
+HF_OPTIMIZED = os.environ.get('ALIAS_HF_OPTIMIZED', '1') != '0'
+
+# Relative answer quality of each backend per mode (0-1), 'default' for the rest
+BACKEND_QUALITY = {
+    'custom_free': {'default': 0.7, 'Assistant': 0.75, 'Study': 0.8, 'Creative': 0.5, 'Fun': 0.55},
+    'groq_free': {'default': 0.9, 'Creative': 0.95, 'Tech': 0.95},
+    'ollama': {'default': 0.85, 'Creative': 0.95, 'Tech': 0.9},
+    'huggingface_local': {'default': 0.45, 'Fun': 0.55},
+    'huggingface_api': {'default': 0.4, 'Fun': 0.5},
+    'patterns': {'default': 0.1},
+}
+
+# Seconds to first response assumed until a backend has its own history
+BACKEND_LATENCY_PRIORS = {
+    'custom_free': 0.1,
+    'groq_free': 1.0,
+    'ollama': 3.0,
+    'huggingface_local': 5.0,
+    'huggingface_api': 4.0,
+    'patterns': 0.001,
+}
+
+
+class BackendRouter:
+    """
+    Chooses the AI backend for each request
+    Every backend keeps answer latency and error stats with a circuit breaker
+    (EngineHealth, as used by the search engines) and, when it has a probe,
+    is re-probed in the background so dead backends are skipped outright and
+    recovered ones rejoin. Backends are ranked per mode by quality minus a
+    latency penalty; fallback backends always come last
+    """
+    
+    def __init__(self, probe_interval=60.0, latency_weight=0.1):
+        self.probe_interval = probe_interval
+        self.latency_weight = latency_weight  # Quality points given up per second of latency
+        self.backends = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+    
+    def register(self, name, probe=None, fallback=False, alive=True):
+        """
+        Add a backend; probe() -> bool says whether it is reachable right now
+        alive=False keeps it out of routing until its first successful probe
+        """
+        with self._lock:
+            self.backends[name] = {
+                'health': EngineHealth(),
+                'probe': probe,
+                'fallback': fallback,
+                'alive': alive,
+                'probe_ms': None,
+                'last_probe': None
+            }
+    
+    def unregister(self, name):
+        with self._lock:
+            self.backends.pop(name, None)
+    
+    def names(self):
+        return list(self.backends)
+    
+    def probe(self, name):
+        """Run one backend's probe and mark it alive or dead"""
+        backend = self.backends.get(name)
+        if backend is None or backend['probe'] is None:
+            return True
+        start = time.perf_counter()
+        try:
+            alive = bool(backend['probe']())
+        except Exception:
+            alive = False
+        if alive != backend['alive']:
+            logger.info(f"Backend {name} is {'up' if alive else 'down'}")
+        backend['alive'] = alive
+        backend['probe_ms'] = (time.perf_counter() - start) * 1000
+        backend['last_probe'] = time.time()
+        return alive
+    
+    def probe_all(self):
+        for name in self.names():
+            self.probe(name)
+    
+    def start(self):
+        """Re-probe every probe_interval seconds in a daemon thread"""
+        if self._thread is not None or not self.probe_interval or self._stop.is_set():
+            return
+        self._thread = threading.Thread(target=self._probe_loop, daemon=True, name='alias-backend-probe')
+        self._thread.start()
+    
+    def _probe_loop(self):
+        while not self._stop.wait(self.probe_interval):
+            self.probe_all()
+    
+    def stop(self):
+        self._stop.set()
+    
+    def record(self, name, outcome, seconds):
+        """Feed one request outcome (answer/empty/error) into the backend's stats"""
+        backend = self.backends.get(name)
+        if backend is not None:
+            backend['health'].record(outcome, seconds)
+    
+    def quality(self, name, mode):
+        scores = BACKEND_QUALITY.get(name, {'default': 0.5})
+        return scores.get(mode, scores['default'])
+    
+    def expected_latency(self, name):
+        """Median time to an answer over the answer rate, or the prior before enough samples"""
+        backend = self.backends.get(name)
+        cost = backend['health'].expected_cost() if backend is not None else None
+        return BACKEND_LATENCY_PRIORS.get(name, 2.0) if cost is None else cost
+    
+    def score(self, name, mode):
+        return self.quality(name, mode) - self.latency_weight * self.expected_latency(name)
+    
+    def claim(self, name):
+        """Take the backend's breaker slot (the half-open trial) right before trying it"""
+        backend = self.backends.get(name)
+        return backend is not None and backend['health'].allow(claim=True)
+    
+    def ranked(self, mode="Assistant"):
+        """Usable backends for a mode, best first; claims nothing, see claim()"""
+        with self._lock:
+            backends = list(self.backends.items())
+        usable = [(name, backend['fallback']) for name, backend in backends
+                  if backend['alive'] and backend['health'].allow(claim=False)]
+        usable.sort(key=lambda item: (item[1], -self.score(item[0], mode)))
+        return [name for name, _ in usable]
+    
+    def stats(self, mode="Assistant"):
+        """Per-backend health, timings and routing score for a mode"""
+        stats = {}
+        for name, backend in list(self.backends.items()):
+            summary = backend['health'].summary()
+            summary.update({
+                'alive': backend['alive'],
+                'probe_ms': backend['probe_ms'],
+                'expected_latency_ms': self.expected_latency(name) * 1000,
+                'quality': self.quality(name, mode),
+                'score': self.score(name, mode)
+            })
+            stats[name] = summary
+        return {'order': self.ranked(mode), 'backends': stats}
+
+
 class FreeAIEngine:
     """Free AI Engine with multiple backends"""
     
-    def __init__(self):
-        self.backends = []
+    def __init__(self, prewarm_connections=True, lazy_backends=False):
+        """
+        lazy_backends=True registers only the instant backends (custom engine
+        and patterns); call start_background_init() to bring up Ollama, the
+        online APIs and the local HF model without blocking the caller
+        """
+        self.router = BackendRouter()
         self.patterns = self.load_pattern_responses()
         self.custom_engine = None
+        self.first_chunk_times = deque(maxlen=100)
+        self.last_first_chunk_time = None
+        self.last_route = None
+        self.http = get_client()
+        self.ollama = OllamaClient(OLLAMA_URL, http=self.http)
+        self.hf_local = None
+        self.backends_ready = threading.Event()
+        self.init_thread = None
         self.initialize_backends()
+        if not lazy_backends:
+            self.initialize_heavy_backends()
+        if prewarm_connections:
+            # Open keep-alive connections to the online backends in the background
+            self.http.prewarm([HF_API_URL, os.environ.get('ALIAS_DUCKDUCKGO_URL', "https://api.duckduckgo.com/")])
         
     def initialize_backends(self):
-        """Initialize available free AI backends"""
+        """Register the backends that can answer immediately"""
         # Try our custom Free AI Engine FIRST (best option)
         if AI_BACKENDS.get('custom_free'):
             try:
                 self.custom_engine = CustomFreeAIEngine()
-                self.backends.append('custom_free')
+                self.router.register('custom_free')
                 logger.info("Custom Free AI Engine loaded - truly free AI active!")
             except Exception as e:
                 logger.warning(f"Custom engine failed: {e}")
         
-        # Try local Hugging Face models
-        if AI_BACKENDS.get('transformers'):
-            try:
-                self.hf_generator = pipeline("text-generation", model="microsoft/DialoGPT-medium")
-                self.backends.append('huggingface_local')
-                logger.info("Local HF model loaded")
-            except Exception as e:
-                logger.warning(f"HF model failed: {e}")
-        
-        # Try Ollama
-        try:
-            response = requests.get("http://localhost:11434/api/tags", timeout=2)
-            if response.status_code == 200:
-                self.backends.append('ollama')
-                logger.info("Ollama detected")
-        except:
-            pass
-        
-        # Free online APIs
-        self.backends.extend(['huggingface_api', 'groq_free'])
-        
         # Always have pattern fallback
-        self.backends.append('patterns')
+        self.router.register('patterns', fallback=True)
         
-        self.current_backend = self.backends[0]
+        self.current_backend = self.router.ranked()[0]
         logger.info(f"Using backend: {self.current_backend}")
     
+    def initialize_heavy_backends(self, progress=None):
+        """
+        Probe Ollama and the online APIs, then load the local HF model
+        Each backend joins routing as soon as it is ready; progress(text) is
+        called before and after every step
+        """
+        report = progress or (lambda text: None)
+        steps = [
+            ('Ollama', self.init_ollama),
+            ('online APIs', self.init_online_apis),
+            ('local Hugging Face model', self.init_local_model),
+        ]
+        for label, step in steps:
+            report(f"Starting {label}...")
+            try:
+                ready = step()
+            except Exception as e:
+                logger.warning(f"{label} failed: {e}")
+                ready = False
+            report(f"{label}: {'ready' if ready else 'not available'}")
+        
+        self.router.start()
+        self.backends_ready.set()
+        names = ', '.join(name.replace('_', ' ').title() for name in self.router.ranked())
+        report(f"FREE ALIAS Online - Backends ready: {names}")
+    
+    def start_background_init(self, progress=None):
+        """Run initialize_heavy_backends on a daemon thread"""
+        if self.init_thread is None:
+            self.init_thread = threading.Thread(target=self.initialize_heavy_backends, args=(progress,),
+                                                daemon=True, name='alias-backend-init')
+            self.init_thread.start()
+        return self.init_thread
+    
+    def init_ollama(self):
+        # Ollama stays registered while down, so it joins once the server starts
+        self.router.register('ollama', probe=self.probe_ollama, alive=False)
+        if self.router.probe('ollama'):
+            logger.info("Ollama detected")
+            return True
+        return False
+    
+    def init_online_apis(self):
+        # Free online APIs; Groq only with an API key
+        self.router.register('huggingface_api', probe=self.probe_huggingface_api, alive=False)
+        ready = self.router.probe('huggingface_api')
+        if os.environ.get('GROQ_API_KEY'):
+            self.router.register('groq_free', probe=self.probe_groq, alive=False)
+            ready = self.router.probe('groq_free') or ready
+        return ready
+    
+    def init_local_model(self):
+        # Try local Hugging Face models
+        if not AI_BACKENDS.get('transformers'):
+            return False
+        from hf_local import LocalGenerator, HF_LOCAL_AVAILABLE, DEFAULT_MODEL as HF_LOCAL_MODEL
+        if HF_LOCAL_AVAILABLE and HF_OPTIMIZED:
+            # int8 weights, pinned threads and every mode prefix cached before the first request
+            self.hf_local = LocalGenerator(HF_LOCAL_MODEL, warm_up=False)
+            self.hf_local.warm_up([self.mode_context(mode) for mode in
+                                   ("Assistant", "Study", "Work", "Creative", "Personal", "Tech", "Fun")])
+            logger.info(f"Local HF model loaded ({self.hf_local.num_threads} threads, "
+                        f"warm-up {self.hf_local.warm_up_seconds:.1f}s)")
+        else:
+            from transformers import pipeline
+            self.hf_generator = pipeline("text-generation", model=HF_LOCAL_MODEL)
+            logger.info("Local HF model loaded")
+        self.router.register('huggingface_local')
+        return True
+    
+    @property
+    def backends(self):
+        """Registered backends"""
+        return self.router.names()
+    
+    def probe_ollama(self):
+        return self.ollama.available()
+    
+    def probe_huggingface_api(self):
+        # 401/404 mean the model is gated or gone, so only a 200 counts as available
+        return self.http.request('HEAD', f"{HF_API_URL}microsoft/DialoGPT-large", 'huggingface_api',
+                                 retry=False, timeout=(2, 2)).status_code == 200
+    
+    def probe_groq(self):
+        return self.http.get(f"{GROQ_API_URL}/models", 'groq', retry=False, timeout=(2, 2),
+                             headers=self.groq_headers()).status_code == 200
+    
     def load_pattern_responses(self):
         """Intelligent pattern responses"""
         return {
@@ -146,25 +385,108 @@ class FreeAIEngine:
     
     def get_response(self, message, mode="Assistant", subject="General"):
         """Get AI response using best available backend"""
-        for backend in self.backends:
+        return ''.join(self.stream_response(message, mode, subject))
+    
+    def stream_response(self, message, mode="Assistant", subject="General", cancel=None, route=None):
+        """
+        Yield response chunks as they are ready, trying backends in routed order
+        Setting the cancel event stops the response between chunks. The chosen
+        backend and timings are filled into route (and left in last_route)
+        """
+        start = time.perf_counter()
+        route = route if route is not None else {}
+        route.update(backend=None, mode=mode, failed=[])
+        self.last_route = route
+        for backend in self.router.ranked(mode):
+            if cancel is not None and cancel.is_set():
+                return
+            if not self.router.claim(backend):
+                continue  # Its half-open trial was taken by another request
+            attempt = time.perf_counter()
             try:
-                if backend == 'custom_free':
-                    return self.get_custom_engine_response(message, mode, subject)
-                elif backend == 'huggingface_local':
-                    return self.get_huggingface_response(message, mode)
-                elif backend == 'ollama':
-                    return self.get_ollama_response(message, mode)
-                elif backend == 'huggingface_api':
-                    return self.get_huggingface_api_response(message, mode)
-                elif backend == 'groq_free':
-                    return self.get_groq_response(message, mode)
-                elif backend == 'patterns':
-                    return self.get_pattern_response(message, mode)
+                chunks = self.get_backend_stream(backend, message, mode, subject, cancel)
+                first_chunk = next(chunks)
+            except StopIteration:
+                self.router.record(backend, 'empty', time.perf_counter() - attempt)
+                continue
             except Exception as e:
                 logger.warning(f"Backend {backend} failed: {e}")
+                self.router.record(backend, 'error', time.perf_counter() - attempt)
+                route['failed'].append(backend)
                 continue
+            
+            # Once a backend has started answering we stay with it
+            now = time.perf_counter()
+            self.router.record(backend, 'answer', now - attempt)
+            self.current_backend = backend
+            route.update(backend=backend, backend_ms=(now - attempt) * 1000, first_chunk_ms=(now - start) * 1000)
+            self.record_first_chunk(now - start)
+            yield first_chunk
+            try:
+                for chunk in chunks:
+                    if cancel is not None and cancel.is_set():
+                        break
+                    yield chunk
+            except Exception as e:
+                logger.warning(f"Backend {backend} failed mid-response: {e}")
+            finally:
+                # Closing a streaming backend drops its connection
+                if hasattr(chunks, 'close'):
+                    chunks.close()
+            route['cancelled'] = cancel is not None and cancel.is_set()
+            route['total_ms'] = (time.perf_counter() - start) * 1000
+            return
         
-        return "I apologize, but I'm having trouble generating a response. Please try again."
+        route['total_ms'] = (time.perf_counter() - start) * 1000
+        yield "I apologize, but I'm having trouble generating a response. Please try again."
+    
+    def get_backend_stream(self, backend, message, mode, subject, cancel=None):
+        """Chunk iterator for one backend (single chunk unless it can stream)"""
+        if backend == 'custom_free':
+            if self.custom_engine is None:
+                raise Exception("Custom engine not available")
+            return self.custom_engine.stream_response(message, mode, subject)
+        elif backend == 'huggingface_local':
+            if self.hf_local is not None:
+                return self.hf_local.stream(message, self.mode_context(mode), cancel)
+            return iter([self.get_huggingface_response(message, mode)])
+        elif backend == 'ollama':
+            return self.ollama.stream(self.ollama_prompt(message, mode), cancel, session=mode)
+        elif backend == 'huggingface_api':
+            return iter([self.get_huggingface_api_response(message, mode)])
+        elif backend == 'groq_free':
+            return iter([self.get_groq_response(message, mode)])
+        elif backend == 'patterns':
+            return iter([self.get_pattern_response(message, mode)])
+        return iter([])
+    
+    def record_first_chunk(self, seconds):
+        """Track time-to-first-token across responses"""
+        self.last_first_chunk_time = seconds
+        self.first_chunk_times.append(seconds)
+    
+    def get_latency_stats(self):
+        """Time-to-first-token summary in milliseconds, overall and for Ollama's token stream"""
+        samples = sorted(self.first_chunk_times)
+        stats = {'count': len(samples), 'ollama': self.ollama.stats()}
+        if samples:
+            stats.update({
+                'last_ms': self.last_first_chunk_time * 1000,
+                'p50_ms': samples[len(samples) // 2] * 1000,
+                'p95_ms': samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1000
+            })
+        return stats
+    
+    def get_backend_stats(self, mode="Assistant"):
+        """Routing order and per-backend health/timings for a mode"""
+        return self.router.stats(mode)
+    
+    def shutdown(self):
+        """Let backends finish background work before exit"""
+        self.router.stop()
+        if self.custom_engine is not None:
+            self.custom_engine.shutdown()
+        self.http.close()
     
     def get_custom_engine_response(self, message, mode, subject):
         """Our custom free AI engine"""
@@ -174,6 +496,8 @@ class FreeAIEngine:
     
     def get_huggingface_response(self, message, mode):
         """Local HF model response"""
+        if self.hf_local is not None:
+            return self.hf_local.generate(message, self.mode_context(mode))
         if not hasattr(self, 'hf_generator'):
             raise Exception("HF model not available")
         
@@ -183,27 +507,47 @@ class FreeAIEngine:
     
     def get_ollama_response(self, message, mode):
         """Ollama local response"""
-        prompt = self.create_mode_prompt(message, mode)
-        response = requests.post("http://localhost:11434/api/generate",
-                               json={"model": "llama2", "prompt": prompt, "stream": False}, timeout=30)
-        if response.status_code == 200:
-            return response.json()['response']
-        raise Exception("Ollama failed")
+        return self.ollama.generate(self.ollama_prompt(message, mode), session=mode)
+    
+    def ollama_prompt(self, message, mode):
+        """Full mode prompt on a session's first turn, then only the new turn on top of its context"""
+        if self.ollama.has_context(mode):
+            return f"\nUser: {message}\nALIAS:"
+        return self.create_mode_prompt(message, mode)
+    
+    def reset_conversation(self):
+        """Forget conversation state kept by backends (Ollama contexts)"""
+        self.ollama.drop_session()
     
     def get_huggingface_api_response(self, message, mode):
         """Free HF Inference API"""
         # Using free models that don't require API keys
-        API_URL = "https://api-inference.huggingface.co/models/microsoft/DialoGPT-large"
-        response = requests.post(API_URL, json={"inputs": message}, timeout=10)
+        API_URL = f"{HF_API_URL}microsoft/DialoGPT-large"
+        response = self.http.post(API_URL, 'huggingface_api', json={"inputs": message})
         if response.status_code == 200:
             result = response.json()
             return result[0]['generated_text'] if result else self.get_pattern_response(message, mode)
         raise Exception("HF API failed")
     
+    def groq_headers(self):
+        return {'Authorization': f"Bearer {os.environ.get('GROQ_API_KEY', '')}"}
+    
     def get_groq_response(self, message, mode):
-        """Groq free tier (if available)"""
-        # Groq offers free API tier - could be implemented
-        raise Exception("Groq not configured")
+        """Groq free tier, OpenAI-compatible chat API (needs GROQ_API_KEY)"""
+        if not os.environ.get('GROQ_API_KEY'):
+            raise Exception("Groq not configured")
+        
+        response = self.http.post(f"{GROQ_API_URL}/chat/completions", 'groq', headers=self.groq_headers(), json={
+            "model": GROQ_MODEL,
+            "messages": [
+                {"role": "system", "content": self.mode_context(mode)},
+                {"role": "user", "content": message}
+            ],
+            "max_tokens": 400
+        })
+        if response.status_code == 200:
+            return response.json()['choices'][0]['message']['content'].strip()
+        raise Exception(f"Groq failed ({response.status_code})")
     
     def get_pattern_response(self, message, mode):
         """Pattern matching response with better fallback"""
@@ -283,8 +627,8 @@ class FreeAIEngine:
 
         return responses.get(mode, responses["Assistant"])
     
-    def create_mode_prompt(self, message, mode):
-        """Create mode-specific prompts"""
+    def mode_context(self, mode):
+        """System instruction for a mode"""
         contexts = {
             "Assistant": "You are ALIAS, a helpful AI assistant. Respond helpfully and professionally.",
             "Study": "You are ALIAS in tutoring mode. Provide clear educational explanations.",
@@ -294,9 +638,11 @@ class FreeAIEngine:
             "Tech": "You are ALIAS in technical mode. Provide programming assistance.",
             "Fun": "You are ALIAS in entertainment mode. Be engaging and helpful."
         }
-        
-        context = contexts.get(mode, contexts["Assistant"])
-        return f"{context}\n\nUser: {message}\nALIAS:"
+        return contexts.get(mode, contexts["Assistant"])
+    
+    def create_mode_prompt(self, message, mode):
+        """Create mode-specific prompts"""
+        return f"{self.mode_context(mode)}\n\nUser: {message}\nALIAS:"
 
 
 class ALIAS:
@@ -309,8 +655,14 @@ class ALIAS:
         """Initialize FREE ALIAS with all capabilities"""
         self.root = tk.Tk()
         
-        # Initialize free AI engine
-        self.ai_engine = FreeAIEngine()
+        # Initialize free AI engine; heavy backends start once the window is up
+        self.ai_engine = FreeAIEngine(lazy_backends=True)
+        
+        # Worker threads hand response events to the Tk main loop through this queue
+        self.response_queue = queue.Queue()
+        self.request_counter = 0
+        self.active_request = None  # (request id, cancel event) of the response in progress
+        self.response_open = False
         
         # Core configuration
         self.conversation_history = []
@@ -341,6 +693,8 @@ class ALIAS:
         
         # Setup GUI (must come after modes are defined)
         self.setup_gui()
+        self.root.after(100, self.start_backend_init)
+        self.root.after(50, self.drain_response_queue)
         
         # Load settings and initialize
         self.load_settings()
@@ -748,6 +1102,13 @@ class ALIAS:
                  width=12,
                  relief='flat').pack()
     
+    def start_backend_init(self):
+        """Bring up the heavy AI backends in the background, reporting in the status bar"""
+        def progress(text):
+            # Called on the init thread; Tk is only touched by drain_response_queue
+            self.response_queue.put(('status', None, text))
+        self.ai_engine.start_background_init(progress)
+    
     def create_status_bar(self):
         """Create the status bar"""
         self.status_bar = tk.Label(self.root, text="FREE ALIAS Online - Zero API costs!", 
@@ -772,23 +1133,54 @@ class ALIAS:
             return
         
         self.input_text.delete(1.0, tk.END)
+        self.cancel_active_request()
         self.add_user_message(message)
+        self.start_request(message)
+    
+    def start_request(self, message):
+        """Answer a message on a worker thread; a newer message cancels it"""
+        self.request_counter += 1
+        cancel = threading.Event()
+        self.active_request = (self.request_counter, cancel)
         
         # Show ALIAS is thinking
         self.status_bar.config(text="ALIAS is processing your request...")
-        self.send_button.config(state='disabled', text="Processing...")
         
         # Process in background
-        threading.Thread(target=self.process_message, args=(message,), daemon=True).start()
+        threading.Thread(target=self.process_message, args=(message, self.request_counter, cancel),
+                         daemon=True).start()
     
-    def process_message(self, message):
-        """Process message with FREE ALIAS AI"""
+    def cancel_active_request(self):
+        """Stop the response still streaming and close it in the chat"""
+        if self.active_request is None:
+            return
+        self.active_request[1].set()
+        self.active_request = None
+        if self.response_open:
+            self.append_ALIAS_response(" [interrupted]")
+            self.end_ALIAS_response()
+    
+    def process_message(self, message, request_id=None, cancel=None):
+        """Process message with FREE ALIAS AI on a worker thread, queueing chunks for the GUI"""
+        post = lambda event, payload=None: self.response_queue.put((event, request_id, payload))
         try:
-            response = self.ai_engine.get_response(message, self.current_mode, self.current_subject)
+            chunks = []
+            route = {}
+            for chunk in self.ai_engine.stream_response(message, self.current_mode, self.current_subject,
+                                                        cancel=cancel, route=route):
+                if not chunks:
+                    post('begin')
+                chunks.append(chunk)
+                post('chunk', chunk)
+            if cancel is not None and cancel.is_set():
+                return
+            response = ''.join(chunks)
             
-            self.root.after(0, lambda: self.add_ALIAS_response(response))
-            self.root.after(0, lambda: self.status_bar.config(text="FREE ALIAS Online - Zero API costs!"))
-            self.root.after(0, lambda: self.send_button.config(state='normal', text="Send\n(Enter)"))
+            status = "FREE ALIAS Online - Zero API costs!"
+            if route.get('backend'):
+                status += (f" ({route['backend'].replace('_', ' ').title()}: first response in "
+                           f"{route['first_chunk_ms']:.0f} ms, total {route['total_ms']:.0f} ms)")
+            post('end', status)
             
             # Speak response if voice is enabled
             if VOICE_AVAILABLE and response:
@@ -797,10 +1189,33 @@ class ALIAS:
             self.messages_sent += 1
             
         except Exception as e:
-            error_msg = f"I apologize, but I encountered an error: {str(e)}"
-            self.root.after(0, lambda: self.add_ALIAS_response(error_msg))
-            self.root.after(0, lambda: self.status_bar.config(text="Error occurred"))
-            self.root.after(0, lambda: self.send_button.config(state='normal', text="Send\n(Enter)"))
+            post('error', f"I apologize, but I encountered an error: {str(e)}")
+    
+    def drain_response_queue(self):
+        """Render queued response events on the Tk main loop, dropping those of cancelled requests"""
+        try:
+            while True:
+                event, request_id, payload = self.response_queue.get_nowait()
+                if event == 'status':
+                    self.status_bar.config(text=payload)
+                    continue
+                if self.active_request is None or request_id != self.active_request[0]:
+                    continue
+                if event == 'begin':
+                    self.begin_ALIAS_response()
+                elif event == 'chunk':
+                    self.append_ALIAS_response(payload)
+                elif event == 'end':
+                    self.end_ALIAS_response()
+                    self.status_bar.config(text=payload)
+                    self.active_request = None
+                elif event == 'error':
+                    self.add_ALIAS_response(payload)
+                    self.status_bar.config(text="Error occurred")
+                    self.active_request = None
+        except queue.Empty:
+            pass
+        self.root.after(30, self.drain_response_queue)
     
     def add_user_message(self, message):
         """Add user message to chat"""
@@ -826,6 +1241,30 @@ class ALIAS:
         self.chat_display.see(tk.END)
         self.chat_display.config(state='disabled')
     
+    def begin_ALIAS_response(self):
+        """Start a streamed ALIAS response in the chat"""
+        self.response_open = True
+        self.chat_display.config(state='normal')
+        
+        timestamp = datetime.datetime.now().strftime("%H:%M:%S")
+        self.chat_display.insert(tk.END, f"[{timestamp}] ", 'timestamp')
+        self.chat_display.insert(tk.END, "FREE ALIAS: ", 'ALIAS')
+        
+        self.chat_display.see(tk.END)
+        self.chat_display.config(state='disabled')
+    
+    def append_ALIAS_response(self, chunk):
+        """Append one chunk to the streamed response"""
+        self.chat_display.config(state='normal')
+        self.chat_display.insert(tk.END, chunk, 'normal')
+        self.chat_display.see(tk.END)
+        self.chat_display.config(state='disabled')
+    
+    def end_ALIAS_response(self):
+        """Finish a streamed response"""
+        self.append_ALIAS_response("\n\n")
+        self.response_open = False
+    
     def add_ALIAS_message(self, message):
         """Add ALIAS system message"""
         self.chat_display.config(state='normal')
@@ -916,6 +1355,7 @@ class ALIAS:
     
     def process_voice_command(self, command):
         """Process a voice command"""
+        self.cancel_active_request()
         self.add_user_message(f"{command}")
         
         # Set to voice mode for appropriate response length
@@ -923,8 +1363,7 @@ class ALIAS:
         self.current_mode = "Voice"
         
         # Process the command
-        self.send_button.config(state='disabled', text="Processing...")
-        threading.Thread(target=self.process_message, args=(command,), daemon=True).start()
+        self.start_request(command)
         
         # Restore original mode
         self.current_mode = original_mode
@@ -1005,6 +1444,7 @@ class ALIAS:
             self.chat_display.config(state='disabled')
             
             self.conversation_history.clear()
+            self.ai_engine.reset_conversation()
             self.add_ALIAS_message("Conversation history cleared. How may I assist you?")
     
     def save_conversation(self):
@@ -1095,7 +1535,8 @@ class ALIAS:
                 fg=self.colors['accent_blue'], 
                 bg=self.colors['bg_primary']).pack(anchor='w', padx=5, pady=5)
         
-        available_backends = ", ".join([b.replace('_', ' ').title() for b in self.ai_engine.backends])
+        available_backends = ", ".join([b.replace('_', ' ').title()
+                                        for b in self.ai_engine.router.ranked(self.current_mode)])
         tk.Label(backend_frame, text=f"Available: {available_backends}", 
                 fg=self.colors['text_secondary'], 
                 bg=self.colors['bg_primary']).pack(anchor='w', padx=5, pady=5)
@@ -1301,6 +1742,7 @@ everywhere, with zero barriers and zero costs.
         self.save_settings()
         if self.is_listening:
             self.stop_voice_listening()
+        self.ai_engine.shutdown()
         self.root.destroy()
     
     def run(self):
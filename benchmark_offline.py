@@ -0,0 +1,255 @@
+"""
+Offline Latency Benchmark for ALIAS
+Runs the search engine and the Ollama/HF backends against the local stand-in
+servers (stand_in_servers.py) with injected latency, errors and rate limits,
+so fallback, hedging and caching can be compared reproducibly without network
+
+Usage:  python benchmark_offline.py [--queries 30] [--json results.json]
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from stand_in_servers import StandInServer
+from search_engines_api import FreeSearchEngine, TokenBucket
+from http_client import get_client
+from ollama_client import OllamaClient
+
+SEARCHAPI_KEY = 'test-key'
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    """p50/p95/max in milliseconds"""
+    if not samples:
+        return {'n': 0, 'p50_ms': 0.0, 'p95_ms': 0.0, 'max_ms': 0.0}
+    ordered = sorted(samples)
+    p95 = ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))]
+    return {
+        'n': len(ordered),
+        'p50_ms': round(statistics.median(ordered) * 1000, 1),
+        'p95_ms': round(p95 * 1000, 1),
+        'max_ms': round(ordered[-1] * 1000, 1)
+    }
+
+
+def make_engine(server: StandInServer, workdir: str, mode: str = 'hedged',
+                cache: bool = False, adaptive: bool = False) -> FreeSearchEngine:
+    """
+    FreeSearchEngine wired to the stand-ins with only the two JSON providers,
+    SearchApi.io as the primary and DuckDuckGo as the fallback
+    """
+    cache_path = os.path.join(workdir, f'cache_{mode}_{time.monotonic_ns()}.db') if cache else None
+    engine = FreeSearchEngine(cache_path=cache_path, quota_path=None, local_index_path=None)
+    engine.duckduckgo_url = server.urls['duckduckgo']
+    engine.searchapi_url = server.urls['searchapi']
+    engine.searchapi_quota.monthly_limit = 1_000_000
+    engine.searchapi_rate = TokenBucket(rate=1000.0, capacity=1000.0)  # Let the stand-in enforce limits
+    engine.set_searchapi_key(SEARCHAPI_KEY)
+    engine.engines = ['searchapi', 'duckduckgo']
+    engine.search_mode = mode
+    engine.adaptive_order = adaptive
+    return engine
+
+
+def run_queries(engine: FreeSearchEngine, queries: List[str]) -> Dict:
+    latencies, answered = [], 0
+    for query in queries:
+        start = time.perf_counter()
+        result = engine.search(query)
+        latencies.append(time.perf_counter() - start)
+        answered += bool(result.get('answer'))
+    stats = percentiles(latencies)
+    stats['answered'] = answered
+    stats['wins'] = dict(engine.wins)
+    return stats
+
+
+def bench_modes(server: StandInServer, workdir: str, queries: List[str]) -> Dict:
+    """Slow, flaky primary vs a steady secondary under each search mode"""
+    server.set_behavior('searchapi', latency=0.25, jitter=0.5, error_rate=0.1)
+    server.set_behavior('ddg', latency=0.08, jitter=0.04)
+    results = {}
+    for mode in ('sequential', 'parallel', 'hedged'):
+        results[mode] = run_queries(make_engine(server, workdir, mode), queries)
+    results['adaptive'] = run_queries(make_engine(server, workdir, 'hedged', adaptive=True), queries)
+    return results
+
+
+def bench_fallback(server: StandInServer, workdir: str, queries: List[str]) -> Dict:
+    """Primary down with 503s: the circuit breaker should stop paying for it"""
+    server.set_behavior('searchapi', latency=0.2, error_rate=1.0)
+    server.set_behavior('ddg', latency=0.05)
+    engine = make_engine(server, workdir, 'sequential')
+    before = server.hits['searchapi']
+    stats = run_queries(engine, queries)
+    stats['primary_requests'] = server.hits['searchapi'] - before
+    stats['breaker'] = engine.get_engine_stats()['engines']['searchapi'].get('state')
+    return stats
+
+
+def bench_rate_limit(server: StandInServer, workdir: str, queries: List[str]) -> Dict:
+    """Primary answering 429 beyond 2 requests/s"""
+    server.set_behavior('searchapi', latency=0.05, rate_limit=2)
+    server.set_behavior('ddg', latency=0.1)
+    engine = make_engine(server, workdir, 'hedged')
+    return run_queries(engine, queries)
+
+
+def bench_cache(server: StandInServer, workdir: str, queries: List[str]) -> Dict:
+    """Cold pass, then the same queries again from the persistent cache"""
+    server.set_behavior('searchapi', latency=0.15)
+    server.set_behavior('ddg', latency=0.15)
+    engine = make_engine(server, workdir, 'hedged', cache=True)
+    return {'cold': run_queries(engine, queries), 'warm': run_queries(engine, queries)}
+
+
+def bench_single_flight(server: StandInServer, workdir: str, callers: int = 16) -> Dict:
+    """Many concurrent callers asking the same query share one upstream request"""
+    server.set_behavior('searchapi', latency=0.3)
+    server.set_behavior('ddg', latency=0.3)
+    engine = make_engine(server, workdir, 'sequential')
+    before = server.hits['searchapi'] + server.hits['ddg']
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=callers) as pool:
+        answers = list(pool.map(lambda _: engine.search('who was albert einstein'), range(callers)))
+    return {
+        'callers': callers,
+        'upstream_requests': server.hits['searchapi'] + server.hits['ddg'] - before,
+        'coalesced': engine.coalesced,
+        'answered': sum(bool(a.get('answer')) for a in answers),
+        'wall_ms': round((time.perf_counter() - start) * 1000, 1)
+    }
+
+
+def bench_ollama_stream(server: StandInServer, runs: int = 5) -> Dict:
+    """Time to first token vs full response for the NDJSON /api/generate stream"""
+    server.set_behavior('ollama_generate', latency=0.1)
+    client = OllamaClient(server.urls['ollama'])
+    total = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        client.generate('User: what is python programming\nALIAS:')
+        total.append(time.perf_counter() - start)
+    return {'ttft': percentiles(list(client.first_token_times)), 'total': percentiles(total)}
+
+
+def bench_ollama_context(server: StandInServer, turns: int = 5) -> Dict:
+    """
+    Multi-turn chat in three arms: a fresh mode prompt every turn with the
+    model unloaded between turns (keep_alive=0), the same fresh prompts with
+    the model kept resident, and one resident session reusing its context.
+    fresh vs resident is the reload cost, resident vs session the context reuse
+    """
+    server.set_behavior('ollama_generate', latency=0.0)
+    server.prompt_token_delay, server.load_delay = 0.01, 0.3
+    system = "You are ALIAS, a helpful AI assistant. Respond helpfully and professionally.\n\n"
+    messages = ['what is python programming', 'who was albert einstein', 'what is the capital of japan']
+    results = {}
+    for label, keep_alive, session in (('fresh', 0, None), ('resident', '30m', None), ('session', '30m', 'chat')):
+        server.model_loaded_until = 0.0
+        client = OllamaClient(server.urls['ollama'], keep_alive=keep_alive)
+        latencies, prompt_tokens = [], []
+        for turn in range(turns):
+            message = messages[turn % len(messages)]
+            prompt = f"\nUser: {message}\nALIAS:" if client.has_context('chat') else f"{system}User: {message}\nALIAS:"
+            start = time.perf_counter()
+            client.generate(prompt, session=session)
+            latencies.append(time.perf_counter() - start)
+            prompt_tokens.append(client.last_stats['prompt_eval_count'])
+        results[label] = dict(percentiles(latencies), prompt_tokens=prompt_tokens)
+    server.prompt_token_delay, server.load_delay = 0.0, 0.0
+    return results
+
+
+def bench_huggingface(server: StandInServer, runs: int = 10) -> Dict:
+    """HF inference endpoint with a 30% error rate"""
+    server.set_behavior('hf', latency=0.1, jitter=0.1, error_rate=0.3)
+    http = get_client()
+    latencies, ok = [], 0
+    for _ in range(runs):
+        start = time.perf_counter()
+        response = http.post(f"{server.urls['huggingface']}gpt2", 'huggingface_api',
+                             json={'inputs': 'what is the capital of japan'})
+        latencies.append(time.perf_counter() - start)
+        ok += response.status_code == 200
+    stats = percentiles(latencies)
+    stats['ok'] = ok
+    return stats
+
+
+def run_benchmarks(n_queries: int = 30, seed: Optional[int] = 0) -> Dict:
+    if seed is not None:
+        import random
+        random.seed(seed)
+    queries = [f"benchmark query number {i}" for i in range(n_queries)]
+    workdir = tempfile.mkdtemp(prefix='alias_bench_')
+    try:
+        with StandInServer() as server:
+            return {
+                'modes': bench_modes(server, workdir, queries),
+                'fallback': bench_fallback(server, workdir, queries),
+                'rate_limit': bench_rate_limit(server, workdir, queries),
+                'cache': bench_cache(server, workdir, queries),
+                'single_flight': bench_single_flight(server, workdir),
+                'ollama_stream': bench_ollama_stream(server),
+                'ollama_context': bench_ollama_context(server),
+                'huggingface': bench_huggingface(server),
+                'hits': dict(server.hits)
+            }
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def print_report(results: Dict):
+    def row(name, stats):
+        extra = {k: v for k, v in stats.items() if not k.endswith('_ms') and k != 'n'}
+        print(f"  {name:<12} p50 {stats['p50_ms']:7.1f}ms  p95 {stats['p95_ms']:7.1f}ms  {extra}")
+    
+    print("\nSearch modes (flaky slow primary, steady secondary):")
+    for mode, stats in results['modes'].items():
+        row(mode, stats)
+    print("\nFallback (primary returning 503):")
+    row('sequential', results['fallback'])
+    print("\nRate-limited primary (2 req/s):")
+    row('hedged', results['rate_limit'])
+    print("\nCache:")
+    row('cold', results['cache']['cold'])
+    row('warm', results['cache']['warm'])
+    print(f"\nSingle-flight: {results['single_flight']}")
+    print("\nOllama stream:")
+    row('ttft', results['ollama_stream']['ttft'])
+    row('total', results['ollama_stream']['total'])
+    print("\nOllama multi-turn (fresh + unload, fresh + keep_alive, session context + keep_alive):")
+    for label, stats in results['ollama_context'].items():
+        row(label, stats)
+    print("\nHugging Face (30% errors):")
+    row('post', results['huggingface'])
+    print(f"\nStand-in hits: {results['hits']}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="ALIAS offline latency benchmark")
+    parser.add_argument('--queries', type=int, default=30, help='Distinct queries per scenario')
+    parser.add_argument('--json', help='Also write the raw results to this file')
+    args = parser.parse_args(argv)
+    
+    start = time.perf_counter()
+    results = run_benchmarks(args.queries)
+    print_report(results)
+    print(f"\nFinished in {time.perf_counter() - start:.1f}s")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,315 @@
+"""
+CPU-Optimized Local Hugging Face Inference for ALIAS
+Runs DialoGPT (or another causal LM) on CPU-only machines:
+
+  - dynamic int8 quantization of the linear layers (GPT-2's Conv1D layers are
+    converted to nn.Linear first, otherwise only lm_head would be quantized)
+  - the mode prompt prefix is run once per mode and its past_key_values are
+    reused for every turn, so only the user's message is processed per request
+  - pinned intra-op thread count and a one-time warm-up at load
+  - token-by-token streaming with time-to-first-token tracking
+
+Benchmark against the plain pipeline:  python hf_local.py --runs 5
+"""
+
+import os
+import sys
+import copy
+import time
+import argparse
+import threading
+import logging
+from collections import deque
+from typing import Dict, Iterator, List, Optional
+
+try:
+    import torch
+    from transformers import AutoTokenizer, AutoModelForCausalLM
+    HF_LOCAL_AVAILABLE = True
+except ImportError:
+    HF_LOCAL_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = os.environ.get('ALIAS_HF_MODEL', "microsoft/DialoGPT-medium")
+
+WARM_UP_CONTEXT = "You are ALIAS, a helpful AI assistant. Respond helpfully and professionally."
+
+STOP_TEXT = "\nUser"  # The model starting the next user turn
+
+
+def default_threads() -> int:
+    """CPUs this process may run on; ALIAS_HF_THREADS overrides"""
+    if os.environ.get('ALIAS_HF_THREADS'):
+        return max(1, int(os.environ['ALIAS_HF_THREADS']))
+    if hasattr(os, 'sched_getaffinity'):
+        return max(1, len(os.sched_getaffinity(0)))
+    return max(1, os.cpu_count() or 1)
+
+
+def conv1d_to_linear(model) -> int:
+    """
+    Replace transformers' Conv1D (GPT-2 style, weight stored as in x out) with
+    equivalent nn.Linear modules so dynamic quantization can pick them up
+    """
+    try:
+        from transformers.pytorch_utils import Conv1D
+    except ImportError:
+        from transformers.modeling_utils import Conv1D
+    
+    replaced = 0
+    for parent in list(model.modules()):
+        for name, child in list(parent.named_children()):
+            if isinstance(child, Conv1D):
+                n_in, n_out = child.weight.shape
+                linear = torch.nn.Linear(n_in, n_out)
+                linear.weight.data = child.weight.data.t().contiguous()
+                linear.bias.data = child.bias.data
+                setattr(parent, name, linear)
+                replaced += 1
+    return replaced
+
+
+class LocalGenerator:
+    """
+    Streaming CPU text generation with a cached mode-prompt prefix
+    Prompts follow FreeAIEngine.create_mode_prompt: the "<context>\\n\\nUser:"
+    prefix is cached per mode and only " <message>\\nALIAS:" runs per request
+    """
+    
+    def __init__(self, model_name: str = DEFAULT_MODEL, quantize: bool = True,
+                 num_threads: Optional[int] = None, max_new_tokens: int = 60,
+                 temperature: float = 0.7, top_k: int = 50, warm_up: bool = True):
+        if not HF_LOCAL_AVAILABLE:
+            raise ImportError("transformers and torch are required for local inference")
+        
+        self.num_threads = num_threads or default_threads()
+        torch.set_num_threads(self.num_threads)
+        try:
+            torch.set_num_interop_threads(1)
+        except RuntimeError:
+            pass  # Only settable before the first parallel op in the process
+        
+        start = time.perf_counter()
+        self.model_name = model_name
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        model = AutoModelForCausalLM.from_pretrained(model_name)
+        model.eval()
+        self.quantized = False
+        if quantize:
+            converted = conv1d_to_linear(model)
+            model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+            self.quantized = True
+            logger.info(f"Quantized {converted} Conv1D + linear layers to int8")
+        self.model = model
+        
+        self.max_new_tokens = max_new_tokens
+        self.temperature = temperature
+        self.top_k = top_k
+        self.eos_token_id = self.tokenizer.eos_token_id
+        self.prefixes = {}  # context -> (prefix length, past_key_values)
+        self.first_token_times = deque(maxlen=100)
+        self.last_stats = None
+        self._lock = threading.Lock()  # One forward pass at a time; never held across a yield
+        self.load_seconds = time.perf_counter() - start
+        
+        self.warm_up_seconds = None
+        if warm_up:
+            self.warm_up()
+    
+    def warm_up(self, contexts: Optional[List[str]] = None):
+        """Allocate and run every kernel once, and cache the given mode prefixes"""
+        start = time.perf_counter()
+        for context in contexts or [WARM_UP_CONTEXT]:
+            self.prefix_cache(context)
+        for _ in self.stream("hello", WARM_UP_CONTEXT, max_new_tokens=2):
+            pass
+        self.first_token_times.clear()
+        self.warm_up_seconds = time.perf_counter() - start
+    
+    def prefix_cache(self, context: str):
+        """(length, past_key_values) for a mode prefix, computed once"""
+        cached = self.prefixes.get(context)
+        if cached is None:
+            ids = self.tokenizer.encode(f"{context}\n\nUser:", return_tensors='pt')
+            with self._lock, torch.inference_mode():
+                cached = self.prefixes.get(context)
+                if cached is None:
+                    out = self.model(input_ids=ids, use_cache=True)
+                    cached = (ids.shape[1], out.past_key_values)
+                    self.prefixes[context] = cached
+        return cached
+    
+    @staticmethod
+    def copy_cache(past):
+        """
+        Cache objects (DynamicCache) are extended in place by the forward pass,
+        so each request works on a copy; legacy tuples are never mutated
+        """
+        if isinstance(past, tuple):
+            return past
+        return copy.deepcopy(past)
+    
+    def next_token(self, logits) -> int:
+        if self.temperature <= 0:
+            return int(torch.argmax(logits, dim=-1))
+        logits = logits / self.temperature
+        if self.top_k:
+            values, indices = torch.topk(logits, min(self.top_k, logits.shape[-1]))
+            probs = torch.softmax(values, dim=-1)
+            return int(indices[0, torch.multinomial(probs, 1)[0, 0]])
+        return int(torch.multinomial(torch.softmax(logits, dim=-1), 1)[0, 0])
+    
+    @staticmethod
+    def partial_stop(text: str) -> int:
+        """Length of a trailing prefix of STOP_TEXT ("\n", "\nU", ...) that must wait for more tokens"""
+        for size in range(min(len(STOP_TEXT) - 1, len(text)), 0, -1):
+            if text.endswith(STOP_TEXT[:size]):
+                return size
+        return 0
+    
+    def stream(self, message: str, context: str, cancel: Optional[threading.Event] = None,
+               max_new_tokens: Optional[int] = None) -> Iterator[str]:
+        """
+        Yield text pieces as tokens are generated; stops at EOS or the next "User:" turn
+        Only the forward passes hold the model lock, so a caller that stops
+        iterating early never blocks other requests
+        """
+        max_new_tokens = max_new_tokens or self.max_new_tokens
+        start = time.perf_counter()
+        prefix_len, prefix_past = self.prefix_cache(context)
+        past = self.copy_cache(prefix_past)
+        input_ids = self.tokenizer.encode(f" {message}\nALIAS:", return_tensors='pt')
+        prompt_tokens = prefix_len + input_ids.shape[1]
+        
+        generated, text, emitted, first, stopped = [], '', '', None, False
+        for _ in range(max_new_tokens):
+            if cancel is not None and cancel.is_set():
+                stopped = True
+                break
+            with self._lock, torch.inference_mode():
+                out = self.model(input_ids=input_ids, past_key_values=past, use_cache=True)
+                token = self.next_token(out.logits[:, -1, :])
+            past = out.past_key_values
+            if token == self.eos_token_id:
+                break
+            generated.append(token)
+            input_ids = torch.tensor([[token]])
+            text = self.tokenizer.decode(generated, skip_special_tokens=True).lstrip()
+            if STOP_TEXT in text:
+                text, stopped = text[:text.index(STOP_TEXT)], True
+            elif text.endswith('\ufffd'):
+                continue  # Hold back a partly decoded multi-byte character
+            ready = text if stopped else text[:len(text) - self.partial_stop(text)]
+            piece = ready[len(emitted):]
+            if piece:
+                if first is None:
+                    first = time.perf_counter() - start
+                    self.first_token_times.append(first)
+                emitted = ready
+                yield piece
+            if stopped:
+                break
+        
+        if not stopped:
+            # Out of tokens or at EOS: a held-back "\n" or "\nUs" was just text
+            piece = text.rstrip('\ufffd')[len(emitted):]
+            if piece:
+                yield piece
+        
+        total = time.perf_counter() - start
+        self.last_stats = {
+            'prompt_tokens': prompt_tokens,
+            'cached_prefix_tokens': prefix_len,
+            'new_tokens': len(generated),
+            'first_token_ms': first * 1000 if first is not None else None,
+            'total_ms': total * 1000,
+            'tokens_per_second': len(generated) / total if total > 0 else 0.0
+        }
+    
+    def generate(self, message: str, context: str) -> str:
+        return ''.join(self.stream(message, context)).strip()
+    
+    def stats(self) -> Dict:
+        """Load/warm-up times, thread count and time-to-first-token summary"""
+        samples = sorted(self.first_token_times)
+        stats = {
+            'model': self.model_name,
+            'quantized': self.quantized,
+            'threads': self.num_threads,
+            'load_seconds': self.load_seconds,
+            'warm_up_seconds': self.warm_up_seconds,
+            'cached_prefixes': len(self.prefixes),
+            'last': self.last_stats
+        }
+        if samples:
+            stats['first_token_p50_ms'] = samples[len(samples) // 2] * 1000
+            stats['first_token_p95_ms'] = samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1000
+        return stats
+
+
+def benchmark(model_name: str = DEFAULT_MODEL, runs: int = 5, messages: Optional[List[str]] = None) -> Dict:
+    """
+    Tokens/s and first-token latency: the current pipeline path (nothing shown
+    until the whole completion is done) vs LocalGenerator with and without int8
+    """
+    from transformers import pipeline
+    
+    messages = messages or ["Can you help me learn Python?", "Tell me a joke", "What should I cook tonight?"]
+    prompts = [(messages[i % len(messages)], WARM_UP_CONTEXT) for i in range(runs)]
+    results = {}
+    
+    generator = pipeline("text-generation", model=model_name)
+    tokenizer = generator.tokenizer
+    latencies, rates = [], []
+    for message, context in prompts:
+        prompt = f"{context}\n\nUser: {message}\nALIAS:"
+        start = time.perf_counter()
+        output = generator(prompt, max_length=150, temperature=0.7, do_sample=True,
+                           pad_token_id=tokenizer.eos_token_id)
+        seconds = time.perf_counter() - start
+        new_tokens = len(tokenizer.encode(output[0]['generated_text'])) - len(tokenizer.encode(prompt))
+        latencies.append(seconds)
+        rates.append(max(new_tokens, 0) / seconds)
+    results['pipeline'] = {
+        'first_token_ms': 1000 * sorted(latencies)[len(latencies) // 2],
+        'tokens_per_second': sorted(rates)[len(rates) // 2]
+    }
+    del generator
+    
+    for label, quantize in (('fp32_prefix_cache', False), ('int8_prefix_cache', True)):
+        local = LocalGenerator(model_name, quantize=quantize)
+        rates = []
+        for message, context in prompts:
+            local.generate(message, context)
+            rates.append(local.last_stats['tokens_per_second'])
+        stats = local.stats()
+        results[label] = {
+            'first_token_ms': stats.get('first_token_p50_ms'),
+            'tokens_per_second': sorted(rates)[len(rates) // 2],
+            'load_seconds': stats['load_seconds'],
+            'warm_up_seconds': stats['warm_up_seconds']
+        }
+        del local
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark ALIAS local Hugging Face inference on CPU")
+    parser.add_argument('--model', default=DEFAULT_MODEL)
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args(argv)
+    
+    if not HF_LOCAL_AVAILABLE:
+        print("transformers and torch are required: pip install transformers torch")
+        return 1
+    
+    print(f"Benchmarking {args.model} on {default_threads()} threads...")
+    for label, stats in benchmark(args.model, args.runs).items():
+        print(f"  {label:<18} first token {stats['first_token_ms'] or 0:8.0f} ms   "
+              f"{stats['tokens_per_second']:6.1f} tokens/s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,173 @@
+"""
+Shared HTTP Client for ALIAS
+Pooled keep-alive sessions per host with retries and per-endpoint timeouts
+Used by the search engines, the web search tool and the chat backends
+"""
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from urllib.parse import urlsplit
+from typing import Dict, List, Optional, Tuple
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# (connect, read) timeouts in seconds for each outbound endpoint
+ENDPOINT_TIMEOUTS = {
+    'duckduckgo': (3.05, 5),
+    'searchapi': (3.05, 10),
+    'ollama_tags': (1, 2),
+    'ollama_generate': (2, 30),
+    'huggingface_api': (3.05, 10),
+    'groq': (3.05, 30),
+    'page_fetch': (3.05, 5),
+    'default': (3.05, 10),
+}
+
+# Endpoints billed per request that reaches the server: only connection
+# failures (nothing was sent) are retried, never error responses
+METERED_ENDPOINTS = {'searchapi'}
+
+
+class HttpClient:
+    """
+    One requests.Session per host so TCP/TLS connections are reused across calls
+    Idempotent requests are retried with exponential backoff on connection
+    errors and transient 5xx responses; POSTs are only retried when the
+    connection could not be made. 429s are returned at once so callers can
+    fall back instead of sleeping on Retry-After, and metered endpoints only
+    retry connection failures
+    """
+    
+    def __init__(self, pool_size: int = 8, retries: int = 2, backoff_factor: float = 0.3,
+                 timeouts: Optional[Dict[str, Tuple[float, float]]] = None):
+        self.pool_size = pool_size
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.timeouts = dict(ENDPOINT_TIMEOUTS)
+        if timeouts:
+            self.timeouts.update(timeouts)
+        self._sessions = {}
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def host_key(url: str) -> str:
+        """scheme://host:port that identifies a connection pool"""
+        parts = urlsplit(url)
+        return f"{parts.scheme}://{parts.netloc}"
+    
+    def _make_session(self, retry='full') -> requests.Session:
+        """retry is 'full', 'connect' (connection failures only) or 'none'"""
+        retries = 0 if retry == 'none' else self.retries
+        full = retry == 'full'
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=retries if full else 0,
+            status=retries if full else 0,
+            other=retries if full else 0,
+            backoff_factor=self.backoff_factor,
+            status_forcelist=(500, 502, 503, 504) if full else (),
+            allowed_methods=frozenset(['GET', 'HEAD', 'OPTIONS']),
+            respect_retry_after_header=False,  # Otherwise a 429 with Retry-After is retried after sleeping
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=retry)
+        session = requests.Session()
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+    
+    def session_for(self, url: str, retry='full') -> requests.Session:
+        """Pooled session for the host of a URL and retry mode, created on first use"""
+        key = (self.host_key(url), retry)
+        session = self._sessions.get(key)
+        if session is None:
+            with self._lock:
+                session = self._sessions.get(key)
+                if session is None:
+                    session = self._make_session(retry)
+                    self._sessions[key] = session
+        return session
+    
+    def timeout_for(self, endpoint: Optional[str]) -> Tuple[float, float]:
+        return self.timeouts.get(endpoint or 'default', self.timeouts['default'])
+    
+    def request(self, method: str, url: str, endpoint: Optional[str] = None,
+                retry: bool = True, **kwargs) -> requests.Response:
+        """
+        Send a request on the host's pooled session with the endpoint's timeout
+        retry=False is for probes that should fail fast instead of backing off
+        """
+        kwargs.setdefault('timeout', self.timeout_for(endpoint))
+        if not retry:
+            mode = 'none'
+        elif endpoint in METERED_ENDPOINTS:
+            mode = 'connect'
+        else:
+            mode = 'full'
+        return self.session_for(url, mode).request(method, url, **kwargs)
+    
+    @staticmethod
+    def server_attempts(response: requests.Response) -> int:
+        """
+        How many requests the server received to produce this response,
+        retried error responses included (what a metered API bills for)
+        """
+        retries = getattr(getattr(response, 'raw', None), 'retries', None)
+        history = getattr(retries, 'history', None) or ()
+        return 1 + sum(1 for attempt in history
+                       if attempt.status is not None and not attempt.redirect_location)
+    
+    def get(self, url: str, endpoint: Optional[str] = None, **kwargs) -> requests.Response:
+        return self.request('GET', url, endpoint, **kwargs)
+    
+    def post(self, url: str, endpoint: Optional[str] = None, **kwargs) -> requests.Response:
+        return self.request('POST', url, endpoint, **kwargs)
+    
+    def prewarm(self, urls: List[str], background: bool = True) -> Optional[threading.Thread]:
+        """
+        Open a connection to each host ahead of the first real request
+        Failures are ignored - the host is simply warmed on first use instead
+        """
+        def warm():
+            for url in urls:
+                try:
+                    self.request('HEAD', url, retry=False, timeout=(2, 2), allow_redirects=False).close()
+                except requests.RequestException as e:
+                    logger.debug(f"Prewarm of {self.host_key(url)} failed: {e}")
+        
+        if not background:
+            warm()
+            return None
+        thread = threading.Thread(target=warm, daemon=True, name='alias-http-prewarm')
+        thread.start()
+        return thread
+    
+    def stats(self) -> Dict[str, int]:
+        """Number of pooled hosts"""
+        return {'hosts': len({host for host, _ in self._sessions})}
+    
+    def close(self):
+        """Close every pooled connection"""
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+        for session in sessions:
+            session.close()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> HttpClient:
+    """Process-wide shared client"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = HttpClient()
+    return _client
@@ -0,0 +1,288 @@
+"""
+Lightweight Intent Classifier for ALIAS
+Hashed token features + NumPy models, trained offline from labelled JSONL
+Predicts the message intent and a calibrated "needs web search" probability
+"""
+
+import json
+import os
+import sys
+import time
+import zlib
+import math
+import argparse
+import numpy as np
+from typing import List, Dict, Tuple, Optional
+import re
+
+MODULE_DIR = os.path.dirname(os.path.abspath(__file__))
+# The trained model is a cache rebuilt from the bundled data, kept with
+# ALIAS's other state files; ALIAS_DATA_DIR overrides
+DATA_DIR = os.environ.get('ALIAS_DATA_DIR', os.path.join(MODULE_DIR, 'data'))
+DEFAULT_MODEL_PATH = os.path.join(DATA_DIR, 'intent_model.npz')
+DEFAULT_TRAIN_PATH = os.path.join(MODULE_DIR, 'data', 'intents_train.jsonl')
+DEFAULT_HELDOUT_PATH = os.path.join(MODULE_DIR, 'data', 'intents_heldout.jsonl')
+
+TOKEN_PATTERN = re.compile(r"\b\w+\b")
+
+
+def load_examples(path: str) -> List[Dict]:
+    """Read {"text", "intent", "needs_web"} records from a JSONL file"""
+    examples = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                examples.append(json.loads(line))
+    return examples
+
+
+class IntentClassifier:
+    """
+    Multinomial naive Bayes for intent + logistic regression for web need
+    Both heads share one hashed feature space and one weight matrix, so
+    scoring a message is a single sparse dot product (gather + sum)
+    """
+    
+    def __init__(self, n_bits: int = 12):
+        self.n_bits = n_bits
+        self.n_features = 1 << n_bits
+        self.intents = []
+        # Rows: hashed features plus one all-zero padding row at the end
+        # Columns: one log-likelihood per intent, then the web logit
+        self.weights = np.zeros((self.n_features + 1, 1), dtype=np.float32)
+        self.bias = np.zeros(1, dtype=np.float32)
+        self._bias_list = [0.0]
+        self._feature_cache = {}
+    
+    def features(self, text: str) -> List[int]:
+        """Hashed unigram and bigram indices (repeats count as term frequency)"""
+        tokens = TOKEN_PATTERN.findall(text.lower())
+        grams = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+        cache = self._feature_cache
+        mask = self.n_features - 1
+        indices = []
+        for gram in grams:
+            index = cache.get(gram)
+            if index is None:
+                index = zlib.crc32(gram.encode('utf-8')) & mask
+                if len(cache) < 50000:
+                    cache[gram] = index
+            indices.append(index)
+        return indices
+    
+    def _count_matrix(self, texts: List[str]) -> np.ndarray:
+        """Dense term-count matrix, only used for training"""
+        X = np.zeros((len(texts), self.n_features), dtype=np.float32)
+        for row, text in enumerate(texts):
+            np.add.at(X[row], self.features(text), 1.0)
+        return X
+    
+    def fit(self, examples: List[Dict], alpha: float = 0.5, l2: float = 1e-3,
+            epochs: int = 400, learning_rate: float = 8.0) -> 'IntentClassifier':
+        """Train both heads on labelled examples"""
+        texts = [e['text'] for e in examples]
+        self.intents = sorted({e['intent'] for e in examples})
+        labels = np.array([self.intents.index(e['intent']) for e in examples])
+        web = np.array([float(e.get('needs_web', 0)) for e in examples], dtype=np.float32)
+        X = self._count_matrix(texts)
+        
+        # Naive Bayes: per-class feature log-likelihoods with additive smoothing
+        n_classes = len(self.intents)
+        counts = np.zeros((n_classes, self.n_features), dtype=np.float64)
+        for c in range(n_classes):
+            counts[c] = X[labels == c].sum(axis=0)
+        smoothed = counts + alpha
+        log_likelihood = np.log(smoothed / smoothed.sum(axis=1, keepdims=True))
+        log_prior = np.log(np.bincount(labels, minlength=n_classes) / len(labels))
+        
+        # Logistic regression on the same features, L2-regularized full-batch
+        # gradient descent over the columns that actually occur
+        active = np.nonzero(X.any(axis=0))[0]
+        Xn = X[:, active] / np.maximum(X.sum(axis=1, keepdims=True), 1.0) ** 0.5
+        w_active = np.zeros(len(active), dtype=np.float64)
+        b = 0.0
+        n = len(texts)
+        for _ in range(epochs):
+            p = 1.0 / (1.0 + np.exp(-(Xn @ w_active + b)))
+            error = p - web
+            w_active -= learning_rate * (Xn.T @ error / n + l2 * w_active)
+            b -= learning_rate * error.mean()
+        w = np.zeros(self.n_features, dtype=np.float64)
+        w[active] = w_active
+        
+        self.weights = np.zeros((self.n_features + 1, n_classes + 1), dtype=np.float32)
+        self.weights[:-1, :n_classes] = log_likelihood.T
+        self.weights[:-1, n_classes] = w
+        self.bias = np.append(log_prior, b).astype(np.float32)
+        self._bias_list = self.bias.tolist()
+        return self
+    
+    def _scores(self, indices: List[int]) -> Tuple[List[float], float]:
+        """Intent scores and web logit for one message"""
+        if not indices:
+            indices = [self.n_features]  # Zero padding row
+        sums = self.weights.take(indices, axis=0).sum(axis=0).tolist()
+        bias = self._bias_list
+        # The web head was trained on length-normalized counts
+        web_logit = sums[-1] / math.sqrt(len(indices)) + bias[-1]
+        return [total + b for total, b in zip(sums[:-1], bias)], web_logit
+    
+    def predict(self, text: str) -> Tuple[str, float]:
+        """Return (intent, probability that the message needs a web search)"""
+        scores, web_logit = self._scores(self.features(text))
+        best = max(range(len(scores)), key=scores.__getitem__)
+        return self.intents[best], 1.0 / (1.0 + math.exp(-web_logit))
+    
+    def detect_intent(self, text: str) -> str:
+        """Most likely intent label"""
+        return self.predict(text)[0]
+    
+    def web_probability(self, text: str) -> float:
+        """Calibrated probability that the message needs fresh web data"""
+        return self.predict(text)[1]
+    
+    def predict_batch(self, texts: List[str]) -> Tuple[List[str], np.ndarray]:
+        """Score many messages with one gather and one segmented sum"""
+        if not texts:
+            return [], np.zeros(0, dtype=np.float32)
+        
+        # Every message gets the zero padding row so no segment is empty
+        pad = self.n_features
+        indices, offsets, lengths = [], [], []
+        for text in texts:
+            offsets.append(len(indices))
+            features = self.features(text)
+            lengths.append(len(features))
+            indices.append(pad)
+            indices.extend(features)
+        
+        sums = np.add.reduceat(self.weights[np.asarray(indices)], np.asarray(offsets), axis=0)
+        scores = sums + self.bias
+        lengths = np.maximum(np.asarray(lengths, dtype=np.float32), 1.0)
+        web_logits = sums[:, -1] / lengths ** 0.5 + self.bias[-1]
+        intents = [self.intents[i] for i in np.argmax(scores[:, :-1], axis=1)]
+        return intents, 1.0 / (1.0 + np.exp(-web_logits))
+    
+    def save(self, path: str = DEFAULT_MODEL_PATH):
+        """Save the trained model as .npz"""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        np.savez_compressed(path, weights=self.weights, bias=self.bias,
+                            intents=np.array(self.intents), n_bits=self.n_bits)
+    
+    @classmethod
+    def load(cls, path: str = DEFAULT_MODEL_PATH) -> 'IntentClassifier':
+        """Load a model written by save()"""
+        data = np.load(path)
+        model = cls(n_bits=int(data['n_bits']))
+        model.weights = data['weights']
+        model.bias = data['bias']
+        model._bias_list = model.bias.tolist()
+        model.intents = [str(i) for i in data['intents']]
+        return model
+    
+    @classmethod
+    def load_or_train(cls, model_path: str = DEFAULT_MODEL_PATH,
+                      data_path: str = DEFAULT_TRAIN_PATH) -> Optional['IntentClassifier']:
+        """
+        Load the cached model, or train from the bundled data and cache it
+        A model older than its training data is retrained, so editing the
+        JSONL takes effect on the next start
+        """
+        if not os.path.exists(data_path):
+            return cls.load(model_path) if os.path.exists(model_path) else None
+        if os.path.exists(model_path) and os.path.getmtime(model_path) >= os.path.getmtime(data_path):
+            return cls.load(model_path)
+        model = cls().fit(load_examples(data_path))
+        try:
+            model.save(model_path)
+        except OSError:
+            pass  # Read-only install: train again next start
+        return model
+
+
+def evaluate(model: IntentClassifier, examples: List[Dict]) -> Dict:
+    """Compare the classifier against the regex path on labelled examples"""
+    # Imported here because ai_engine imports this module
+    from ai_engine import ResponseGenerator, FreeAIEngine
+    
+    texts = [e['text'] for e in examples]
+    true_intents = [e['intent'] for e in examples]
+    true_web = np.array([int(e.get('needs_web', 0)) for e in examples])
+    
+    start = time.perf_counter()
+    regex_intents = [ResponseGenerator.regex_intent(t) for t in texts]
+    regex_web = np.array([int(FreeAIEngine.regex_needs_search(t)) for t in texts])
+    regex_time = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    single = [model.predict(t) for t in texts]
+    single_time = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    batch_intents, web_probs = model.predict_batch(texts)
+    batch_time = time.perf_counter() - start
+    
+    model_intents = [intent for intent, _ in single]
+    model_web = (web_probs >= 0.5).astype(int)
+    n = len(examples)
+    return {
+        'examples': n,
+        'regex_intent_accuracy': sum(p == t for p, t in zip(regex_intents, true_intents)) / n,
+        'model_intent_accuracy': sum(p == t for p, t in zip(model_intents, true_intents)) / n,
+        'regex_web_accuracy': float((regex_web == true_web).mean()),
+        'model_web_accuracy': float((model_web == true_web).mean()),
+        'model_web_brier': float(((web_probs - true_web) ** 2).mean()),
+        'batch_matches_single': batch_intents == model_intents,
+        'regex_us_per_message': regex_time / n * 1e6,
+        'model_us_per_message': single_time / n * 1e6,
+        'model_batch_us_per_message': batch_time / n * 1e6,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line: train / evaluate / predict"""
+    parser = argparse.ArgumentParser(description="ALIAS intent classifier")
+    sub = parser.add_subparsers(dest='command', required=True)
+    
+    train = sub.add_parser('train', help='Train from labelled JSONL and save the model')
+    train.add_argument('--data', default=DEFAULT_TRAIN_PATH)
+    train.add_argument('--out', default=DEFAULT_MODEL_PATH)
+    train.add_argument('--bits', type=int, default=12)
+    
+    evaluate_cmd = sub.add_parser('evaluate', help='Compare against the regex path on held-out data')
+    evaluate_cmd.add_argument('--data', default=DEFAULT_HELDOUT_PATH)
+    evaluate_cmd.add_argument('--model', default=DEFAULT_MODEL_PATH)
+    
+    predict = sub.add_parser('predict', help='Classify messages given as arguments')
+    predict.add_argument('messages', nargs='+')
+    predict.add_argument('--model', default=DEFAULT_MODEL_PATH)
+    
+    args = parser.parse_args(argv)
+    
+    if args.command == 'train':
+        start = time.perf_counter()
+        model = IntentClassifier(n_bits=args.bits).fit(load_examples(args.data))
+        model.save(args.out)
+        print(f"Trained on {args.data} in {time.perf_counter() - start:.2f}s -> {args.out}")
+        return 0
+    
+    model = IntentClassifier.load_or_train(args.model)
+    if model is None:
+        print("No model or training data found")
+        return 1
+    
+    if args.command == 'evaluate':
+        results = evaluate(model, load_examples(args.data))
+        for key, value in results.items():
+            print(f"{key}: {value:.4f}" if isinstance(value, float) else f"{key}: {value}")
+        return 0
+    
+    intents, probs = model.predict_batch(args.messages)
+    for message, intent, prob in zip(args.messages, intents, probs):
+        print(f"{intent:13s} web={prob:.2f}  {message}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,420 @@
+"""
+Local Offline Search Index for ALIAS
+Builds a BM25 inverted index over a plain-text corpus (e.g. an encyclopedia
+dump) and answers queries from memory-mapped NumPy arrays - no network needed
+
+Build once:   python local_index.py build corpus_dir/ articles.jsonl -o local_index
+Query:        python local_index.py search "who invented the telephone"
+"""
+
+import json
+import os
+import sys
+import time
+import math
+import heapq
+import shutil
+import struct
+import argparse
+import itertools
+import tempfile
+import numpy as np
+from collections import defaultdict
+from typing import Dict, Iterator, List, Optional, Tuple
+import re
+
+INDEX_VERSION = 1
+DEFAULT_INDEX_DIR = os.environ.get('ALIAS_LOCAL_INDEX', 'local_index')
+
+TOKEN_PATTERN = re.compile(r"\w+")
+STOP_WORDS = {
+    'a', 'an', 'the', 'and', 'or', 'of', 'to', 'in', 'on', 'at', 'by', 'for', 'with', 'from',
+    'is', 'are', 'was', 'were', 'be', 'been', 'it', 'its', 'as', 'that', 'this', 'which',
+    'what', 'who', 'whom', 'when', 'where', 'why', 'how', 'does', 'did', 'do', 'can',
+    'tell', 'me', 'about', 'please', 'i', 'you'
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens without stop words"""
+    return [t for t in TOKEN_PATTERN.findall(text.lower()) if t not in STOP_WORDS]
+
+
+def iter_documents(paths: List[str]) -> Iterator[Dict[str, str]]:
+    """
+    Yield {'title', 'text', 'source'} from corpus files
+    .jsonl files hold one {"title", "text", "url"} record per line; any other
+    file (or each file in a directory) is one document titled by its first line
+    """
+    for path in paths:
+        if os.path.isdir(path):
+            names = sorted(os.listdir(path))
+            yield from iter_documents([os.path.join(path, name) for name in names])
+            continue
+        
+        if path.endswith('.jsonl'):
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if line:
+                        record = json.loads(line)
+                        yield {
+                            'title': record.get('title', ''),
+                            'text': record.get('text', ''),
+                            'source': record.get('url') or record.get('source') or path
+                        }
+        else:
+            with open(path, 'r', encoding='utf-8', errors='replace') as f:
+                text = f.read()
+            lines = text.strip().split('\n', 1)
+            yield {
+                'title': lines[0].strip(),
+                'text': lines[1] if len(lines) > 1 else lines[0],
+                'source': os.path.abspath(path)
+            }
+
+
+def split_passages(text: str, max_chars: int = 800) -> List[str]:
+    """Paragraphs, with long ones cut at sentence boundaries"""
+    passages = []
+    for paragraph in re.split(r"\n\s*\n", text):
+        paragraph = ' '.join(paragraph.split())
+        while len(paragraph) > max_chars:
+            cut = paragraph.rfind('. ', 0, max_chars)
+            cut = cut + 1 if cut > max_chars // 3 else max_chars
+            passages.append(paragraph[:cut].strip())
+            paragraph = paragraph[cut:].strip()
+        if paragraph:
+            passages.append(paragraph)
+    return passages
+
+
+class StringWriter:
+    """
+    Streams strings to a UTF-8 blob plus int64 offsets (read back by
+    StringTable), so nothing but the current string is held in memory
+    """
+    
+    def __init__(self, directory: str, name: str):
+        self.directory = directory
+        self.name = name
+        self.count = 0
+        self._size = 0
+        self._blob = open(os.path.join(directory, f'{name}.bin'), 'wb')
+        self._offsets = open(os.path.join(directory, f'{name}_offsets.raw'), 'wb')
+        self._offsets.write(np.int64(0).tobytes())
+    
+    def write(self, text: str):
+        data = text.encode('utf-8')
+        self._blob.write(data)
+        self._size += len(data)
+        self._offsets.write(np.int64(self._size).tobytes())
+        self.count += 1
+    
+    def close(self):
+        self._blob.close()
+        self._offsets.close()
+        _raw_to_npy(os.path.join(self.directory, f'{self.name}_offsets.raw'),
+                    os.path.join(self.directory, f'{self.name}_offsets.npy'), np.int64)
+
+
+class ArrayWriter:
+    """Appends numbers to a raw file that close() turns into a .npy array"""
+    
+    def __init__(self, path: str, dtype):
+        self.path = path
+        self.dtype = np.dtype(dtype)
+        self._file = open(path + '.raw', 'wb')
+    
+    def write(self, values):
+        self._file.write(np.asarray(values, dtype=self.dtype).tobytes())
+    
+    def close(self):
+        self._file.close()
+        _raw_to_npy(self.path + '.raw', self.path, self.dtype)
+
+
+def _raw_to_npy(raw_path: str, npy_path: str, dtype, chunk: int = 1 << 20):
+    """Copy a headerless array file into a .npy file in fixed-size chunks, then delete it"""
+    dtype = np.dtype(dtype)
+    count = os.path.getsize(raw_path) // dtype.itemsize
+    out = np.lib.format.open_memmap(npy_path, mode='w+', dtype=dtype, shape=(count,))
+    with open(raw_path, 'rb') as f:
+        for start in range(0, count, chunk):
+            block = np.frombuffer(f.read(min(chunk, count - start) * dtype.itemsize), dtype=dtype)
+            out[start:start + len(block)] = block
+    out.flush()
+    del out
+    os.remove(raw_path)
+
+
+def _write_run(path: str, postings: Dict[str, List[Tuple[int, int]]]):
+    """
+    Spill buffered postings as one sorted run:
+    per term, uint16 term length, term, uint32 count, int32 passage ids, uint16 tfs
+    """
+    with open(path, 'wb') as f:
+        for term in sorted(postings):
+            encoded = term.encode('utf-8')
+            entries = np.array(postings[term], dtype=np.int64).reshape(-1, 2)
+            f.write(struct.pack('<HI', len(encoded), len(entries)))
+            f.write(encoded)
+            f.write(entries[:, 0].astype('<i4').tobytes())
+            f.write(np.minimum(entries[:, 1], 65535).astype('<u2').tobytes())
+
+
+def _read_run(path: str, run: int) -> Iterator[Tuple[str, int, np.ndarray, np.ndarray]]:
+    """(term, run number, passage ids, tfs) records of a run file, in term order"""
+    with open(path, 'rb') as f:
+        while True:
+            header = f.read(6)
+            if not header:
+                return
+            length, count = struct.unpack('<HI', header)
+            term = f.read(length).decode('utf-8')
+            ids = np.frombuffer(f.read(4 * count), dtype='<i4')
+            tfs = np.frombuffer(f.read(2 * count), dtype='<u2')
+            yield term, run, ids, tfs
+
+
+class StringTable:
+    """Read-only view of strings written by StringWriter"""
+    
+    def __init__(self, directory: str, name: str):
+        path = os.path.join(directory, f'{name}.bin')
+        # np.memmap cannot map an empty file
+        if os.path.getsize(path):
+            self.blob = np.memmap(path, dtype=np.uint8, mode='r')
+        else:
+            self.blob = np.zeros(0, dtype=np.uint8)
+        self.offsets = np.load(os.path.join(directory, f'{name}_offsets.npy'), mmap_mode='r')
+    
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+    
+    def __getitem__(self, i: int) -> str:
+        return self.blob[self.offsets[i]:self.offsets[i + 1]].tobytes().decode('utf-8')
+
+
+def build_index(paths: List[str], out_dir: str = DEFAULT_INDEX_DIR, k1: float = 1.2,
+                b: float = 0.75, max_passage_chars: int = 800,
+                run_postings: int = 2_000_000) -> Dict:
+    """
+    One-off indexer: corpus files -> memory-mappable index directory
+    Works in bounded memory for encyclopedia-sized corpora: passages, titles
+    and sources are streamed straight to disk, postings are buffered up to
+    run_postings entries, spilled as sorted runs and k-way merged at the end
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    run_dir = tempfile.mkdtemp(prefix='runs_', dir=out_dir)
+    passages = StringWriter(out_dir, 'passages')
+    titles = StringWriter(out_dir, 'titles')
+    sources = StringWriter(out_dir, 'sources')
+    passage_doc = ArrayWriter(os.path.join(out_dir, 'passage_doc.npy'), np.int32)
+    passage_len = ArrayWriter(os.path.join(out_dir, 'passage_len.npy'), np.int32)
+    postings = defaultdict(list)  # term -> [(passage id, tf)] since the last spill
+    buffered, runs, total_len = 0, [], 0
+    
+    try:
+        for doc_id, doc in enumerate(iter_documents(paths)):
+            titles.write(doc['title'])
+            sources.write(doc['source'])
+            title_tokens = tokenize(doc['title'])
+            for passage in split_passages(doc['text'], max_passage_chars):
+                tokens = tokenize(passage)
+                if not tokens:
+                    continue
+                passage_id = passages.count
+                counts = defaultdict(int)
+                for token in tokens + title_tokens:
+                    counts[token] += 1
+                for token, tf in counts.items():
+                    postings[token].append((passage_id, tf))
+                buffered += len(counts)
+                passages.write(passage)
+                passage_doc.write([doc_id])
+                passage_len.write([len(tokens)])
+                total_len += len(tokens)
+                
+                if buffered >= run_postings:
+                    runs.append(os.path.join(run_dir, f'run_{len(runs)}.bin'))
+                    _write_run(runs[-1], postings)
+                    postings, buffered = defaultdict(list), 0
+        if postings or not runs:
+            runs.append(os.path.join(run_dir, f'run_{len(runs)}.bin'))
+            _write_run(runs[-1], postings)
+        postings = None
+        n_passages = passages.count
+        for writer in (passages, titles, sources, passage_doc, passage_len):
+            writer.close()
+        
+        # Runs hold increasing passage ids, so concatenating a term's postings
+        # in run order keeps them sorted; terms come out sorted for binary search
+        terms = StringWriter(out_dir, 'terms')
+        term_offsets = ArrayWriter(os.path.join(out_dir, 'term_offsets.npy'), np.int64)
+        posting_ids = ArrayWriter(os.path.join(out_dir, 'posting_ids.npy'), np.int32)
+        posting_tfs = ArrayWriter(os.path.join(out_dir, 'posting_tfs.npy'), np.uint16)
+        term_offsets.write([0])
+        offset = 0
+        merged = heapq.merge(*(_read_run(path, run) for run, path in enumerate(runs)),
+                             key=lambda record: (record[0], record[1]))
+        for term, group in itertools.groupby(merged, key=lambda record: record[0]):
+            for _, _, ids, tfs in group:
+                posting_ids.write(ids)
+                posting_tfs.write(tfs)
+                offset += len(ids)
+            terms.write(term)
+            term_offsets.write([offset])
+        n_terms = terms.count
+        for writer in (terms, term_offsets, posting_ids, posting_tfs):
+            writer.close()
+    finally:
+        shutil.rmtree(run_dir, ignore_errors=True)
+    
+    info = {
+        'version': INDEX_VERSION,
+        'documents': titles.count,
+        'passages': n_passages,
+        'terms': n_terms,
+        'avg_passage_len': total_len / n_passages if n_passages else 0.0,
+        'k1': k1,
+        'b': b
+    }
+    with open(os.path.join(out_dir, 'index.json'), 'w') as f:
+        json.dump(info, f, indent=2)
+    return info
+
+
+class LocalIndex:
+    """
+    BM25 search over an index built by build_index
+    Every array is memory-mapped, so opening is instant and only the pages a
+    query touches are read from disk
+    """
+    
+    def __init__(self, directory: str = DEFAULT_INDEX_DIR):
+        with open(os.path.join(directory, 'index.json'), 'r') as f:
+            self.info = json.load(f)
+        if self.info.get('version') != INDEX_VERSION:
+            raise ValueError(f"Unsupported local index version {self.info.get('version')}")
+        
+        self.directory = directory
+        self.passages = StringTable(directory, 'passages')
+        self.titles = StringTable(directory, 'titles')
+        self.sources = StringTable(directory, 'sources')
+        self.terms = StringTable(directory, 'terms')
+        load = lambda name: np.load(os.path.join(directory, f'{name}.npy'), mmap_mode='r')
+        self.term_offsets = load('term_offsets')
+        self.posting_ids = load('posting_ids')
+        self.posting_tfs = load('posting_tfs')
+        self.passage_doc = load('passage_doc')
+        self.passage_len = load('passage_len')
+        self.k1 = self.info['k1']
+        self.b = self.info['b']
+        self.avg_len = max(self.info['avg_passage_len'], 1.0)
+        self.n_passages = self.info['passages']
+    
+    def term_id(self, term: str) -> Optional[int]:
+        """Binary search of the sorted term table"""
+        low, high = 0, len(self.terms)
+        while low < high:
+            mid = (low + high) // 2
+            if self.terms[mid] < term:
+                low = mid + 1
+            else:
+                high = mid
+        if low < len(self.terms) and self.terms[low] == term:
+            return low
+        return None
+    
+    def search(self, query: str, top_k: int = 3) -> List[Tuple[int, float, float]]:
+        """(passage id, BM25 score, fraction of query terms matched), best first"""
+        terms = sorted(set(tokenize(query)))
+        if not terms or not self.n_passages:
+            return []
+        
+        ids, contributions = [], []
+        for term in terms:
+            tid = self.term_id(term)
+            if tid is None:
+                continue
+            start, end = self.term_offsets[tid], self.term_offsets[tid + 1]
+            postings = np.asarray(self.posting_ids[start:end])
+            tf = np.asarray(self.posting_tfs[start:end], dtype=np.float32)
+            df = end - start
+            idf = math.log(1.0 + (self.n_passages - df + 0.5) / (df + 0.5))
+            length = np.asarray(self.passage_len[postings], dtype=np.float32)
+            norm = self.k1 * (1.0 - self.b + self.b * length / self.avg_len)
+            ids.append(postings)
+            contributions.append(idf * tf * (self.k1 + 1.0) / (tf + norm))
+        if not ids:
+            return []
+        
+        # Sum each passage's per-term contributions without a corpus-sized accumulator
+        unique, inverse = np.unique(np.concatenate(ids), return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate(contributions))
+        matched = np.bincount(inverse) / len(terms)
+        
+        top = np.argsort(-scores)[:top_k]
+        return [(int(unique[i]), float(scores[i]), float(matched[i])) for i in top]
+    
+    def answer(self, query: str, min_coverage: float = 0.5, max_chars: int = 500,
+               top_k: int = 5) -> Dict[str, str]:
+        """
+        Best passage as an answer/source/title dict, like the web providers
+        The highest scoring of the top_k passages that match at least
+        min_coverage of the query terms; one rare term repeated in a passage
+        can outscore it but not hide it
+        """
+        for passage_id, score, coverage in self.search(query, top_k=top_k):
+            if coverage < min_coverage:
+                continue
+            doc_id = int(self.passage_doc[passage_id])
+            text = self.passages[passage_id]
+            if len(text) > max_chars:
+                text = text[:max_chars].rsplit(' ', 1)[0] + '...'
+            return {
+                'answer': text,
+                'source': self.sources[doc_id],
+                'title': self.titles[doc_id] or query,
+                'score': score
+            }
+        return {'answer': ''}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line: build / search"""
+    parser = argparse.ArgumentParser(description="ALIAS local offline search index")
+    sub = parser.add_subparsers(dest='command', required=True)
+    
+    build = sub.add_parser('build', help='Index .txt files, directories or .jsonl corpora')
+    build.add_argument('paths', nargs='+')
+    build.add_argument('-o', '--out', default=DEFAULT_INDEX_DIR)
+    
+    search = sub.add_parser('search', help='Query an index')
+    search.add_argument('query')
+    search.add_argument('--index', default=DEFAULT_INDEX_DIR)
+    search.add_argument('-k', '--top', type=int, default=3)
+    
+    args = parser.parse_args(argv)
+    
+    if args.command == 'build':
+        start = time.perf_counter()
+        info = build_index(args.paths, args.out)
+        print(f"Indexed {info['documents']} documents / {info['passages']} passages / "
+              f"{info['terms']} terms in {time.perf_counter() - start:.2f}s -> {args.out}")
+        return 0
+    
+    index = LocalIndex(args.index)
+    start = time.perf_counter()
+    results = index.search(args.query, args.top)
+    elapsed = (time.perf_counter() - start) * 1000
+    for passage_id, score, coverage in results:
+        doc_id = int(index.passage_doc[passage_id])
+        print(f"{score:6.2f} ({coverage:.0%}) {index.titles[doc_id]}: {index.passages[passage_id][:120]}")
+    print(f"{len(results)} results in {elapsed:.2f}ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
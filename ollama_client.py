@@ -0,0 +1,240 @@
+"""
+Ollama Client for ALIAS
+Streams /api/generate token by token from the NDJSON response, with
+cancellation and time-to-first-token tracking. Conversation sessions pass the
+returned context back so each turn only evaluates its new prompt, and
+keep_alive keeps the model loaded between turns
+"""
+
+import json
+import os
+import socket
+import threading
+import time
+import logging
+from collections import OrderedDict, deque
+from typing import Dict, Iterator, Optional
+
+import requests
+
+from http_client import HttpClient, get_client
+
+logger = logging.getLogger(__name__)
+
+OLLAMA_URL = os.environ.get('ALIAS_OLLAMA_URL', "http://localhost:11434")
+OLLAMA_MODEL = os.environ.get('ALIAS_OLLAMA_MODEL', "llama2")
+OLLAMA_KEEP_ALIVE = os.environ.get('ALIAS_OLLAMA_KEEP_ALIVE', "30m")
+
+
+class OllamaError(Exception):
+    """Ollama answered with an error status or an error chunk"""
+
+
+class OllamaClient:
+    """
+    Minimal /api/generate client on the shared pooled HTTP client
+    stream() yields tokens as Ollama produces them; setting the cancel event
+    shuts the connection down, even mid-read on a stalled server, which makes
+    Ollama stop generating
+    
+    With a session id, the context array from the previous turn is sent back and
+    the prompt only needs the new turn. Sessions idle for session_ttl seconds
+    (or beyond max_sessions, least recently used first) are dropped, as are
+    contexts grown past max_context tokens
+    """
+    
+    CANCEL_POLL = 0.05  # Seconds between the cancel watcher's checks
+    
+    def __init__(self, base_url: str = OLLAMA_URL, model: str = OLLAMA_MODEL,
+                 http: Optional[HttpClient] = None, keep_alive=OLLAMA_KEEP_ALIVE,
+                 max_sessions: int = 8, session_ttl: float = 1800.0, max_context: int = 4096):
+        self.base_url = base_url.rstrip('/')
+        self.model = model
+        self.http = http or get_client()
+        self.keep_alive = keep_alive  # Sent with every request, e.g. "30m", seconds, or -1 for always
+        self.max_sessions = max_sessions
+        self.session_ttl = session_ttl
+        self.max_context = max_context
+        self.sessions = OrderedDict()  # session id -> {'context', 'turns', 'last_used'}
+        self.first_token_times = deque(maxlen=100)
+        self.prompt_evals = deque(maxlen=100)  # (reused context, prompt_eval_count, prompt_eval ms)
+        self.last_first_token_time = None
+        self.last_stats = None
+        self.cancelled = 0
+        self.evicted = 0
+        self._lock = threading.Lock()
+    
+    def available(self) -> bool:
+        """Whether the server answers /api/tags"""
+        return self.http.get(f"{self.base_url}/api/tags", 'ollama_tags', retry=False).status_code == 200
+    
+    def has_context(self, session: str) -> bool:
+        """Whether the next turn of a session can reuse its context"""
+        with self._lock:
+            self._evict_idle()
+            return session in self.sessions
+    
+    def drop_session(self, session: Optional[str] = None):
+        """Forget one session's context, or every session's"""
+        with self._lock:
+            if session is None:
+                self.sessions.clear()
+            else:
+                self.sessions.pop(session, None)
+    
+    def _evict_idle(self):
+        now = time.monotonic()
+        for session_id in [s for s, entry in self.sessions.items() if now - entry['last_used'] > self.session_ttl]:
+            del self.sessions[session_id]
+            self.evicted += 1
+        while len(self.sessions) > self.max_sessions:
+            self.sessions.popitem(last=False)
+            self.evicted += 1
+    
+    def _save_context(self, session: str, context):
+        with self._lock:
+            entry = self.sessions.pop(session, {'turns': 0})
+            if context and len(context) <= self.max_context:
+                entry.update(context=context, turns=entry['turns'] + 1, last_used=time.monotonic())
+                self.sessions[session] = entry
+            self._evict_idle()
+    
+    def _close_on_cancel(self, response: requests.Response, cancel: threading.Event,
+                         finished: threading.Event, lock: threading.Lock):
+        """Watcher thread: shut the socket down when cancel is set so a blocked read returns"""
+        while not finished.is_set():
+            if cancel.wait(self.CANCEL_POLL):
+                with lock:
+                    # Once finished, the connection may already serve another request
+                    if finished.is_set():
+                        return
+                    sock = getattr(getattr(response.raw, 'connection', None), 'sock', None)
+                    if sock is not None:
+                        try:
+                            sock.shutdown(socket.SHUT_RDWR)
+                        except OSError:
+                            pass  # Already closed
+                return
+    
+    def stream(self, prompt: str, cancel: Optional[threading.Event] = None,
+               session: Optional[str] = None) -> Iterator[str]:
+        """
+        Yield response tokens; raises OllamaError/RequestException before the first one on failure
+        With a session that has context, prompt should hold only the new turn
+        """
+        start = time.perf_counter()
+        payload = {"model": self.model, "prompt": prompt, "stream": True, "keep_alive": self.keep_alive}
+        context = None
+        if session is not None:
+            with self._lock:
+                self._evict_idle()
+                entry = self.sessions.get(session)
+                if entry is not None:
+                    context = entry['context']
+                    self.sessions.move_to_end(session)
+        if context:
+            payload['context'] = context
+        
+        response = self.http.post(f"{self.base_url}/api/generate", 'ollama_generate', stream=True, json=payload)
+        finished, watcher_lock = threading.Event(), threading.Lock()
+        if cancel is not None:
+            threading.Thread(target=self._close_on_cancel, args=(response, cancel, finished, watcher_lock),
+                             daemon=True).start()
+        try:
+            if response.status_code != 200:
+                raise OllamaError(f"Ollama failed ({response.status_code})")
+            
+            first = None
+            lines = response.iter_lines()
+            while True:
+                try:
+                    line = next(lines, None)
+                except requests.RequestException:
+                    if cancel is None or not cancel.is_set():
+                        raise
+                    line = None  # The watcher shut the connection down
+                if cancel is not None and cancel.is_set():
+                    with self._lock:
+                        self.cancelled += 1
+                    return
+                if line is None:
+                    return
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                if chunk.get('error'):
+                    raise OllamaError(chunk['error'])
+                
+                token = chunk.get('response', '')
+                if token:
+                    if first is None:
+                        first = time.perf_counter() - start
+                        self.record_first_token(first)
+                    yield token
+                if chunk.get('done'):
+                    self.last_stats = self.chunk_stats(chunk, first, time.perf_counter() - start)
+                    self.last_stats['reused_context'] = bool(context)
+                    with self._lock:
+                        self.prompt_evals.append((bool(context), chunk.get('prompt_eval_count', 0),
+                                                  self.last_stats['prompt_eval_ms']))
+                    if session is not None:
+                        self._save_context(session, chunk.get('context'))
+                    return
+        finally:
+            with watcher_lock:
+                finished.set()
+            response.close()
+    
+    def generate(self, prompt: str, session: Optional[str] = None) -> str:
+        """Complete response as one string"""
+        return ''.join(self.stream(prompt, session=session))
+    
+    @staticmethod
+    def chunk_stats(chunk: Dict, first: Optional[float], total: float) -> Dict:
+        """Timings from the final chunk; Ollama reports durations in nanoseconds"""
+        return {
+            'first_token_ms': first * 1000 if first is not None else None,
+            'total_ms': total * 1000,
+            'prompt_eval_count': chunk.get('prompt_eval_count'),
+            'prompt_eval_ms': chunk.get('prompt_eval_duration', 0) / 1e6,
+            'eval_count': chunk.get('eval_count'),
+            'eval_ms': chunk.get('eval_duration', 0) / 1e6,
+            'load_ms': chunk.get('load_duration', 0) / 1e6
+        }
+    
+    def record_first_token(self, seconds: float):
+        with self._lock:
+            self.last_first_token_time = seconds
+            self.first_token_times.append(seconds)
+    
+    def prompt_eval_stats(self) -> Dict:
+        """Mean prompt tokens and milliseconds evaluated per turn, fresh vs reused context"""
+        with self._lock:
+            evals = list(self.prompt_evals)
+            sessions = len(self.sessions)
+        stats = {'sessions': sessions, 'evicted': self.evicted}
+        for label, reused in (('fresh', False), ('reused', True)):
+            turns = [(count, ms) for r, count, ms in evals if r == reused]
+            stats[label] = {
+                'turns': len(turns),
+                'mean_tokens': sum(c for c, _ in turns) / len(turns) if turns else None,
+                'mean_ms': sum(ms for _, ms in turns) / len(turns) if turns else None
+            }
+        return stats
+    
+    def stats(self) -> Dict:
+        """Time-to-first-token summary in milliseconds, plus prompt-eval cost per turn"""
+        with self._lock:
+            samples = sorted(self.first_token_times)
+            cancelled = self.cancelled
+        if not samples:
+            return {'count': 0, 'cancelled': cancelled, 'prompt_eval': self.prompt_eval_stats()}
+        return {
+            'count': len(samples),
+            'cancelled': cancelled,
+            'prompt_eval': self.prompt_eval_stats(),
+            'last_ms': self.last_first_token_time * 1000,
+            'p50_ms': samples[len(samples) // 2] * 1000,
+            'p95_ms': samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1000,
+            'last': self.last_stats
+        }
@@ -4,15 +4,473 @@ Supports: SearchApi.io, search-engines library, DuckDuckGo, and more
 All completely FREE with no API keys required for basic usage
 """
 
-import requests
+from http_client import get_client
 from urllib.parse import quote
 from html import unescape
-from typing import Dict, List, Optional
+from html.parser import HTMLParser
+from typing import Dict, Iterator, List, Optional, Tuple
+import argparse
+import codecs
 import logging
 import json
+import hashlib
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+import asyncio
+from collections import deque, Counter
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed, wait
 
 logger = logging.getLogger(__name__)
 
+# Optional: non-blocking HTTP for AsyncFreeSearchEngine
+try:
+    import aiohttp
+    AIOHTTP_AVAILABLE = True
+except ImportError:
+    AIOHTTP_AVAILABLE = False
+
+# Endpoint URLs, overridable to point at local stand-in servers (stand_in_servers.py)
+DUCKDUCKGO_API_URL = os.environ.get('ALIAS_DUCKDUCKGO_URL', "https://api.duckduckgo.com/")
+SEARCHAPI_URL = os.environ.get('ALIAS_SEARCHAPI_URL', "https://www.searchapi.io/api/v1/search")
+
+# Runtime state (result cache, quota ledger) lives next to the bundled data,
+# not in whatever directory ALIAS was started from; ALIAS_DATA_DIR overrides
+DATA_DIR = os.environ.get('ALIAS_DATA_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data'))
+DEFAULT_CACHE_PATH = os.path.join(DATA_DIR, 'search_cache.db')
+DEFAULT_QUOTA_PATH = os.path.join(DATA_DIR, 'search_quota.db')
+
+
+def open_database(path: str) -> sqlite3.Connection:
+    """SQLite connection usable from any thread, creating the file's directory first"""
+    if path != ':memory:':
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    return sqlite3.connect(path, check_same_thread=False)
+
+
+# Query classes and how long their results stay fresh (seconds)
+QUERY_CLASS_PATTERNS = [
+    ('weather', re.compile(r'\b(weather|forecast|temperature|rain|raining|snow|sunny|humidity|windy?)\b')),
+    ('finance', re.compile(r'\b(price|prices|stocks?|bitcoin|crypto\w*|ethereum|exchange rate|market|markets)\b')),
+    ('sports', re.compile(r'\b(score|scores|won|win|game|match|playoffs?|league)\b')),
+    ('news', re.compile(r'\b(news|latest|breaking|headlines?|today|current|recent|election|happening)\b')),
+    ('definition', re.compile(r'^(what|who)\s+(is|was|are|were)\b|\b(define|definition|meaning)\b')),
+]
+QUERY_CLASS_TTLS = {
+    'weather': 10 * 60,
+    'finance': 15 * 60,
+    'sports': 30 * 60,
+    'news': 60 * 60,
+    'definition': 7 * 24 * 3600,
+    'general': 24 * 3600,
+}
+
+# Classes whose answers go stale within hours
+LIVE_QUERY_CLASSES = ('weather', 'finance', 'sports', 'news')
+
+
+TERM_PATTERN = re.compile(r"\w+")
+QUESTION_WORDS = {'the', 'what', 'who', 'how', 'why', 'when', 'where', 'which', 'are', 'was', 'were',
+                  'does', 'did', 'can', 'and', 'for', 'with', 'about', 'tell'}
+
+
+def normalize_query(query: str) -> str:
+    """Lowercase, collapse whitespace and drop surrounding punctuation"""
+    return ' '.join(query.lower().split()).strip('?!.,;: ')
+
+
+def classify_query(query: str) -> str:
+    """Rough query class used to pick a cache TTL"""
+    text = normalize_query(query)
+    for name, pattern in QUERY_CLASS_PATTERNS:
+        if pattern.search(text):
+            return name
+    return 'general'
+
+
+class SearchResultCache:
+    """
+    Persistent SQLite cache of search results
+    Keyed on normalized query + engine, with TTLs that depend on query class
+    (minutes for weather, hours for news, days for definitions)
+    """
+    
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, ttls: Dict[str, float] = None,
+                 stale_factor: float = 4.0):
+        self.path = path
+        self.ttls = dict(QUERY_CLASS_TTLS, **(ttls or {}))
+        # Expired results stay servable (while revalidating) until ttl * stale_factor
+        self.stale_factor = stale_factor
+        self._lock = threading.Lock()
+        self._conn = open_database(path)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                " engine TEXT NOT NULL, query TEXT NOT NULL, result TEXT NOT NULL,"
+                " fetched_at REAL NOT NULL, ttl REAL NOT NULL,"
+                " PRIMARY KEY (engine, query))"
+            )
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+    
+    def get(self, query: str, engine: str) -> Tuple[Optional[Dict], bool]:
+        """Return (result, is_fresh), or (None, False) on a miss"""
+        key = normalize_query(query)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT result, fetched_at, ttl FROM results WHERE engine = ? AND query = ?",
+                (engine, key)
+            ).fetchone()
+        
+        if row is None:
+            self.misses += 1
+            return None, False
+        
+        result, fetched_at, ttl = row
+        age = time.time() - fetched_at
+        if age >= ttl * self.stale_factor:
+            self.delete(query, engine)
+            self.misses += 1
+            return None, False
+        
+        fresh = age < ttl
+        if fresh:
+            self.hits += 1
+        else:
+            self.stale_hits += 1
+        return json.loads(result), fresh
+    
+    def put(self, query: str, engine: str, result: Dict):
+        """Store a result with the TTL of its query class"""
+        ttl = self.ttls[classify_query(query)]
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results (engine, query, result, fetched_at, ttl) VALUES (?, ?, ?, ?, ?)",
+                (engine, normalize_query(query), json.dumps(result), time.time(), ttl)
+            )
+    
+    def delete(self, query: str, engine: str):
+        """Forget one cached result"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM results WHERE engine = ? AND query = ?",
+                               (engine, normalize_query(query)))
+    
+    def purge_expired(self) -> int:
+        """Delete results past their stale window, returns how many were removed"""
+        with self._lock, self._conn:
+            cursor = self._conn.execute("DELETE FROM results WHERE fetched_at + ttl * ? <= ?",
+                                        (self.stale_factor, time.time()))
+            return cursor.rowcount
+    
+    def close(self):
+        """Close the database connection"""
+        with self._lock:
+            self._conn.close()
+    
+    def stats(self) -> Dict:
+        """Hit/miss counters and number of stored results"""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        return {
+            'hits': self.hits,
+            'stale_hits': self.stale_hits,
+            'misses': self.misses,
+            'entries': entries
+        }
+
+
+class EngineHealth:
+    """
+    Rolling outcome and latency window for one search engine, plus a circuit breaker
+    After failure_threshold consecutive errors the breaker opens and the engine
+    is skipped for cooldown seconds; then a single trial request is let through
+    (half-open) and its outcome closes or re-opens the breaker
+    """
+    
+    def __init__(self, window: int = 50, failure_threshold: int = 3,
+                 cooldown: float = 30.0, min_samples: int = 5):
+        self.outcomes = deque(maxlen=window)  # (outcome, seconds) with outcome answer/empty/error
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.min_samples = min_samples
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self._trial_started = None
+        self._lock = threading.Lock()
+    
+    def record(self, outcome: str, seconds: float):
+        """Add one request outcome and update the breaker"""
+        with self._lock:
+            self.outcomes.append((outcome, seconds))
+            self._trial_started = None
+            if outcome == 'error':
+                self.consecutive_failures += 1
+                if self.consecutive_failures >= self.failure_threshold:
+                    self.open_until = time.monotonic() + self.cooldown
+            else:
+                self.consecutive_failures = 0
+                self.open_until = 0.0
+    
+    @property
+    def state(self) -> str:
+        if self.consecutive_failures < self.failure_threshold:
+            return 'closed'
+        return 'open' if time.monotonic() < self.open_until else 'half-open'
+    
+    def allow(self, claim: bool = True) -> bool:
+        """
+        Whether a request may go to the engine now
+        In the half-open state this claims the single trial; an unused claim
+        lapses after another cooldown
+        """
+        with self._lock:
+            state = self.state
+            if state == 'closed':
+                return True
+            if state == 'open':
+                return False
+            now = time.monotonic()
+            if self._trial_started is not None and now - self._trial_started < self.cooldown:
+                return False
+            if claim:
+                self._trial_started = now
+            return True
+    
+    def _rate(self, outcome: str) -> float:
+        if not self.outcomes:
+            return 0.0
+        return sum(1 for o, _ in self.outcomes if o == outcome) / len(self.outcomes)
+    
+    def answer_latency(self, quantile: float) -> Optional[float]:
+        """Latency quantile of requests that produced an answer"""
+        samples = sorted(seconds for o, seconds in self.outcomes if o == 'answer')
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(len(samples) * quantile))]
+    
+    def expected_cost(self) -> Optional[float]:
+        """Median answer latency divided by answer rate, None until enough samples"""
+        with self._lock:
+            if len(self.outcomes) < self.min_samples:
+                return None
+            p50 = self.answer_latency(0.5)
+            if p50 is None:
+                return float('inf')
+            return p50 / self._rate('answer')
+    
+    def summary(self) -> Dict:
+        """Rates, latency percentiles in milliseconds and breaker state"""
+        with self._lock:
+            p50 = self.answer_latency(0.5)
+            p95 = self.answer_latency(0.95)
+            return {
+                'requests': len(self.outcomes),
+                'success_rate': self._rate('answer'),
+                'empty_rate': self._rate('empty'),
+                'error_rate': self._rate('error'),
+                'p50_ms': p50 * 1000.0 if p50 is not None else None,
+                'p95_ms': p95 * 1000.0 if p95 is not None else None,
+                'state': self.state
+            }
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, bursts up to `capacity`"""
+    
+    def __init__(self, rate: float = 1.0, capacity: float = 3.0):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+    
+    def available(self) -> bool:
+        """Whether a token could be taken right now"""
+        with self._lock:
+            self._refill()
+            return self.tokens >= 1.0
+    
+    def try_acquire(self) -> bool:
+        """Take one token without waiting"""
+        with self._lock:
+            self._refill()
+            if self.tokens < 1.0:
+                return False
+            self.tokens -= 1.0
+            return True
+
+
+class QuotaLedger:
+    """
+    Persistent monthly request counts per API key (SQLite)
+    Keys are stored as a SHA-256 prefix, never in clear text. The last
+    `reserve` fraction of the monthly limit is kept for high-value queries.
+    """
+    
+    def __init__(self, path: str = DEFAULT_QUOTA_PATH, monthly_limit: int = 100, reserve: float = 0.2):
+        self.path = path
+        self.monthly_limit = monthly_limit
+        self.reserve = reserve
+        self._lock = threading.Lock()
+        self._conn = open_database(path)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS usage ("
+                " key_id TEXT NOT NULL, month TEXT NOT NULL, used INTEGER NOT NULL,"
+                " PRIMARY KEY (key_id, month))"
+            )
+        self.denied = 0
+    
+    @staticmethod
+    def key_id(api_key: str) -> str:
+        return hashlib.sha256(api_key.encode('utf-8')).hexdigest()[:16]
+    
+    @staticmethod
+    def current_month() -> str:
+        return time.strftime('%Y-%m', time.gmtime())
+    
+    def used(self, api_key: str) -> int:
+        """Requests made with this key in the current month"""
+        with self._lock:
+            row = self._conn.execute("SELECT used FROM usage WHERE key_id = ? AND month = ?",
+                                     (self.key_id(api_key), self.current_month())).fetchone()
+        return row[0] if row else 0
+    
+    def remaining(self, api_key: str) -> int:
+        return max(0, self.monthly_limit - self.used(api_key))
+    
+    def allows(self, api_key: str, high_value: bool = True) -> bool:
+        """Whether a query may spend quota; the reserved tail is for high-value ones"""
+        remaining = self.remaining(api_key)
+        if remaining <= 0:
+            return False
+        return high_value or remaining > self.monthly_limit * self.reserve
+    
+    def try_consume(self, api_key: str, high_value: bool = True) -> bool:
+        """
+        Count one request if the quota allows it
+        The check and the increment are one conditional UPDATE, so concurrent
+        searches cannot all pass the check and overshoot the limit
+        """
+        cap = self.monthly_limit if high_value else self.monthly_limit * (1 - self.reserve)
+        key = (self.key_id(api_key), self.current_month())
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR IGNORE INTO usage (key_id, month, used) VALUES (?, ?, 0)", key)
+            cursor = self._conn.execute(
+                "UPDATE usage SET used = used + 1 WHERE key_id = ? AND month = ? AND used < ?",
+                key + (cap,)
+            )
+            if cursor.rowcount == 0:
+                self.denied += 1
+                return False
+        return True
+    
+    def charge(self, api_key: str, requests: int):
+        """Count requests already made outside try_consume (e.g. retries), even past the limit"""
+        if requests <= 0:
+            return
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO usage (key_id, month, used) VALUES (?, ?, ?) "
+                "ON CONFLICT (key_id, month) DO UPDATE SET used = used + excluded.used",
+                (self.key_id(api_key), self.current_month(), requests)
+            )
+    
+    def close(self):
+        with self._lock:
+            self._conn.close()
+    
+    def stats(self, api_key: Optional[str]) -> Dict:
+        """Usage for a key this month"""
+        if not api_key:
+            return {'limit': self.monthly_limit, 'denied': self.denied}
+        used = self.used(api_key)
+        return {
+            'month': self.current_month(),
+            'used': used,
+            'remaining': max(0, self.monthly_limit - used),
+            'limit': self.monthly_limit,
+            'reserved': int(self.monthly_limit * self.reserve),
+            'denied': self.denied
+        }
+
+
+class PassageExtractor(HTMLParser):
+    """
+    Incremental HTML to text passages
+    Text inside block elements becomes one passage; scripts, styles and page
+    chrome (nav, header, footer, forms) are skipped. feed() can be called
+    with each downloaded chunk as it arrives.
+    """
+    
+    SKIP_TAGS = {'script', 'style', 'noscript', 'template', 'svg', 'nav', 'header', 'footer', 'form', 'aside'}
+    BLOCK_TAGS = {'p', 'div', 'li', 'td', 'th', 'dd', 'dt', 'section', 'article', 'blockquote',
+                  'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'br', 'tr', 'pre', 'main'}
+    
+    def __init__(self, min_length: int = 40, max_passages: int = 400):
+        super().__init__(convert_charrefs=True)
+        self.min_length = min_length
+        self.max_passages = max_passages
+        self.passages = []
+        self.title = ''
+        self._skip_depth = 0
+        self._in_title = False
+        self._buffer = []
+    
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP_TAGS:
+            self._skip_depth += 1
+        elif tag == 'title':
+            self._in_title = True
+        elif tag in self.BLOCK_TAGS:
+            self._flush()
+    
+    def handle_endtag(self, tag):
+        if tag in self.SKIP_TAGS:
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif tag == 'title':
+            self._in_title = False
+        elif tag in self.BLOCK_TAGS:
+            self._flush()
+    
+    def handle_data(self, data):
+        if self._in_title:
+            self.title += data
+        elif not self._skip_depth:
+            self._buffer.append(data)
+    
+    def _flush(self):
+        text = ' '.join(''.join(self._buffer).split())
+        self._buffer = []
+        if len(text) >= self.min_length and len(self.passages) < self.max_passages:
+            self.passages.append(text)
+    
+    def close(self):
+        super().close()
+        self._flush()
+    
+    @property
+    def full(self) -> bool:
+        return len(self.passages) >= self.max_passages
+
+
+def term_overlap(query: str, passage: str) -> float:
+    """Fraction of the query's words that appear in the passage"""
+    terms = {t for t in TERM_PATTERN.findall(query.lower()) if len(t) > 2 and t not in QUESTION_WORDS}
+    if not terms:
+        return 0.0
+    words = set(TERM_PATTERN.findall(passage.lower()))
+    return len(terms & words) / len(terms)
+
 
 class FreeSearchEngine:
     """
@@ -20,14 +478,34 @@ class FreeSearchEngine:
     Auto-fallback system: Tries each API in order until one succeeds
     """
     
-    def __init__(self):
-        """Initialize all available search engines"""
+    def __init__(self, cache_path: Optional[str] = DEFAULT_CACHE_PATH,
+                 quota_path: Optional[str] = DEFAULT_QUOTA_PATH,
+                 local_index_path: Optional[str] = os.environ.get('ALIAS_LOCAL_INDEX', 'local_index')):
+        """
+        Initialize all available search engines
+        cache_path=None disables caching, quota_path=None keeps the SearchApi.io
+        quota ledger in memory only, local_index_path points at an index built
+        by local_index.py (used when it exists)
+        """
         self.headers = {
             'User-Agent': 'ALIAS/1.0 (Educational AI Assistant; https://github.com/daemonw628-ops/ALIAS)'
         }
+        self.http = get_client()
+        self.duckduckgo_url = DUCKDUCKGO_API_URL
+        self.searchapi_url = SEARCHAPI_URL
         
         # SearchApi.io - Free tier available (optional API key for more requests)
         self.searchapi_key = None  # Set to enable SearchApi.io
+        self.searchapi_rate = TokenBucket(rate=1.0, capacity=3.0)
+        try:
+            self.searchapi_quota = QuotaLedger(quota_path or ':memory:')
+        except sqlite3.Error as e:
+            logger.warning(f"Quota ledger not persistent: {e}")
+            self.searchapi_quota = QuotaLedger(':memory:')
+        # Optional query -> score in [0, 1] (e.g. the intent classifier's web
+        # probability); queries at or above the threshold may use reserved quota
+        self.query_scorer = None
+        self.high_value_threshold = 0.8
         
         # Check if search-engines library is available
         self.search_engines_available = False
@@ -39,50 +517,266 @@ class FreeSearchEngine:
         except ImportError:
             logger.info("search-engines library not installed (optional)")
         
+        # Offline corpus index, answers in milliseconds without the network
+        self.local_index = None
+        if local_index_path and os.path.exists(os.path.join(local_index_path, 'index.json')):
+            try:
+                from local_index import LocalIndex
+                self.local_index = LocalIndex(local_index_path)
+                logger.info(f"Local index loaded ({self.local_index.info['passages']} passages)")
+            except (ImportError, ValueError, OSError) as e:
+                logger.warning(f"Local index not loaded: {e}")
+        
         # Available search engines in priority order
         self.engines = [
+            'local_index',     # Offline corpus, skipped for time-sensitive queries
             'duckduckgo',      # Free, no API key, instant answers
             'searchapi',       # Free tier, structured results
             'search_engines',  # Library-based scraping
         ]
         
+        # Persistent result cache, stale entries are refreshed in the background
+        self.cache = None
+        if cache_path:
+            try:
+                self.cache = SearchResultCache(cache_path)
+            except sqlite3.Error as e:
+                logger.warning(f"Search cache disabled: {e}")
+        self._revalidating = set()
+        self._revalidating_lock = threading.Lock()
+        
+        # Single-flight: concurrent searches for the same normalized query share
+        # one outbound request and its result
+        self._flights = {}
+        self._flights_lock = threading.Lock()
+        self.coalesced = 0
+        
+        # How engines are queried:
+        #   'sequential' - one after another in priority order
+        #   'parallel'   - all at once, first non-empty answer wins
+        #   'hedged'     - primary first, the rest once it is slower than its usual p75
+        self.search_mode = 'hedged'
+        self.hedge_delay = 0.3  # Seconds before hedging until an engine has latency history
+        self.hedge_quantile = 0.75  # Hedge once the primary is slower than this share of its answers
+        self.max_hedge_delay = 0.5  # Upper bound, so a slow primary's own tail never sets the delay
+        self._executor = None
+        
+        # Per-engine outcome stats and circuit breakers; the engine order adapts
+        # toward the cheapest engine that actually answers
+        self.adaptive_order = True
+        self.health = {engine: EngineHealth() for engine in self.engines}
+        self.last_winner = None
+        self.wins = Counter()
+        self._async = None
+        
+        # Snippet extraction for the scraping library: top pages are fetched in
+        # parallel, each read is capped, and the whole stage has one deadline
+        self.snippet_pages = 3
+        self.max_page_bytes = 256 * 1024
+        self.max_passage_chars = 500
+        self.snippet_timeout = 4.0
+        self.passage_scorer = None
+        self._page_executor = None
+        
     def search(self, query: str, max_results: int = 1) -> Dict[str, any]:
         """
         Search using the best available engine
         Returns structured result with answer, source, and metadata
+        Cached results are served first; a stale one is returned at once
+        while a background refresh fetches the new answer. Runs on the async
+        core, so sync and async searches share one cache check, single-flight
+        table and overall deadline (AsyncFreeSearchEngine.timeout)
+        """
+        return self.aio.search_sync(query, max_results)
+    
+    def search_many(self, queries: List[str], concurrency: int = 4,
+                    max_results: int = 1) -> Iterator[Dict[str, any]]:
+        """
+        Search a batch of queries with bounded parallelism
+        Duplicate queries (after normalization) are searched once and cached
+        ones are answered first. Yields one record per input query, in
+        completion order: {'index', 'query', 'result', 'seconds', 'cached'}
         """
+        groups = {}  # Normalized query -> input positions
+        for index, query in enumerate(queries):
+            groups.setdefault(normalize_query(query), []).append(index)
         
-        # Try each engine in order
-        for engine in self.engines:
+        def records(key: str, result: Dict[str, any], seconds: float) -> Iterator[Dict[str, any]]:
+            for index in groups[key]:
+                yield {
+                    'index': index,
+                    'query': queries[index],
+                    'result': result,
+                    'seconds': seconds,
+                    'cached': bool(result.get('cached'))
+                }
+        
+        pending = []
+        for key, indices in groups.items():
+            cached, fresh = self.cache.get(queries[indices[0]], 'auto') if self.cache else (None, False)
+            if cached is not None and fresh:
+                cached['cached'] = True
+                yield from records(key, cached, 0.0)
+            else:
+                pending.append(key)
+        
+        def timed_search(key: str) -> Tuple[str, Dict[str, any], float]:
+            start = time.perf_counter()
+            result = self.search(queries[groups[key][0]], max_results)
+            return key, result, time.perf_counter() - start
+        
+        with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix='alias-batch') as pool:
+            futures = [pool.submit(timed_search, key) for key in pending]
             try:
-                if engine == 'duckduckgo':
-                    result = self._search_duckduckgo(query)
-                    if result.get('answer'):
-                        result['engine'] = 'DuckDuckGo Instant Answer'
-                        return result
-                
-                elif engine == 'searchapi' and self.searchapi_key:
-                    result = self._search_searchapi(query, max_results)
-                    if result.get('answer'):
-                        result['engine'] = 'SearchApi.io'
-                        return result
-                
-                elif engine == 'search_engines' and self.search_engines_available:
-                    result = self._search_with_library(query, max_results)
-                    if result.get('answer'):
-                        result['engine'] = 'Multi-Engine Scraper'
-                        return result
-                        
-            except Exception as e:
-                logger.warning(f"Search engine {engine} failed: {e}")
-                continue
+                for future in as_completed(futures):
+                    yield from records(*future.result())
+            finally:
+                # The consumer stopped early: drop queries that have not started
+                for future in futures:
+                    future.cancel()
+    
+    def _join_flight(self, key: Tuple[str, int]) -> Tuple[Future, bool]:
+        """Return (future, is_leader) for the in-flight search with this key"""
+        with self._flights_lock:
+            future = self._flights.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return future, False
+            future = Future()
+            self._flights[key] = future
+            return future, True
+    
+    def _finish_flight(self, key: Tuple[str, int], future: Future,
+                       result: Optional[Dict] = None, error: Optional[BaseException] = None):
+        """Hand the leader's outcome to every waiting follower"""
+        with self._flights_lock:
+            self._flights.pop(key, None)
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(dict(result))
+    
+    @property
+    def aio(self) -> 'AsyncFreeSearchEngine':
+        """Async client sharing this engine's cache and settings, on the shared search loop"""
+        if self._async is None:
+            self._async = AsyncFreeSearchEngine(self)
+        return self._async
+    
+    def _revalidate(self, query: str, max_results: int):
+        """Refresh a stale cached result in the background on the search loop (once per query)"""
+        key = normalize_query(query)
+        with self._revalidating_lock:
+            if key in self._revalidating:
+                return
+            self._revalidating.add(key)
         
-        # No results from any engine
-        return {
-            'answer': '',
-            'error': 'No search results available',
-            'engine': 'none'
-        }
+        def done(_):
+            with self._revalidating_lock:
+                self._revalidating.discard(key)
+        
+        self.aio.submit(self.aio._fetch_shared(query, max_results, None)).add_done_callback(done)
+    
+    ENGINE_LABELS = {
+        'local_index': 'Local Index',
+        'duckduckgo': 'DuckDuckGo Instant Answer',
+        'searchapi': 'SearchApi.io',
+        'search_engines': 'Multi-Engine Scraper',
+    }
+    
+    def _engine_available(self, engine: str, query: Optional[str] = None) -> bool:
+        """Whether an engine can be queried right now (for this query, if given)"""
+        if engine == 'searchapi':
+            if not self.searchapi_key:
+                return False
+            if query is None:
+                return True
+            return (self.searchapi_rate.available()
+                    and self.searchapi_quota.allows(self.searchapi_key, self._is_high_value(query)))
+        if engine == 'search_engines':
+            return self.search_engines_available
+        if engine == 'local_index':
+            # A static corpus cannot answer weather, prices, scores or news
+            return self.local_index is not None and (
+                query is None or classify_query(query) not in LIVE_QUERY_CLASSES)
+        return engine in self.ENGINE_LABELS
+    
+    def _health(self, engine: str) -> EngineHealth:
+        if engine not in self.health:
+            self.health[engine] = EngineHealth()
+        return self.health[engine]
+    
+    def _ordered_engines(self, query: Optional[str] = None) -> List[str]:
+        """
+        Available engines whose breaker lets a request through, in query order
+        Engines with enough history are re-ranked by expected cost among the
+        slots they occupy; the rest keep their configured position. Nothing is
+        claimed here: a half-open trial is claimed only when an engine is started
+        """
+        engines = [engine for engine in self.engines
+                   if self._engine_available(engine, query) and self._health(engine).allow(claim=False)]
+        if not self.adaptive_order:
+            return engines
+        
+        costs = {engine: self._health(engine).expected_cost() for engine in engines}
+        ranked = [engine for engine in engines if costs[engine] is not None]
+        slots = iter(sorted(ranked, key=lambda engine: costs[engine]))
+        return [next(slots) if costs[engine] is not None else engine for engine in engines]
+    
+    def _run_engine(self, engine: str, query: str, max_results: int) -> Dict[str, any]:
+        """Query one engine, labelling answers and recording the outcome"""
+        start = time.perf_counter()
+        try:
+            if engine == 'duckduckgo':
+                result = self._search_duckduckgo(query)
+            elif engine == 'searchapi':
+                result = self._search_searchapi(query, max_results)
+            elif engine == 'search_engines':
+                result = self._search_with_library(query, max_results)
+            elif engine == 'local_index':
+                result = self.local_index.answer(query)
+            else:
+                return {'answer': ''}
+        except Exception:
+            self._health(engine).record('error', time.perf_counter() - start)
+            raise
+        return self._record_outcome(engine, result, time.perf_counter() - start)
+    
+    def _record_outcome(self, engine: str, result: Dict[str, any], seconds: float) -> Dict[str, any]:
+        """Feed one engine response into its health stats and label answers"""
+        if result.get('answer'):
+            self._health(engine).record('answer', seconds)
+            result['engine'] = self.ENGINE_LABELS[engine]
+        elif result.get('error'):
+            self._health(engine).record('error', seconds)
+            logger.warning(f"{self.ENGINE_LABELS[engine]} failed ({self._health(engine).state}): {result['error']}")
+        else:
+            self._health(engine).record('empty', seconds)
+        return result
+    
+    def _hedge_delay_for(self, engine: str) -> float:
+        """
+        hedge_quantile latency of an engine's answers (the default before enough
+        samples), capped at max_hedge_delay
+        """
+        health = self._health(engine)
+        with health._lock:
+            latency = health.answer_latency(self.hedge_quantile)
+            enough = len(health.outcomes) >= health.min_samples
+        if latency is None or not enough:
+            return min(self.hedge_delay, self.max_hedge_delay)
+        return min(latency, self.max_hedge_delay)
+    
+    def _record_winner(self, engine: str, result: Dict[str, any]) -> Dict[str, any]:
+        self.last_winner = engine
+        self.wins[engine] += 1
+        return result
+    
+    def _engine_pool(self) -> ThreadPoolExecutor:
+        """Threads for engine calls that block (the scraping library, or all of them without aiohttp)"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='alias-search')
+        return self._executor
     
     def _search_duckduckgo(self, query: str) -> Dict[str, str]:
         """
@@ -90,48 +784,12 @@ class FreeSearchEngine:
         Free, no API key, excellent for facts and definitions
         """
         try:
-            api_url = f"https://api.duckduckgo.com/?q={quote(query)}&format=json&no_html=1&skip_disambig=1"
-            response = requests.get(api_url, headers=self.headers, timeout=5)
+            response = self.http.get(self._duckduckgo_url(query), 'duckduckgo', headers=self.headers)
             
             if response.status_code != 200:
-                return {'answer': ''}
-            
-            data = response.json()
-            
-            # Try Abstract (best for informational queries)
-            if data.get('Abstract'):
-                return {
-                    'answer': unescape(data['Abstract']),
-                    'source': data.get('AbstractURL', ''),
-                    'title': data.get('Heading', query)
-                }
+                return {'answer': '', 'error': f"HTTP {response.status_code}"}
             
-            # Try Answer (for quick facts)
-            if data.get('Answer'):
-                answer_text = unescape(data['Answer'])
-                return {
-                    'answer': answer_text,
-                    'source': data.get('AbstractURL', ''),
-                    'title': query
-                }
-            
-            # Try Definition
-            if data.get('Definition'):
-                return {
-                    'answer': data['Definition'],
-                    'source': data.get('DefinitionURL', ''),
-                    'title': query
-                }
-            
-            # Try RelatedTopics
-            if data.get('RelatedTopics') and len(data['RelatedTopics']) > 0:
-                first_topic = data['RelatedTopics'][0]
-                if isinstance(first_topic, dict) and first_topic.get('Text'):
-                    return {
-                        'answer': first_topic['Text'],
-                        'source': first_topic.get('FirstURL', ''),
-                        'title': query
-                    }
+            return self._parse_duckduckgo(response.json(), query)
             
         except Exception as e:
             logger.error(f"DuckDuckGo search error: {e}")
@@ -145,107 +803,259 @@ class FreeSearchEngine:
         Free tier: 100 searches/month without credit card
         Returns structured JSON results
         """
-        if not self.searchapi_key:
+        if not self._claim_searchapi(query):
             return {'answer': ''}
         
         try:
             # SearchApi.io endpoint for Google search
-            api_url = "https://www.searchapi.io/api/v1/search"
-            params = {
-                'engine': 'google',
-                'q': query,
-                'api_key': self.searchapi_key,
-                'num': max_results
-            }
-            
-            response = requests.get(api_url, params=params, timeout=10)
+            params = self._searchapi_params(query, max_results)
+            response = self.http.get(self.searchapi_url, 'searchapi', params=params)
+            # try_consume paid for one request; retried ones are billed too
+            self.searchapi_quota.charge(self.searchapi_key, self.http.server_attempts(response) - 1)
             
             if response.status_code != 200:
-                return {'answer': ''}
-            
-            data = response.json()
-            
-            # Try answer box (featured snippet)
-            if data.get('answer_box'):
-                box = data['answer_box']
-                answer = box.get('answer') or box.get('snippet')
-                if answer:
-                    return {
-                        'answer': answer,
-                        'source': box.get('link', ''),
-                        'title': box.get('title', query)
-                    }
+                return {'answer': '', 'error': f"HTTP {response.status_code}"}
             
-            # Try knowledge graph
-            if data.get('knowledge_graph'):
-                kg = data['knowledge_graph']
-                description = kg.get('description')
-                if description:
-                    return {
-                        'answer': description,
-                        'source': kg.get('source', {}).get('link', ''),
-                        'title': kg.get('title', query)
-                    }
+            return self._parse_searchapi(response.json(), query)
             
-            # Try organic results
-            if data.get('organic_results') and len(data['organic_results']) > 0:
-                first = data['organic_results'][0]
-                return {
-                    'answer': first.get('snippet', ''),
-                    'source': first.get('link', ''),
-                    'title': first.get('title', query)
-                }
-                
         except Exception as e:
             logger.error(f"SearchApi.io error: {e}")
             return {'answer': '', 'error': str(e)}
         
         return {'answer': ''}
     
+    def _is_high_value(self, query: str) -> bool:
+        """High-value queries may spend the reserved tail of the SearchApi.io quota"""
+        if self.query_scorer is None:
+            return True
+        try:
+            return self.query_scorer(query) >= self.high_value_threshold
+        except Exception as e:
+            logger.warning(f"Query scorer failed: {e}")
+            return False
+    
+    def _claim_searchapi(self, query: str) -> bool:
+        """Take a rate-limit token and one unit of monthly quota, or refuse at once"""
+        if not self.searchapi_key:
+            return False
+        if not self.searchapi_rate.try_acquire():
+            return False
+        return self.searchapi_quota.try_consume(self.searchapi_key, self._is_high_value(query))
+    
+    def _duckduckgo_url(self, query: str) -> str:
+        return f"{self.duckduckgo_url}?q={quote(query)}&format=json&no_html=1&skip_disambig=1"
+    
+    def _searchapi_params(self, query: str, max_results: int) -> Dict:
+        return {
+            'engine': 'google',
+            'q': query,
+            'api_key': self.searchapi_key,
+            'num': max_results
+        }
+    
+    @staticmethod
+    def _parse_duckduckgo(data: Dict, query: str) -> Dict[str, str]:
+        """Pick the best answer out of an Instant Answer API response"""
+        # Try Abstract (best for informational queries)
+        if data.get('Abstract'):
+            return {
+                'answer': unescape(data['Abstract']),
+                'source': data.get('AbstractURL', ''),
+                'title': data.get('Heading', query)
+            }
+        
+        # Try Answer (for quick facts)
+        if data.get('Answer'):
+            answer_text = unescape(data['Answer'])
+            return {
+                'answer': answer_text,
+                'source': data.get('AbstractURL', ''),
+                'title': query
+            }
+        
+        # Try Definition
+        if data.get('Definition'):
+            return {
+                'answer': data['Definition'],
+                'source': data.get('DefinitionURL', ''),
+                'title': query
+            }
+        
+        # Try RelatedTopics
+        if data.get('RelatedTopics') and len(data['RelatedTopics']) > 0:
+            first_topic = data['RelatedTopics'][0]
+            if isinstance(first_topic, dict) and first_topic.get('Text'):
+                return {
+                    'answer': first_topic['Text'],
+                    'source': first_topic.get('FirstURL', ''),
+                    'title': query
+                }
+        
+        return {'answer': ''}
+    
+    @staticmethod
+    def _parse_searchapi(data: Dict, query: str) -> Dict[str, str]:
+        """Pick the best answer out of a SearchApi.io Google response"""
+        # Try answer box (featured snippet)
+        if data.get('answer_box'):
+            box = data['answer_box']
+            answer = box.get('answer') or box.get('snippet')
+            if answer:
+                return {
+                    'answer': answer,
+                    'source': box.get('link', ''),
+                    'title': box.get('title', query)
+                }
+        
+        # Try knowledge graph
+        if data.get('knowledge_graph'):
+            kg = data['knowledge_graph']
+            description = kg.get('description')
+            if description:
+                return {
+                    'answer': description,
+                    'source': kg.get('source', {}).get('link', ''),
+                    'title': kg.get('title', query)
+                }
+        
+        # Try organic results
+        if data.get('organic_results') and len(data['organic_results']) > 0:
+            first = data['organic_results'][0]
+            return {
+                'answer': first.get('snippet', ''),
+                'source': first.get('link', ''),
+                'title': first.get('title', query)
+            }
+        
+        return {'answer': ''}
+    
     def _search_with_library(self, query: str, max_results: int = 1) -> Dict[str, str]:
         """
         search-engines library - Multi-engine scraping
-        Tries Google, Bing, Yahoo, etc. in sequence
-        DIY scraping with full control
+        Google and Bing are queried concurrently, then the top result pages
+        are downloaded in parallel and the passage that best answers the
+        query is returned
         """
         if not self.search_engines_available:
             return {'answer': ''}
         
+        # One deadline for the link search and the page downloads together
+        deadline = time.monotonic() + self.snippet_timeout
         try:
-            # Try Google first (most reliable)
-            google = self.search_engines.Google()
-            results = google.search(query, pages=1)
-            links = list(results.links())
-            
-            if links:
-                # Get the first result and fetch its content
-                # Note: We can't easily extract snippets without additional parsing
-                # So we return the URL and let the user know
-                return {
-                    'answer': f"Found relevant information at: {links[0]}",
-                    'source': links[0],
-                    'title': query,
-                    'note': 'Visit the link for full details'
-                }
-            
-            # Fallback to Bing
-            bing = self.search_engines.Bing()
-            results = bing.search(query, pages=1)
-            links = list(results.links())
-            
-            if links:
-                return {
-                    'answer': f"Found relevant information at: {links[0]}",
-                    'source': links[0],
-                    'title': query,
-                    'note': 'Visit the link for full details'
-                }
-                
+            links = self._library_links(query, deadline)
         except Exception as e:
             logger.error(f"search-engines library error: {e}")
             return {'answer': '', 'error': str(e)}
         
-        return {'answer': ''}
+        if not links:
+            return {'answer': ''}
+        
+        best = self._best_passage(query, links, deadline)
+        if best is not None:
+            return best
+        
+        # No page could be read in time, point at the top result instead
+        return {
+            'answer': f"Found relevant information at: {links[0]}",
+            'source': links[0],
+            'title': query,
+            'note': 'Visit the link for full details'
+        }
+    
+    def _library_links(self, query: str, deadline: float) -> List[str]:
+        """Result links from Google and Bing searched concurrently, Google first"""
+        def links_from(engine_name: str) -> List[str]:
+            engine = getattr(self.search_engines, engine_name)()
+            return list(engine.search(query, pages=1).links())
+        
+        futures = [self._fetch_pool().submit(links_from, name) for name in ('Google', 'Bing')]
+        links = []
+        for future in futures:
+            try:
+                for link in future.result(timeout=max(0.0, deadline - time.monotonic())):
+                    if link not in links:
+                        links.append(link)
+            except Exception as e:
+                logger.warning(f"search-engines library error: {e}")
+        return links
+    
+    def _fetch_pool(self) -> ThreadPoolExecutor:
+        """Pool for page downloads, separate from the engine fan-out pool"""
+        if self._page_executor is None:
+            self._page_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='alias-fetch')
+        return self._page_executor
+    
+    def _fetch_passages(self, url: str, deadline: float) -> Tuple[str, List[str]]:
+        """
+        Stream one HTML page through the extractor, stopping at max_page_bytes,
+        the deadline or once enough passages are collected
+        """
+        extractor = PassageExtractor()
+        response = self.http.get(url, 'page_fetch', headers=self.headers, stream=True)
+        try:
+            if response.status_code != 200 or 'html' not in response.headers.get('Content-Type', 'text/html'):
+                return '', []
+            received = 0
+            # Without a declared charset requests assumes ISO-8859-1; most pages are UTF-8
+            declared = 'charset' in response.headers.get('Content-Type', '').lower()
+            try:
+                decoder = codecs.getincrementaldecoder(response.encoding if declared else 'utf-8')(errors='replace')
+            except LookupError:
+                decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+            # The incremental decoder keeps multi-byte characters split across chunks intact
+            for chunk in response.iter_content(chunk_size=16384):
+                received += len(chunk)
+                extractor.feed(decoder.decode(chunk))
+                if received >= self.max_page_bytes or extractor.full or time.monotonic() >= deadline:
+                    break
+            extractor.feed(decoder.decode(b'', final=True))
+        finally:
+            response.close()
+        extractor.close()
+        return ' '.join(extractor.title.split()), extractor.passages
+    
+    def _best_passage(self, query: str, links: List[str], deadline: float) -> Optional[Dict[str, str]]:
+        """Download the top pages in parallel and pick the best passage across them"""
+        futures = {self._fetch_pool().submit(self._fetch_passages, url, deadline): url
+                   for url in links[:self.snippet_pages]}
+        done, not_done = wait(futures, timeout=max(0.0, deadline - time.monotonic()))
+        for future in not_done:
+            future.cancel()
+        
+        candidates = []  # (passage, url, title)
+        for future in done:
+            try:
+                title, passages = future.result()
+            except Exception as e:
+                logger.warning(f"Page fetch failed for {futures[future]}: {e}")
+                continue
+            candidates.extend((passage, futures[future], title) for passage in passages)
+        if not candidates:
+            return None
+        
+        passages = [passage for passage, _, _ in candidates]
+        scores = [term_overlap(query, passage) for passage in passages]
+        if self.passage_scorer is not None:
+            try:
+                similarity = self.passage_scorer(query, passages)
+                scores = [overlap + float(sim) for overlap, sim in zip(scores, similarity)]
+            except Exception as e:
+                logger.warning(f"Passage scorer failed: {e}")
+        
+        best = max(range(len(candidates)), key=scores.__getitem__)
+        if scores[best] <= 0:
+            return None
+        passage, url, title = candidates[best]
+        if len(passage) > self.max_passage_chars:
+            passage = passage[:self.max_passage_chars].rsplit(' ', 1)[0] + '...'
+        return {'answer': passage, 'source': url, 'title': title or query}
+    
+    def set_passage_scorer(self, scorer):
+        """
+        Rank extracted passages by similarity to the query
+        scorer(query, passages) -> one float per passage, added to the term overlap
+        """
+        self.passage_scorer = scorer
     
     def search_and_format(self, query: str) -> str:
         """
@@ -283,16 +1093,54 @@ class FreeSearchEngine:
                 self.engines.insert(0, 'searchapi')
             logger.info("SearchApi.io enabled with API key")
     
+    def set_query_scorer(self, scorer, threshold: float = 0.8):
+        """
+        Score queries for the SearchApi.io quota reserve
+        scorer(query) -> float in [0, 1]; without one every query counts as high-value
+        """
+        self.query_scorer = scorer
+        self.high_value_threshold = threshold
+    
+    def get_search_stats(self) -> Dict:
+        """Cache statistics for this engine"""
+        return {
+            'cache': self.cache.stats() if self.cache else None,
+            'search_mode': self.search_mode,
+            'last_winner': self.last_winner,
+            'wins': dict(self.wins),
+            'coalesced': self.coalesced,
+            'searchapi_quota': self.searchapi_quota.stats(self.searchapi_key)
+        }
+    
+    def get_engine_stats(self) -> Dict:
+        """Per-engine success/empty/error rates, answer latency p50/p95 and breaker state"""
+        stats = {}
+        for engine in self.engines:
+            summary = self._health(engine).summary()
+            summary['label'] = self.ENGINE_LABELS.get(engine, engine)
+            summary['available'] = self._engine_available(engine)
+            summary['wins'] = self.wins.get(engine, 0)
+            stats[engine] = summary
+        return {
+            'order': self._ordered_engines(),
+            'engines': stats
+        }
+    
     def get_available_engines(self) -> List[str]:
         """Return list of currently available search engines"""
         available = []
         
+        # Local index if one has been built
+        if self.local_index is not None:
+            available.append(f"Local Index ({self.local_index.info['documents']} documents, offline)")
+        
         # DuckDuckGo is always available
         available.append('DuckDuckGo Instant Answer (always free)')
         
         # SearchApi.io if key is set
         if self.searchapi_key:
-            available.append('SearchApi.io (100 free searches/month)')
+            remaining = self.searchapi_quota.remaining(self.searchapi_key)
+            available.append(f'SearchApi.io ({remaining} of {self.searchapi_quota.monthly_limit} free searches left this month)')
         
         # search-engines library if installed
         if self.search_engines_available:
@@ -301,17 +1149,323 @@ class FreeSearchEngine:
         return available
 
 
+_search_loop = None
+_search_loop_lock = threading.Lock()
+
+
+def get_search_loop() -> asyncio.AbstractEventLoop:
+    """Process-wide event loop, on a daemon thread, that every search runs on"""
+    global _search_loop
+    if _search_loop is None:
+        with _search_loop_lock:
+            if _search_loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, daemon=True, name='alias-search-loop').start()
+                _search_loop = loop
+    return _search_loop
+
+
+class AsyncFreeSearchEngine:
+    """
+    asyncio core of FreeSearchEngine
+    Engine ordering, fallback and hedging live here, and the sync engine's
+    searches block on them. Every search runs on the one shared search loop,
+    so many lookups can be in flight without a thread each. A semaphore bounds
+    how many engine requests are outstanding, and each search has its own deadline.
+    The cache check and single-flight coalescing are done here for both paths;
+    the wrapped FreeSearchEngine supplies configuration, the result cache,
+    response parsing and latency/winner stats.
+    With aiohttp installed the HTTP APIs are awaited natively, each request
+    bounded by its endpoint's http_client timeouts; otherwise (and always for
+    the scraping library) engine calls run on the engine's thread pool, still
+    bounded by the same semaphore.
+    """
+    
+    def __init__(self, engine: Optional[FreeSearchEngine] = None,
+                 max_concurrency: int = 16, timeout: float = 10.0):
+        self.engine = engine if engine is not None else FreeSearchEngine()
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self._semaphore = None
+        self._session = None
+    
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """The shared search loop"""
+        return get_search_loop()
+    
+    def submit(self, coro) -> Future:
+        """
+        Schedule a coroutine on the search loop from any thread
+        Cancelling the returned future cancels the underlying task
+        """
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+    
+    def run(self, coro):
+        """Block until a coroutine has run on the search loop (never call from the loop itself)"""
+        try:
+            on_loop = asyncio.get_running_loop() is self.loop
+        except RuntimeError:
+            on_loop = False
+        if on_loop:
+            coro.close()
+            raise RuntimeError("Blocking search called from the search loop; await it instead")
+        return self.submit(coro).result()
+    
+    async def _on_loop(self, coro):
+        """Run a coroutine on the search loop, whichever loop awaits it"""
+        if asyncio.get_running_loop() is self.loop:
+            return await coro
+        return await asyncio.wrap_future(self.submit(coro))
+    
+    async def search(self, query: str, max_results: int = 1,
+                     timeout: Optional[float] = None) -> Dict[str, any]:
+        """Search like FreeSearchEngine.search, giving up after the deadline"""
+        return await self._on_loop(self._search(query, max_results, timeout))
+    
+    async def search_many(self, queries: List[str], max_results: int = 1,
+                          timeout: Optional[float] = None) -> List[Dict[str, any]]:
+        """Search several queries concurrently, results in input order"""
+        async def run_all():
+            return await asyncio.gather(*(self._search(q, max_results, timeout) for q in queries))
+        return await self._on_loop(run_all())
+    
+    def search_sync(self, query: str, max_results: int = 1,
+                    timeout: Optional[float] = None) -> Dict[str, any]:
+        """Blocking call for code that is not async"""
+        return self.run(self._search(query, max_results, timeout))
+    
+    async def _search(self, query: str, max_results: int, timeout: Optional[float]) -> Dict[str, any]:
+        engine = self.engine
+        if engine.cache:
+            cached, fresh = engine.cache.get(query, 'auto')
+            if cached is not None:
+                if not fresh:
+                    engine._revalidate(query, max_results)
+                cached['cached'] = True
+                return cached
+        return await self._fetch_shared(query, max_results, timeout)
+    
+    async def _fetch_shared(self, query: str, max_results: int, timeout: Optional[float]) -> Dict[str, any]:
+        """Query the engines within the deadline and cache the answer, coalescing identical searches"""
+        engine = self.engine
+        deadline = timeout if timeout is not None else self.timeout
+        key = (normalize_query(query), max_results)
+        future, leader = engine._join_flight(key)
+        if not leader:
+            try:
+                # shield() so a follower's deadline does not cancel the shared request
+                return dict(await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), deadline))
+            except asyncio.TimeoutError:
+                return {'answer': '', 'error': 'Search timed out', 'engine': 'none'}
+        
+        try:
+            result = await asyncio.wait_for(self._search_engines(query, max_results), deadline)
+        except asyncio.TimeoutError:
+            engine.last_winner = None
+            result = {'answer': '', 'error': 'Search timed out', 'engine': 'none'}
+        except BaseException as e:
+            engine._finish_flight(key, future, error=e)
+            raise
+        
+        if engine.cache and result.get('answer'):
+            engine.cache.put(query, 'auto', result)
+        engine._finish_flight(key, future, result)
+        return result
+    
+    async def _search_engines(self, query: str, max_results: int = 1) -> Dict[str, any]:
+        """
+        Query the engines in order and return the first answer
+        'sequential' tries one after another; 'parallel' starts all at once;
+        'hedged' starts the primary and launches the rest when it runs past its
+        usual p75 latency or comes back empty. Losing requests are cancelled
+        (aiohttp requests for real, thread pool calls only if not yet started)
+        """
+        engine = self.engine
+        engines = engine._ordered_engines(query)
+        
+        if engine.search_mode == 'sequential' or len(engines) < 2:
+            for name in engines:
+                try:
+                    result = await self._run_engine(name, query, max_results)
+                    if result.get('answer'):
+                        return engine._record_winner(name, result)
+                except Exception as e:
+                    logger.warning(f"Search engine {name} failed: {e}")
+        else:
+            priority = {name: rank for rank, name in enumerate(engines)}
+            waiting = list(engines)
+            running = {}
+            
+            def launch(count: Optional[int] = None):
+                for name in waiting[:count]:
+                    running[asyncio.ensure_future(self._run_engine(name, query, max_results))] = name
+                del waiting[:count]
+            
+            if engine.search_mode == 'hedged':
+                launch(1)
+                hedge_timeout = engine._hedge_delay_for(engines[0])
+            else:
+                launch()
+                hedge_timeout = None
+            
+            try:
+                while running:
+                    done, _ = await asyncio.wait(running, timeout=hedge_timeout if waiting else None,
+                                                 return_when=asyncio.FIRST_COMPLETED)
+                    if not done:
+                        launch()
+                        continue
+                    
+                    answers = []
+                    for task in done:
+                        name = running.pop(task)
+                        try:
+                            result = task.result()
+                        except Exception as e:
+                            logger.warning(f"Search engine {name} failed: {e}")
+                            continue
+                        if result.get('answer'):
+                            answers.append((priority[name], name, result))
+                    
+                    if answers:
+                        _, name, result = min(answers, key=lambda item: item[0])
+                        return engine._record_winner(name, result)
+                    
+                    if waiting and not running:
+                        launch()
+            finally:
+                for task in running:
+                    task.cancel()
+        
+        engine.last_winner = None
+        return {
+            'answer': '',
+            'error': 'No search results available',
+            'engine': 'none'
+        }
+    
+    async def _run_engine(self, name: str, query: str, max_results: int) -> Dict[str, any]:
+        """Query one engine inside the concurrency budget"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        
+        async with self._semaphore:
+            if not self.engine._health(name).allow(claim=True):
+                return {'answer': ''}  # Another search took the half-open trial meanwhile
+            if not (AIOHTTP_AVAILABLE and name in ('duckduckgo', 'searchapi')):
+                # The sync engine labels the answer and records the outcome
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(self.engine._engine_pool(), self.engine._run_engine,
+                                                  name, query, max_results)
+            
+            start = time.perf_counter()
+            try:
+                result = await self._fetch_json_api(name, query, max_results)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self.engine._health(name).record('error', time.perf_counter() - start)
+                raise
+        return self.engine._record_outcome(name, result, time.perf_counter() - start)
+    
+    async def _fetch_json_api(self, name: str, query: str, max_results: int) -> Dict[str, any]:
+        """DuckDuckGo or SearchApi.io over aiohttp, parsed by the sync engine's parsers"""
+        if self._session is None:
+            connector = aiohttp.TCPConnector(limit=self.max_concurrency)
+            self._session = aiohttp.ClientSession(connector=connector, headers=self.engine.headers,
+                                                  timeout=self._request_timeout(None))
+        
+        engine = self.engine
+        if name == 'duckduckgo':
+            url, params, parse = engine._duckduckgo_url(query), None, engine._parse_duckduckgo
+        else:
+            if not engine._claim_searchapi(query):
+                return {'answer': ''}
+            url, params, parse = engine.searchapi_url, engine._searchapi_params(query, max_results), engine._parse_searchapi
+        
+        try:
+            async with self._session.get(url, params=params, timeout=self._request_timeout(name)) as response:
+                if response.status != 200:
+                    return {'answer': '', 'error': f"HTTP {response.status}"}
+                return parse(await response.json(content_type=None), query)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.error(f"{engine.ENGINE_LABELS[name]} error: {e!r}")
+            return {'answer': '', 'error': str(e) or type(e).__name__}
+    
+    def _request_timeout(self, name: Optional[str]) -> 'aiohttp.ClientTimeout':
+        """The endpoint's (connect, read) timeouts from the shared HTTP client, as aiohttp limits"""
+        connect, read = self.engine.http.timeout_for(name)
+        return aiohttp.ClientTimeout(total=connect + read, sock_connect=connect, sock_read=read)
+    
+    def close(self):
+        """Close the HTTP session (the shared loop keeps running for other engines)"""
+        if self._session is not None:
+            self.run(self._session.close())
+            self._session = None
+
+
 # Convenience functions for easy integration
+_default_engine = None
+_default_engine_lock = threading.Lock()
+
+
+def get_default_engine() -> FreeSearchEngine:
+    """Process-wide engine shared by the convenience functions"""
+    global _default_engine
+    if _default_engine is None:
+        with _default_engine_lock:
+            if _default_engine is None:
+                _default_engine = FreeSearchEngine()
+    return _default_engine
+
+
 def search_web(query: str) -> str:
     """Quick search function - returns formatted string"""
-    engine = FreeSearchEngine()
-    return engine.search_and_format(query)
+    return get_default_engine().search_and_format(query)
 
 
 def search_web_structured(query: str) -> Dict:
     """Search and return structured data"""
-    engine = FreeSearchEngine()
-    return engine.search(query)
+    return get_default_engine().search(query)
+
+
+def run_batch(input_path: str, output_path: Optional[str], concurrency: int = 4,
+              engine: Optional[FreeSearchEngine] = None) -> Dict[str, float]:
+    """
+    Answer every query in a JSONL file ({"query": ...} or a bare JSON string per line)
+    Results are written as JSONL in completion order; '-' means stdin/stdout
+    """
+    engine = engine or get_default_engine()
+    source = sys.stdin if input_path == '-' else open(input_path, 'r', encoding='utf-8')
+    with source:
+        queries = []
+        for line in source:
+            line = line.strip()
+            if line:
+                item = json.loads(line)
+                queries.append(item['query'] if isinstance(item, dict) else str(item))
+    
+    sink = sys.stdout if output_path in (None, '-') else open(output_path, 'w', encoding='utf-8')
+    start = time.perf_counter()
+    answered = cached = 0
+    try:
+        for record in engine.search_many(queries, concurrency=concurrency):
+            answered += bool(record['result'].get('answer'))
+            cached += record['cached']
+            sink.write(json.dumps(record, ensure_ascii=False) + "\n")
+            sink.flush()
+    finally:
+        if sink is not sys.stdout:
+            sink.close()
+    
+    return {
+        'queries': len(queries),
+        'unique': len({normalize_query(q) for q in queries}),
+        'answered': answered,
+        'cached': cached,
+        'seconds': time.perf_counter() - start
+    }
 
 
 # Installation instructions
@@ -337,8 +1491,8 @@ Optional Enhancements:
 All options remain completely FREE!
 """
 
-if __name__ == "__main__":
-    # Demo and testing
+def demo():
+    """Demo and testing"""
     print("🔍 ALIAS Free Search Engine API Demo\n")
     
     engine = FreeSearchEngine()
@@ -356,3 +1510,32 @@ if __name__ == "__main__":
     
     print("\n" + "="*60)
     print(INSTALL_INSTRUCTIONS)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line: demo (default) / batch"""
+    parser = argparse.ArgumentParser(description="ALIAS free search engines")
+    sub = parser.add_subparsers(dest='command')
+    
+    batch = sub.add_parser('batch', help='Answer queries from a JSONL file')
+    batch.add_argument('input', help='JSONL with {"query": ...} per line, or - for stdin')
+    batch.add_argument('-o', '--output', default='-', help='JSONL results, - for stdout')
+    batch.add_argument('-c', '--concurrency', type=int, default=4)
+    batch.add_argument('--searchapi-key', default=os.environ.get('SEARCHAPI_KEY'))
+    
+    args = parser.parse_args(argv)
+    if args.command != 'batch':
+        demo()
+        return 0
+    
+    engine = get_default_engine()
+    if args.searchapi_key:
+        engine.set_searchapi_key(args.searchapi_key)
+    summary = run_batch(args.input, args.output, args.concurrency, engine)
+    print(f"{summary['queries']} queries ({summary['unique']} unique), {summary['answered']} answered, "
+          f"{summary['cached']} cached, {summary['seconds']:.2f}s", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,346 @@
+"""
+Local Stand-in Servers for ALIAS
+Emulates the outside services ALIAS talks to, on stdlib http.server, so search
+and backend paths can be exercised and measured offline:
+
+  /ddg/                      DuckDuckGo Instant Answer JSON
+  /searchapi/api/v1/search   SearchApi.io Google results
+  /ollama/api/tags           Ollama model list
+  /ollama/api/generate       Ollama generation (NDJSON stream or single JSON)
+  /hf/models/<model>         Hugging Face inference API
+
+Each route has its own latency, jitter, error rate and rate limit
+
+    with StandInServer() as server:
+        server.set_behavior('ddg', latency=0.3, error_rate=0.1)
+        os.environ.update(server.env())   # or pass server.urls[...] directly
+"""
+
+import json
+import random
+import threading
+import time
+from collections import Counter, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlsplit
+
+ROUTES = ('ddg', 'searchapi', 'ollama_tags', 'ollama_generate', 'hf')
+
+# Canned answers keyed by lowercase query; anything else gets a generic one
+DEFAULT_ANSWERS = {
+    'who was albert einstein': "Albert Einstein was a German-born theoretical physicist who developed the theory of relativity.",
+    'what is python programming': "Python is a high-level, general-purpose programming language.",
+    'what is the capital of japan': "Tokyo is the capital of Japan.",
+}
+
+
+class RouteBehavior:
+    """How one emulated endpoint responds"""
+    
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0,
+                 error_status: int = 503, rate_limit: Optional[float] = None, empty_rate: float = 0.0):
+        self.latency = latency  # Seconds before the first byte
+        self.jitter = jitter  # Extra uniform random delay up to this many seconds
+        self.error_rate = error_rate  # Fraction of requests answered with error_status
+        self.error_status = error_status
+        self.rate_limit = rate_limit  # Requests per second before answering 429
+        self.empty_rate = empty_rate  # Fraction of successful requests with no answer
+        self._recent = deque()
+        self._lock = threading.Lock()
+    
+    def delay(self) -> float:
+        return self.latency + (random.uniform(0, self.jitter) if self.jitter else 0.0)
+    
+    def rate_limited(self) -> bool:
+        """Sliding one-second window"""
+        if self.rate_limit is None:
+            return False
+        now = time.monotonic()
+        with self._lock:
+            while self._recent and now - self._recent[0] > 1.0:
+                self._recent.popleft()
+            if len(self._recent) >= self.rate_limit:
+                return True
+            self._recent.append(now)
+        return False
+
+
+class StandInServer:
+    """Threaded HTTP server hosting every emulated route on one port"""
+    
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, answers: Optional[Dict[str, str]] = None,
+                 searchapi_keys: Optional[List[str]] = None, token_delay: float = 0.02,
+                 prompt_token_delay: float = 0.0, load_delay: float = 0.0):
+        self.answers = dict(DEFAULT_ANSWERS, **(answers or {}))
+        self.searchapi_keys = set(searchapi_keys or ['test-key'])
+        self.token_delay = token_delay  # Pause between streamed Ollama tokens
+        self.prompt_token_delay = prompt_token_delay  # Ollama prompt evaluation cost per prompt token
+        self.load_delay = load_delay  # Ollama model load time when it is not resident
+        self.model_loaded_until = 0.0  # Monotonic deadline set by each request's keep_alive
+        self.behaviors = {route: RouteBehavior() for route in ROUTES}
+        self.hits = Counter()
+        self._hits_lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+    
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+    
+    @property
+    def urls(self) -> Dict[str, str]:
+        """Base URLs in the form each ALIAS module expects"""
+        base = self.base_url
+        return {
+            'duckduckgo': f"{base}/ddg/",
+            'searchapi': f"{base}/searchapi/api/v1/search",
+            'ollama': f"{base}/ollama",
+            'huggingface': f"{base}/hf/models/",
+        }
+    
+    def env(self) -> Dict[str, str]:
+        """Environment overrides read by search_engines_api, ai_engine and alias"""
+        urls = self.urls
+        return {
+            'ALIAS_DUCKDUCKGO_URL': urls['duckduckgo'],
+            'ALIAS_SEARCHAPI_URL': urls['searchapi'],
+            'ALIAS_OLLAMA_URL': urls['ollama'],
+            'ALIAS_HF_API_URL': urls['huggingface'],
+        }
+    
+    def set_behavior(self, route: str, **settings) -> RouteBehavior:
+        """Replace a route's behaviour, e.g. set_behavior('ddg', latency=0.2, error_rate=0.5)"""
+        self.behaviors[route] = RouteBehavior(**settings)
+        return self.behaviors[route]
+    
+    def answer_for(self, query: str) -> str:
+        return self.answers.get(' '.join(query.lower().split()).strip('?!. '),
+                                f"Stand-in answer about {query}.")
+    
+    @staticmethod
+    def keep_alive_seconds(value) -> float:
+        """Ollama keep_alive: seconds, a duration like '5m'/'1h', or negative to stay loaded"""
+        if value is None:
+            return 300.0
+        if isinstance(value, (int, float)):
+            return float('inf') if value < 0 else float(value)
+        units = {'s': 1, 'm': 60, 'h': 3600}
+        value = value.strip()
+        if value[-1:] in units:
+            seconds = float(value[:-1]) * units[value[-1]]
+        else:
+            seconds = float(value)
+        return float('inf') if seconds < 0 else seconds
+    
+    def load_model(self, keep_alive) -> float:
+        """Seconds spent loading the model for this request; extends its residency"""
+        now = time.monotonic()
+        load = 0.0 if now < self.model_loaded_until else self.load_delay
+        time.sleep(load)
+        self.model_loaded_until = time.monotonic() + self.keep_alive_seconds(keep_alive)
+        return load
+    
+    @staticmethod
+    def user_message(prompt: str) -> str:
+        """Last 'User:' line of an ALIAS mode prompt, or the whole prompt"""
+        for line in reversed(prompt.strip().split('\n')):
+            if line.startswith('User:'):
+                return line[len('User:'):].strip()
+        return prompt
+    
+    def start(self) -> 'StandInServer':
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True,
+                                        name='alias-stand-in')
+        self._thread.start()
+        return self
+    
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+    
+    def __enter__(self) -> 'StandInServer':
+        return self.start()
+    
+    def __exit__(self, *exc):
+        self.stop()
+    
+    def _record(self, route: str):
+        with self._hits_lock:
+            self.hits[route] += 1
+    
+    def _handler_class(self):
+        server = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # Keep-alive, like the real services
+            
+            def log_message(self, format, *args):
+                pass
+            
+            def send_json(self, status: int, payload):
+                body = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def read_json(self) -> Dict:
+                length = int(self.headers.get('Content-Length') or 0)
+                return json.loads(self.rfile.read(length) or b'{}')
+            
+            def gate(self, route: str) -> bool:
+                """Apply latency, rate limit and injected errors; False if already answered"""
+                server._record(route)
+                behavior = server.behaviors[route]
+                time.sleep(behavior.delay())
+                if behavior.rate_limited():
+                    self.send_json(429, {'error': 'Rate limit exceeded'})
+                    return False
+                if random.random() < behavior.error_rate:
+                    self.send_json(behavior.error_status, {'error': 'Injected failure'})
+                    return False
+                return True
+            
+            def empty(self, route: str) -> bool:
+                return random.random() < server.behaviors[route].empty_rate
+            
+            def do_HEAD(self):
+                self.send_response(200)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+            
+            def do_GET(self):
+                url = urlsplit(self.path)
+                params = {key: values[0] for key, values in parse_qs(url.query).items()}
+                
+                if url.path.startswith('/ddg'):
+                    if not self.gate('ddg'):
+                        return
+                    query = params.get('q', '')
+                    if self.empty('ddg'):
+                        payload = {'Abstract': '', 'Answer': '', 'Definition': '', 'RelatedTopics': []}
+                    else:
+                        payload = {
+                            'Abstract': server.answer_for(query),
+                            'AbstractURL': f"https://example.org/wiki/{query.replace(' ', '_')}",
+                            'Heading': query,
+                            'Answer': '', 'Definition': '', 'RelatedTopics': []
+                        }
+                    self.send_json(200, payload)
+                
+                elif url.path.startswith('/searchapi'):
+                    if not self.gate('searchapi'):
+                        return
+                    if params.get('api_key') not in server.searchapi_keys:
+                        self.send_json(401, {'error': 'Invalid API key'})
+                        return
+                    query = params.get('q', '')
+                    if self.empty('searchapi'):
+                        self.send_json(200, {'organic_results': []})
+                        return
+                    self.send_json(200, {
+                        'answer_box': {
+                            'answer': server.answer_for(query),
+                            'link': f"https://example.org/search?q={query.replace(' ', '+')}",
+                            'title': query
+                        }
+                    })
+                
+                elif url.path == '/ollama/api/tags':
+                    if self.gate('ollama_tags'):
+                        self.send_json(200, {'models': [{'name': 'llama2:latest'}]})
+                
+                else:
+                    self.send_json(404, {'error': 'Unknown route'})
+            
+            def do_POST(self):
+                url = urlsplit(self.path)
+                
+                if url.path == '/ollama/api/generate':
+                    request = self.read_json()
+                    if not self.gate('ollama_generate'):
+                        return
+                    self.ollama_generate(request)
+                
+                elif url.path.startswith('/hf/models/'):
+                    request = self.read_json()
+                    if not self.gate('hf'):
+                        return
+                    self.send_json(200, [{'generated_text': server.answer_for(str(request.get('inputs', '')))}])
+                
+                else:
+                    self.send_json(404, {'error': 'Unknown route'})
+            
+            def ollama_generate(self, request: Dict):
+                prompt = request.get('prompt', '')
+                context = list(request.get('context') or [])
+                words = server.answer_for(server.user_message(prompt)).split(' ')
+                tokens = [word if i == 0 else ' ' + word for i, word in enumerate(words)]
+                
+                # Like Ollama, only the new prompt is evaluated when a context is passed back
+                load = server.load_model(request.get('keep_alive'))
+                prompt_tokens = prompt.split()
+                prompt_eval = server.prompt_token_delay * len(prompt_tokens)
+                time.sleep(prompt_eval)
+                final = {
+                    'model': request.get('model', 'llama2'),
+                    'done': True,
+                    'context': context + [len(word) for word in prompt_tokens] + list(range(len(tokens))),
+                    'load_duration': int(load * 1e9),
+                    'prompt_eval_count': len(prompt_tokens),
+                    'prompt_eval_duration': int(prompt_eval * 1e9),
+                    'eval_count': len(tokens),
+                    'eval_duration': int(server.token_delay * len(tokens) * 1e9),
+                }
+                
+                if request.get('stream', True) is False:
+                    time.sleep(server.token_delay * len(tokens))
+                    final['response'] = ''.join(tokens)
+                    self.send_json(200, final)
+                    return
+                
+                # NDJSON stream, one token per line, with chunked transfer encoding
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/x-ndjson')
+                self.send_header('Transfer-Encoding', 'chunked')
+                self.end_headers()
+                try:
+                    for token in tokens:
+                        self.write_chunk({'model': final['model'], 'response': token, 'done': False})
+                        time.sleep(server.token_delay)
+                    final['response'] = ''
+                    self.write_chunk(final)
+                    self.wfile.write(b'0\r\n\r\n')
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # Client cancelled the stream
+            
+            def write_chunk(self, payload: Dict):
+                data = json.dumps(payload).encode('utf-8') + b'\n'
+                self.wfile.write(f"{len(data):X}\r\n".encode('ascii') + data + b'\r\n')
+                self.wfile.flush()
+        
+        return Handler
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Run the ALIAS stand-in servers")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.05, help='Seconds of latency on every route')
+    args = parser.parse_args()
+    
+    with StandInServer(port=args.port) as stand_in:
+        for route in ROUTES:
+            stand_in.set_behavior(route, latency=args.latency)
+        print(f"Stand-in servers on {stand_in.base_url}, point ALIAS at them with:")
+        for key, value in stand_in.env().items():
+            print(f"  export {key}={value}")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
@@ -4,7 +4,9 @@ Quick test of the ALIAS AI Engine
 Demonstrates it works without any external APIs
 """
 
-from ai_engine import FreeAIEngine
+from ai_engine import FreeAIEngine, SentenceEmbedder, KnowledgeBase, ResponseGenerator
+import os
+import tempfile
 import time
 
 print("=" * 60)
@@ -38,6 +40,99 @@ for message, mode in test_cases:
     print(f"ALIAS: {response}")
     print(f"   Response time: {response_time:.3f}s\n")
 
+# Dates, phone numbers and IDs are not arithmetic
+print("Checking the calculator...")
+calculator = engine.generator.calculator
+assert calculator.answer("what is 2 + 2") == "2 + 2 = 4"
+assert calculator.answer("12 times 7") == "12 × 7 = 84"
+assert calculator.answer("what is 10-3?") == "10 - 3 = 7"
+assert calculator.answer("2+2") == "2 + 2 = 4"
+assert calculator.answer("(2.5 + 3) * 4^2") == "(2.5 + 3) × 4 ^ 2 = 88"
+for text in ["2024-10-19", "what is 2024-10-19?", "555-123-4567", "call me at 555-1234", "order 12-345",
+             "42", "-5", "room 2+2", "555-1234", "10-20"]:
+    assert calculator.answer(text) is None, text
+print("   Dates, phone numbers and IDs left alone\n")
+
+# Small talk is not rewritten into the previous topic, real follow-ups are
+# (checked on a fresh embedder, knowledge base and memory so saved state cannot leak in)
+print("Checking follow-up resolution...")
+workdir = os.getcwd()
+with tempfile.TemporaryDirectory() as tmp:
+    os.chdir(tmp)
+    try:
+        embedder = SentenceEmbedder()
+        generator = ResponseGenerator(embedder, KnowledgeBase(embedder))
+    finally:
+        os.chdir(workdir)
+for previous, message, topic in [("who wrote romeo and juliet", "hi there", "Shakespeare"),
+                                 ("what is the capital of france", "is that so", "Paris"),
+                                 ("what is the capital of france", "thanks, that helps", "Paris")]:
+    generator.generate_response(previous)
+    assert topic not in generator.generate_response(message), message
+generator.generate_response("who wrote romeo and juliet")
+assert "Shakespeare" in generator.generate_response("when did he write it")
+print("   Greetings and acknowledgements kept separate\n")
+
+# Stored web answers stop being facts once expired, are capped, and are looked up by question word
+print("Checking stored web answers...")
+kb = generator.kb
+kb.max_web_entries = 2
+web = lambda query, ttl: {'type': 'web', 'query': query, 'query_key': kb.web_key(query), 'expires_at': time.time() + ttl}
+kb.add("Rust 1.80 is the latest Rust release", web("latest rust release", 0.2))
+assert any('Rust 1.80' in text for text, _, _ in kb.search("latest rust release", top_k=100))
+time.sleep(0.25)
+assert not any('Rust 1.80' in text for text, _, _ in kb.search("latest rust release", top_k=100))
+for query in ["python release date", "go release date", "java release date"]:
+    kb.add(f"Answer about {query}", web(query, 60))
+assert [metadata['query'] for _, metadata in kb.web_entries({'release'})] == ["java release date", "go release date"]
+assert kb.web_entries({'rust'}) == [] and not any('python release' in text for text, _, _ in kb.knowledge)
+print("   Expired answers skipped, oldest evicted past the cap\n")
+
+# A cached answer still counts as the turn a follow-up refers to
+print("Checking follow-ups after cached answers...")
+engine.get_response("who wrote romeo and juliet")
+engine.get_response("what is the capital of france")
+hits = engine.response_cache.hits
+engine.get_response("who wrote romeo and juliet")
+assert engine.response_cache.hits == hits + 1
+assert "Shakespeare" in engine.get_response("when did he write it")
+print("   Follow-up resolved against the cached turn\n")
+
+# "Tell me more" depends on the turn before it, so it is never answered from the cache
+print("Checking continuation requests...")
+assert all(engine.generator.conversation_memory.is_follow_up(text)
+           for text in ["tell me more", "Can you elaborate?", "why?", "go on", "for example"])
+assert not engine.generator.conversation_memory.is_follow_up("why is the sky blue")
+engine.get_response("who wrote romeo and juliet")
+assert "Shakespeare" in engine.get_response("tell me more")
+engine.get_response("what is the capital of france")
+hits = engine.response_cache.hits
+assert "Paris" in engine.get_response("tell me more") and engine.response_cache.hits == hits
+print("   \"Tell me more\" follows the current topic\n")
+
+# A web answer promoted from the semantic cache keeps its expiry
+print("Checking cached web answer expiry...")
+engine.semantic_cache.web_ttl = 0.2
+engine.semantic_cache.put("what is the latest rust release", "Assistant", "General",
+                          "[Web Search Result]\n\nRust 1.0", engine.knowledge_base.revision, from_web=True)
+assert engine.get_response("What's the latest Rust release?") == "[Web Search Result]\n\nRust 1.0"
+promoted_key = engine.response_cache.make_key("What's the latest Rust release?", "Assistant", "General")
+assert engine.response_cache.get(promoted_key, engine.knowledge_base.revision) is not None
+time.sleep(0.25)
+assert engine.response_cache.get(promoted_key, engine.knowledge_base.revision) is None
+print("   Promoted web answer expired with the original entry\n")
+
+# Negations and quantifiers must match before a near-duplicate hits
+print("Checking negated questions in the semantic cache...")
+revision = engine.knowledge_base.revision
+question = "is python a good programming language for beginners"
+engine.semantic_cache.put(question, "Assistant", "General", "Answer A", revision)
+assert engine.semantic_cache.get(f"please tell me, {question}?", "Assistant", "General", revision) == "Answer A"
+for variant in ["is python not a good", "isn't python a good", "is python always a good"]:
+    negated = question.replace("is python a good", variant)
+    assert engine.semantic_cache.get(negated, "Assistant", "General", revision) is None, negated
+print("   \"not\", \"isn't\" and \"always\" kept apart from the plain question\n")
+
 # Save learned knowledge
 print("Saving learned knowledge...")
 engine.save_state()
@@ -50,6 +145,7 @@ print("=" * 60)
 print(f"Vocabulary size: {stats['vocabulary_size']} words")
 print(f"Knowledge items: {stats['knowledge_items']} entries")
 print(f"Conversations: {stats['conversations']} exchanges")
+print(f"Response cache: {stats['response_cache']['hits']} hits / {stats['response_cache']['misses']} misses")
 print()
 print("All tests passed! AI engine is fully functional.")
 print("The engine learns from each conversation and gets smarter!")
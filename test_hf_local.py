@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+ALIAS Local Hugging Face Inference Test
+Checks that reusing the cached mode prefix does not change what the model
+generates. Runs offline on a tiny randomly initialised GPT-2 with a byte-level
+tokenizer; skipped when torch and transformers are not installed
+"""
+
+import sys
+import tempfile
+
+from hf_local import LocalGenerator, HF_LOCAL_AVAILABLE, STOP_TEXT, WARM_UP_CONTEXT
+
+
+def build_tiny_model(path):
+    """Save a 2-layer GPT-2 and a byte-level tokenizer (no merges) to path"""
+    import torch
+    from tokenizers import Tokenizer, decoders, models, pre_tokenizers
+    from transformers import GPT2Config, GPT2LMHeadModel, PreTrainedTokenizerFast
+    
+    alphabet = pre_tokenizers.ByteLevel.alphabet()
+    vocab = {char: i for i, char in enumerate(sorted(alphabet))}
+    vocab['<|endoftext|>'] = len(vocab)
+    tokenizer = Tokenizer(models.BPE(vocab, []))
+    tokenizer.pre_tokenizer = pre_tokenizers.ByteLevel(add_prefix_space=False)
+    tokenizer.decoder = decoders.ByteLevel()
+    PreTrainedTokenizerFast(tokenizer_object=tokenizer, eos_token='<|endoftext|>').save_pretrained(path)
+    
+    torch.manual_seed(0)
+    config = GPT2Config(vocab_size=len(vocab), n_positions=256, n_embd=32, n_layer=2, n_head=2,
+                        bos_token_id=len(vocab) - 1, eos_token_id=len(vocab) - 1)
+    GPT2LMHeadModel(config).save_pretrained(path)
+
+
+def uncached_greedy(local, message, context, max_new_tokens):
+    """Greedy decoding over the whole prompt each step, no past_key_values"""
+    import torch
+    
+    ids = local.tokenizer.encode(f"{context}\n\nUser: {message}\nALIAS:", return_tensors='pt')
+    generated = []
+    with torch.inference_mode():
+        for _ in range(max_new_tokens):
+            token = int(torch.argmax(local.model(input_ids=ids).logits[:, -1, :], dim=-1))
+            if token == local.eos_token_id:
+                break
+            generated.append(token)
+            ids = torch.cat([ids, torch.tensor([[token]])], dim=1)
+    text = local.tokenizer.decode(generated, skip_special_tokens=True).lstrip()
+    return text.split(STOP_TEXT)[0].rstrip('\ufffd').strip()
+
+
+def test_prefix_cache_matches_uncached():
+    """Cached-prefix greedy generation gives the same text as a full-prompt run"""
+    if not HF_LOCAL_AVAILABLE:
+        import pytest  # Only reached under pytest, main() skips before calling
+        pytest.skip("torch and transformers not installed")
+    
+    print("="*60)
+    print("🧠 Prefix Cache Equivalence Test")
+    print("="*60)
+    print()
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        build_tiny_model(tmp)
+        local = LocalGenerator(tmp, quantize=False, num_threads=1, max_new_tokens=24, temperature=0)
+        for message, context in [("hello", WARM_UP_CONTEXT),
+                                 ("Can you help me learn Python?", "You are ALIAS, a patient tutor."),
+                                 ("Tell me a joke", WARM_UP_CONTEXT)]:
+            expected = uncached_greedy(local, message, context, 24)
+            assert local.generate(message, context) == expected, message
+        print(f"   ✅ {len(local.prefixes)} cached prefixes, output identical to uncached decoding")
+    
+    # A possible start of the next user turn waits for the tokens that decide it
+    assert [LocalGenerator.partial_stop(text) for text in ("Sure.\n", "Sure.\nUs", "Sure.", "\nUser")] == [1, 3, 0, 0]
+    print("   ✅ Trailing partial \"\\nUser\" held back")
+    print()
+
+
+def main():
+    if not HF_LOCAL_AVAILABLE:
+        print("⏭️  torch and transformers not installed - skipping local inference tests")
+        return 0
+    test_prefix_cache_matches_uncached()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
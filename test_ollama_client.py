@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+ALIAS Ollama Client Test
+Streams from the local stand-in Ollama server, no Ollama install needed
+"""
+
+from ollama_client import OllamaClient
+from stand_in_servers import StandInServer
+import sys
+import threading
+import time
+
+
+def test_streaming(server):
+    """Tokens arrive one by one and the first one comes well before the last"""
+    print("="*60)
+    print("🦙 Ollama Streaming Test")
+    print("="*60)
+    print()
+    
+    client = OllamaClient(server.urls['ollama'])
+    assert client.available()
+    
+    start = time.perf_counter()
+    tokens = list(client.stream("User: what is python programming\nALIAS:"))
+    total = time.perf_counter() - start
+    assert ''.join(tokens) == server.answer_for('what is python programming')
+    assert len(tokens) > 3 and client.last_first_token_time < total / 2
+    print(f"   ✅ {len(tokens)} tokens, first after {client.last_first_token_time * 1000:.0f} ms, "
+          f"all after {total * 1000:.0f} ms")
+    print()
+
+
+def test_cancellation(server):
+    """Setting the cancel event stops the stream early"""
+    print("="*60)
+    print("🛑 Ollama Cancellation Test")
+    print("="*60)
+    print()
+    
+    client = OllamaClient(server.urls['ollama'])
+    cancel = threading.Event()
+    tokens = []
+    for token in client.stream("User: who was albert einstein\nALIAS:", cancel):
+        tokens.append(token)
+        if len(tokens) == 2:
+            cancel.set()
+    assert len(tokens) == 2 and client.stats()['cancelled'] == 1
+    print(f"   ✅ Stopped after {len(tokens)} tokens")
+    print()
+
+
+def test_cancel_stalled_stream(server):
+    """Cancelling while the server stalls mid-stream returns without waiting for the read timeout"""
+    print("="*60)
+    print("⏸️  Ollama Stalled Stream Cancellation Test")
+    print("="*60)
+    print()
+    
+    client = OllamaClient(server.urls['ollama'])
+    cancel = threading.Event()
+    tokens = []
+    stopped = []
+    
+    def consume():
+        for token in client.stream("User: who was albert einstein\nALIAS:", cancel):
+            tokens.append(token)
+            server.token_delay = 5.0  # Stall after the first token
+        stopped.append(time.perf_counter())
+    
+    consumer = threading.Thread(target=consume)
+    try:
+        consumer.start()
+        while not tokens:
+            time.sleep(0.01)
+        time.sleep(0.2)
+        cancelled_at = time.perf_counter()
+        cancel.set()
+        consumer.join(timeout=3)
+    finally:
+        server.token_delay = 0.05
+    assert stopped and stopped[0] - cancelled_at < 1.0 and client.stats()['cancelled'] == 1
+    print(f"   ✅ Stalled read interrupted {(stopped[0] - cancelled_at) * 1000:.0f} ms after cancel")
+    print()
+
+
+def test_context_reuse(server):
+    """Later turns of a session send the context back and evaluate only the new prompt"""
+    print("="*60)
+    print("🧠 Ollama Context Reuse Test")
+    print("="*60)
+    print()
+    
+    client = OllamaClient(server.urls['ollama'], keep_alive="10m")
+    system = "You are ALIAS, a helpful AI assistant. Respond helpfully and professionally.\n\n"
+    client.generate(system + "User: what is python programming\nALIAS:", session='chat')
+    first = client.last_stats
+    assert client.has_context('chat') and not first['reused_context']
+    
+    client.generate("\nUser: what is the capital of japan\nALIAS:", session='chat')
+    second = client.last_stats
+    assert second['reused_context'] and second['prompt_eval_count'] < first['prompt_eval_count']
+    assert client.sessions['chat']['turns'] == 2
+    print(f"   ✅ Prompt tokens evaluated: {first['prompt_eval_count']} -> {second['prompt_eval_count']}")
+    
+    client.session_ttl = 0
+    time.sleep(0.01)
+    assert not client.has_context('chat') and client.evicted == 1
+    print("   ✅ Idle session evicted")
+    print()
+
+
+def main():
+    """Run all tests"""
+    with StandInServer(token_delay=0.05) as server:
+        try:
+            test_streaming(server)
+            test_cancellation(server)
+            test_cancel_stalled_stream(server)
+            test_context_reuse(server)
+        except Exception as e:
+            print(f"❌ Error during testing: {e}")
+            import traceback
+            traceback.print_exc()
+            return 1
+    
+    print("✅ Ollama client tests completed!")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,8 +4,18 @@ ALIAS Search Engine Integration Test Suite
 Tests all available search engines and demonstrates usage
 """
 
-from search_engines_api import FreeSearchEngine, INSTALL_INSTRUCTIONS
+from search_engines_api import (FreeSearchEngine, SearchResultCache, QuotaLedger, TokenBucket, EngineHealth,
+                                classify_query, INSTALL_INSTRUCTIONS, AIOHTTP_AVAILABLE)
+from http_client import HttpClient
+from local_index import build_index, LocalIndex
+from stand_in_servers import StandInServer
+import os
 import sys
+import time
+import asyncio
+import json
+import tempfile
+import threading
 
 def test_basic_functionality():
     """Test basic search engine setup"""
@@ -97,6 +107,160 @@ def test_searchapi_integration():
     print("   or use: engine.set_searchapi_key('YOUR_KEY')")
     print()
 
+def test_result_cache():
+    """Test the persistent search cache (offline)"""
+    print("="*60)
+    print("💾 Persistent Result Cache Test")
+    print("="*60)
+    print()
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = SearchResultCache(os.path.join(tmp, 'cache.db'))
+        cache.put("What is Python?", 'auto', {'answer': 'A programming language'})
+        
+        result, fresh = cache.get("what is python", 'auto')
+        assert result['answer'] == 'A programming language' and fresh
+        assert cache.get("what is python", 'duckduckgo')[0] is None
+        print(f"   ✅ Normalized lookup hit: {result['answer']}")
+        
+        for query in ["weather in paris", "latest news", "what is dna"]:
+            print(f"   🕒 '{query}' -> {classify_query(query)} ({cache.ttls[classify_query(query)]}s TTL)")
+        
+        cache.close()
+    print()
+
+def test_quota_ledger():
+    """Test that concurrent searches cannot overspend the SearchApi.io quota (offline)"""
+    print("="*60)
+    print("🧮 Quota Ledger Test")
+    print("="*60)
+    print()
+    
+    ledger = QuotaLedger(':memory:', monthly_limit=50)
+    granted = []
+    threads = [threading.Thread(target=lambda: granted.extend(ledger.try_consume('key') for _ in range(20)))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sum(granted) == 50 and ledger.used('key') == 50
+    ledger.charge('key', 2)
+    assert ledger.used('key') == 52 and not ledger.try_consume('key')
+    print(f"   ✅ 160 concurrent requests, {sum(granted)} granted; retries charged on top")
+    print()
+
+def test_local_index():
+    """Test the offline corpus index (offline)"""
+    print("="*60)
+    print("📚 Local Index Test")
+    print("="*60)
+    print()
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        corpus = os.path.join(tmp, 'telephone.txt')
+        with open(corpus, 'w', encoding='utf-8') as f:
+            f.write("Telephone\nAlexander Graham Bell was awarded the first US patent for the telephone in 1876.\n\n"
+                    "Early telephones were wired directly in pairs.")
+        info = build_index([corpus], os.path.join(tmp, 'index'))
+        print(f"   📦 Indexed {info['documents']} document(s), {info['passages']} passages")
+        
+        index = LocalIndex(os.path.join(tmp, 'index'))
+        result = index.answer("who invented the telephone")
+        assert 'Graham Bell' in result['answer'] and result['title'] == 'Telephone'
+        assert index.answer("quantum chromodynamics")['answer'] == ''
+        print(f"   ✅ {result['answer']}")
+        
+        # A rare term repeated in one passage outscores the passage covering the whole query
+        with open(os.path.join(tmp, 'islands.jsonl'), 'w', encoding='utf-8') as f:
+            f.write(json.dumps({'title': 'Quokka', 'text': 'Quokka quokka quokka quokka quokka.'}) + '\n')
+            f.write(json.dumps({'title': 'Rottnest', 'text': 'Rottnest island wildlife includes the quokka.'}) + '\n')
+            for i in range(6):
+                f.write(json.dumps({'title': f'Island {i}', 'text': f'Island {i} wildlife survey number {i}.'}) + '\n')
+        paths = [corpus, os.path.join(tmp, 'islands.jsonl')]
+        build_index(paths, os.path.join(tmp, 'runs'), run_postings=4)  # Forces one spill per passage or so
+        build_index(paths, os.path.join(tmp, 'single'))
+        for name in ('terms.bin', 'term_offsets.npy', 'posting_ids.npy', 'posting_tfs.npy', 'passages.bin'):
+            with open(os.path.join(tmp, 'runs', name), 'rb') as a, open(os.path.join(tmp, 'single', name), 'rb') as b:
+                assert a.read() == b.read(), name
+        print("   ✅ Spilled and merged runs give the same index as one in-memory run")
+        
+        index = LocalIndex(os.path.join(tmp, 'runs'))
+        top = index.search("quokka island wildlife", top_k=1)[0]
+        assert index.titles[int(index.passage_doc[top[0]])] == 'Quokka' and top[2] < 0.5
+        assert index.answer("quokka island wildlife")['title'] == 'Rottnest'
+        print("   ✅ Low-coverage top passage skipped for a full match further down")
+    print()
+
+def test_stand_in_fallback():
+    """Test fallback and the circuit breaker against the stand-in servers (offline)"""
+    print("="*60)
+    print("🧪 Stand-in Fallback Test")
+    print("="*60)
+    print()
+    
+    with StandInServer() as server:
+        server.set_behavior('searchapi', error_rate=1.0)
+        engine = FreeSearchEngine(cache_path=None, quota_path=None, local_index_path=None)
+        engine.duckduckgo_url = server.urls['duckduckgo']
+        engine.searchapi_url = server.urls['searchapi']
+        engine.set_searchapi_key('test-key')
+        engine.engines = ['searchapi', 'duckduckgo']
+        engine.search_mode = 'sequential'
+        engine.adaptive_order = False
+        
+        for _ in range(5):
+            result = engine.search("who was albert einstein")
+            assert 'theory of relativity' in result['answer'] and result['engine'] == 'DuckDuckGo Instant Answer'
+        assert engine.get_engine_stats()['engines']['searchapi']['state'] == 'open'
+        print(f"   ✅ Answered by {result['engine']}, SearchApi.io breaker open after {server.hits['searchapi']} requests")
+
+        # A half-open engine that is only a hedge keeps its trial when the primary answers first
+        engine.health['searchapi'].open_until = 0.0
+        engine.health['duckduckgo'] = EngineHealth()  # Default hedge delay, not DuckDuckGo's own ~5 ms p75
+        engine.searchapi_rate = TokenBucket(rate=100.0, capacity=100.0)
+        engine.engines = ['duckduckgo', 'searchapi']
+        engine.search_mode = 'hedged'
+        engine.search("what is python programming")
+        assert engine.health['searchapi'].state == 'half-open' and engine.health['searchapi'].allow(claim=False)
+        print("   ✅ Unlaunched hedge engine kept its half-open trial")
+    print()
+
+def test_async_deadlines():
+    """Test the async core (aiohttp when installed) and its timeouts against the stand-in servers (offline)"""
+    print("="*60)
+    print("⏱️  Async Search Deadline Test")
+    print("="*60)
+    print()
+    
+    with StandInServer() as server:
+        server.set_behavior('ddg', latency=0.05)
+        engine = FreeSearchEngine(cache_path=None, quota_path=None, local_index_path=None)
+        engine.http = HttpClient(timeouts={'duckduckgo': (1, 0.3)})
+        engine.duckduckgo_url = server.urls['duckduckgo']
+        engine.engines = ['duckduckgo']
+        
+        result = asyncio.run(engine.aio.search("who was albert einstein"))
+        assert 'theory of relativity' in result['answer']
+        print(f"   ✅ Answered over {'aiohttp' if AIOHTTP_AVAILABLE else 'the thread pool (aiohttp not installed)'}")
+        
+        # A stalled provider is cut off by its endpoint read timeout...
+        server.set_behavior('ddg', latency=3.0)
+        start = time.perf_counter()
+        result = engine.search("what is python programming")
+        assert not result['answer'] and time.perf_counter() - start < 2.5
+        
+        # ...and by the overall deadline, which sync searches honour too
+        engine.aio.timeout = 0.5
+        engine.http = HttpClient(timeouts={'duckduckgo': (1, 10)})
+        start = time.perf_counter()
+        result = engine.search("what is the capital of japan")
+        assert result['error'] == 'Search timed out' and time.perf_counter() - start < 1.5
+        print(f"   ✅ Stalled provider cut off after {time.perf_counter() - start:.2f}s")
+        engine.aio.close()
+        engine.http.close()
+    print()
+
 def show_installation_guide():
     """Show installation instructions"""
     print("="*60)
@@ -126,6 +290,21 @@ def main():
         # Test 4: SearchApi.io
         test_searchapi_integration()
         
+        # Test 5: Result cache
+        test_result_cache()
+        
+        # Test 6: Quota ledger
+        test_quota_ledger()
+        
+        # Test 7: Local index
+        test_local_index()
+        
+        # Test 8: Fallback against the stand-in servers
+        test_stand_in_fallback()
+        
+        # Test 9: Async core timeouts against the stand-in servers
+        test_async_deadlines()
+        
         # Show installation guide
         show_installation_guide()
         